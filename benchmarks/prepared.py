@@ -0,0 +1,66 @@
+"""Micro-benchmark of a prepared call against the Numista() method it replaces
+
+No network: an in-memory transport answers every request with a canned getPrices() body, so the figures are the client's own overhead per call (JSON parsing of the body included)
+
+Usage, from the repository root: python -m benchmarks.prepared [--calls 50000] [--repeat 3]
+"""
+import argparse
+import json
+import os
+import tempfile
+import timeit
+
+from numista import Numista
+from numista.cassette import CassetteResponse
+from numista.context import NumistaContext
+
+PRICES = json.dumps(
+    {
+        "currency": "EUR",
+        "prices": [
+            {"grade": g, "price": p}
+            for g, p in zip(["g", "vg", "f", "vf", "xf", "au", "unc"], [1, 2, 3, 5, 8, 13, 21])
+        ],
+    }
+).encode("utf-8")
+
+
+class CannedTransport:
+    """A transport answering every request with the same getPrices() response"""
+
+    def request(self, method: str = "GET", url: str = str(), **kwargs) -> CassetteResponse:
+        return CassetteResponse(
+            status_code=200,
+            content=PRICES,
+            headers={"Content-Type": "application/json", "Content-Length": str(len(PRICES))},
+            url=url,
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=50000, help="Calls per timing")
+    parser.add_argument("--repeat", type=int, default=3, help="Timings, the best is reported")
+    args = parser.parse_args()
+
+    log_path = os.path.join(tempfile.mkdtemp(), "numista.log")
+    numista = Numista(
+        api_key="benchmark",
+        log_path=log_path,
+        context=NumistaContext(transport=CannedTransport()),
+    )
+    prices = numista.prepare("getPrices", currency="EUR")
+    assert prices(420, 1)["data"] == numista.getPrices(type_id=420, issue_id=1, currency="EUR")["data"]
+
+    timings = {
+        "getPrices()": lambda: numista.getPrices(type_id=420, issue_id=1, currency="EUR"),
+        "prepared call": lambda: prices(420, 1),
+        "json.loads() of the body": lambda: json.loads(PRICES),
+    }
+    for name, call in timings.items():
+        best = min(timeit.repeat(call, number=args.calls, repeat=args.repeat))
+        print(f"{name:<26} {best / args.calls * 1e6:8.2f} us per call")
+
+
+if __name__ == "__main__":
+    main()
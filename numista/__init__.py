@@ -1,3 +1,43 @@
 from numista.numista import Numista
 
-__all__ = ["Numista"]
+# Everything else is imported on first access (PEP 562) to keep 'import numista' cheap
+_LAZY_ATTRIBUTES = {
+    "AdaptiveLimiter": "numista.concurrency",
+    "BulkCollectionWriter": "numista.bulk",
+    "Cassette": "numista.cassette",
+    "CatalogueCrawler": "numista.crawler",
+    "CatalogueGraph": "numista.graph",
+    "CatalogueMirror": "numista.mirror",
+    "CircuitBreaker": "numista.breaker",
+    "CollectionFeed": "numista.feed",
+    "CollectionValuer": "numista.valuation",
+    "DebugLog": "numista.debug",
+    "HedgePolicy": "numista.hedge",
+    "NumistaContext": "numista.context",
+    "PreparedCall": "numista.prepared",
+    "PriceHistory": "numista.prices",
+    "RateLimiter": "numista.ratelimit",
+    "ReferenceData": "numista.reference",
+    "RequestScheduler": "numista.scheduler",
+    "SWRCache": "numista.cache",
+    "SharedRateLimiter": "numista.ratelimit",
+    "TTLCache": "numista.cache",
+    "TransferStats": "numista.transfer",
+}
+
+__all__ = ["Numista", *_LAZY_ATTRIBUTES]
+
+
+def __getattr__(name):
+    module = _LAZY_ATTRIBUTES.get(name)
+    if module is None:
+        raise AttributeError(f"module 'numista' has no attribute '{name}'")
+    import importlib
+
+    value = getattr(importlib.import_module(module), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(__all__)
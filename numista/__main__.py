@@ -0,0 +1,6 @@
+"""Allows 'python -m numista', the same as the 'numista' command"""
+import sys
+
+from numista.cli import main
+
+sys.exit(main())
@@ -0,0 +1,158 @@
+"""Per endpoint circuit breaking, to fail fast while the API is down
+
+Attributes:
+    CIRCUIT_STATES (list): States of a circuit
+    DEFAULT_BREAKER_FAILURES (int): Default number of consecutive failures that open a circuit
+    DEFAULT_BREAKER_RESET (float): Default seconds a circuit stays open before a probe is let through
+    DEFAULT_STALE_TTL (int): Default seconds a successful GET result may be served stale
+    ENDPOINT_ID_PATTERN (object): Compiled pattern of the ID segments of an endpoint URI
+    STALE_EXCLUDED_ENDPOINTS (frozenset): Endpoint templates whose results are never kept or served stale
+"""
+import re
+import threading
+import time
+
+from numista.cache import TTLCache
+
+CIRCUIT_STATES = ["closed", "open", "half_open"]
+DEFAULT_BREAKER_FAILURES = 5
+DEFAULT_BREAKER_RESET = 30.0
+DEFAULT_STALE_TTL = 86400
+ENDPOINT_ID_PATTERN = re.compile(r"/\d+(?=/|$)")
+STALE_EXCLUDED_ENDPOINTS = frozenset(["GET /oauth_token"])  # A token must be fresh, and is the caller's own
+
+
+def endpoint_template(http_method: str = "get", endpoint_uri: str = str()) -> str:
+    """The circuit key of a request: its method and endpoint with IDs replaced
+    Example: ("get", "/types/420/issues") -> "GET /types/{id}/issues"
+    """
+    return f"{http_method.upper()} {ENDPOINT_ID_PATTERN.sub('/{id}', endpoint_uri)}"
+
+
+class CircuitBreaker:
+    """A circuit per endpoint template: opens after repeated failures, probes half-open to close again
+    Failures are transport errors (Example: timeouts) and HTTP 5xx. Optionally keeps the last successful GET results to serve while a circuit is open
+
+    Attributes:
+        failures (int): Consecutive failures that open a circuit
+        half_open_probes (int): Requests let through at once while half-open
+        reset_timeout (float): Seconds a circuit stays open before probing
+    """
+
+    def __init__(
+        self,
+        failures: int = DEFAULT_BREAKER_FAILURES,
+        reset_timeout: float = DEFAULT_BREAKER_RESET,
+        half_open_probes: int = 1,
+        serve_stale: bool = True,
+        stale_ttl: int = DEFAULT_STALE_TTL,
+        stale_entries: int = 10000,
+    ):
+        """Initialize the breaker, every circuit closed
+        # noqa: E501
+
+        Args:
+            failures (int, optional): Consecutive failures that open a circuit
+            reset_timeout (float, optional): Seconds a circuit stays open before probing
+            half_open_probes (int, optional): Requests let through at once while half-open
+            serve_stale (bool, optional): Keep successful GET results, but those of STALE_EXCLUDED_ENDPOINTS, to serve to the same credentials while their circuit is open or a request fails
+            stale_ttl (int, optional): Seconds a result may be served stale
+            stale_entries (int, optional): Maximum results kept for serving stale
+        """
+        self.failures = max(int(failures), 1)
+        self.reset_timeout = reset_timeout
+        self.half_open_probes = max(int(half_open_probes), 1)
+
+        self._stale = TTLCache(ttl=stale_ttl, max_entries=stale_entries) if serve_stale else None
+        self._circuits = dict()  # key: {"state", "failures", "opened", "probes"}
+        self._lock = threading.Lock()
+
+    def key(self, http_method: str = "get", endpoint_uri: str = str()) -> str:
+        """The circuit key of a request, see endpoint_template()"""
+        return endpoint_template(http_method, endpoint_uri)
+
+    def allow(self, key: str = str()) -> bool:
+        """Whether a request may be sent. While half-open, reserves a probe: report its outcome with record() or release()
+        # noqa: E501
+
+        Args:
+            key (str): The circuit key. Example: endpoint_template("get", "/types/420")
+
+        Returns:
+            bool: False while the circuit is open
+        """
+        with self._lock:
+            circuit = self._circuits.get(key)
+            if circuit is None or circuit["state"] == "closed":
+                return True
+            if circuit["state"] == "open":
+                if time.monotonic() - circuit["opened"] < self.reset_timeout:
+                    return False
+                circuit["state"] = "half_open"
+                circuit["probes"] = 0
+            if circuit["probes"] < self.half_open_probes:
+                circuit["probes"] += 1
+                return True
+            return False
+
+    def record(self, key: str = str(), ok: bool = True) -> None:
+        """Record the outcome of a request let through by allow()"""
+        with self._lock:
+            circuit = self._circuits.get(key)
+            if circuit is None:
+                if ok:
+                    return
+                circuit = self._circuits[key] = {
+                    "state": "closed",
+                    "failures": 0,
+                    "opened": 0.0,
+                    "probes": 0,
+                }
+            half_open = circuit["state"] == "half_open"
+            if half_open:
+                circuit["probes"] = max(circuit["probes"] - 1, 0)
+
+            if ok:
+                circuit["state"] = "closed"
+                circuit["failures"] = 0
+            else:
+                circuit["failures"] += 1
+                if half_open or circuit["failures"] >= self.failures:
+                    circuit["state"] = "open"
+                    circuit["opened"] = time.monotonic()
+
+    def release(self, key: str = str()) -> None:
+        """Give back a half-open probe that was not sent"""
+        with self._lock:
+            circuit = self._circuits.get(key)
+            if circuit is not None and circuit["state"] == "half_open":
+                circuit["probes"] = max(circuit["probes"] - 1, 0)
+
+    def state(self, key: str = str()) -> str:
+        """The state of a circuit, one of CIRCUIT_STATES"""
+        with self._lock:
+            circuit = self._circuits.get(key)
+            return circuit["state"] if circuit else "closed"
+
+    def stats(self) -> dict:
+        """Circuits that have failed, by key
+
+        Returns:
+            dict: {key: {"state", "failures"}}
+        """
+        with self._lock:
+            return {
+                key: {"state": c["state"], "failures": c["failures"]}
+                for key, c in self._circuits.items()
+            }
+
+    def store(self, key: object = None, data: object = None) -> None:
+        """Keep a successful result to serve stale later. No-op unless serve_stale"""
+        if self._stale is not None:
+            self._stale.set(key, data)
+
+    def stale(self, key: object = None) -> object:
+        """A result kept by store(), or None"""
+        if self._stale is None:
+            return None
+        return self._stale.get(key)
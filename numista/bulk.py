@@ -0,0 +1,312 @@
+"""Bulk add/edit/delete of collected items
+
+Attributes:
+    BULK_OPERATIONS (dict): Supported bulk operations and the HTTP method they map to
+    DEFAULT_BULK_RETRIES (int): Default number of retries of an operation answered with HTTP 429
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from numista.concurrency import AdaptiveLimiter, limited_call
+from numista.numista import (
+    DEFAULT_BULK_WORKERS,
+    DEFAULT_RATE_LIMIT,
+    VALID_NUMISTA_GRADES,
+    VALID_NUMISTA_GRADES_SET,
+)
+from numista.ratelimit import RateLimiter
+
+BULK_OPERATIONS = {"add": "post", "edit": "patch", "delete": "delete"}
+DEFAULT_BULK_RETRIES = 3
+
+
+class BulkCollectionWriter:
+    """Runs many collected item operations concurrently for one user
+
+    An operation is a dict: {"op": "add" | "edit" | "delete", "item_id": int, "body": dict}
+    "item_id" is required for edit/delete, "body" is required for add/edit.
+
+    Attributes:
+        checkpoint_path (str): JSON Lines file completed operations are recorded to, for resuming
+        concurrency (AdaptiveLimiter): Adapts the number of concurrent requests to latency and HTTP 429. None keeps workers fixed
+        limiter (RateLimiter): The rate limiter every request waits on
+        logger (object): The logger class is attached here
+        numista (Numista): The Numista() client used to send requests
+        priority (str): Priority class of the requests when the client's context has a RequestScheduler
+        retries (int): Number of retries of an operation answered with HTTP 429
+        token_label (str): The Label of the token that is stored to use as authorization
+        user_id (int): ID of the User whose collection is written to
+        workers (int): Number of concurrent requests, the maximum when concurrency is set
+    """
+
+    def __init__(
+        self,
+        numista,
+        user_id: int = int(),
+        token_label: str = "self",
+        workers: int = DEFAULT_BULK_WORKERS,
+        rate: float = DEFAULT_RATE_LIMIT,
+        limiter: RateLimiter = None,
+        retries: int = DEFAULT_BULK_RETRIES,
+        checkpoint_path: str = str(),
+        priority: str = "background",
+        concurrency: AdaptiveLimiter = None,
+    ):
+        """Initialize the writer
+        # noqa: E501
+
+        Args:
+            numista (Numista): An instantiated Numista() client
+            user_id (int, optional): ID of the User, defaults to myUserId()
+            token_label (str, optional): The Label of the token that is stored to use as authorization
+            workers (int, optional): Number of concurrent requests
+            rate (float, optional): Maximum requests per second. 0 disables limiting. Ignored when limiter is provided
+            limiter (RateLimiter, optional): A rate limiter to share with other jobs
+            retries (int, optional): Number of retries of an operation answered with HTTP 429
+            checkpoint_path (str, optional): JSON Lines file to record progress to. Re-running with the same file and operations resumes, other operations are refused
+            priority (str, optional): Priority class of the requests when the client's context has a RequestScheduler
+            concurrency (AdaptiveLimiter, optional): Adapt the number of concurrent requests, up to its max_limit, to latency and HTTP 429. Overrides workers
+        """
+        self.numista = numista
+        self.logger = numista.logger
+        self.user_id = user_id
+        self.token_label = token_label
+        self.concurrency = concurrency
+        self.workers = concurrency.max_limit if concurrency else max(int(workers), 1)
+        self.limiter = limiter if limiter else RateLimiter(rate=rate)
+        self.retries = retries
+        self.checkpoint_path = checkpoint_path
+        self.priority = priority
+
+        self._checkpoint_lock = threading.Lock()
+
+    def validate(self, operations: list = list()) -> list:
+        """Validate every operation before anything is sent
+        # noqa: E501
+
+        Args:
+            operations (list): The operations to validate
+
+        Returns:
+            list: The operations, normalized
+
+        Raises:
+            ValueError: When any operation is invalid. The message lists every invalid operation
+        """
+        normalized = list()
+        errors = list()
+        for i, operation in enumerate(operations):
+            if not isinstance(operation, dict):
+                errors.append(f"#{i}: operation must be a dict, got {type(operation)}")
+                continue
+
+            op = str(operation.get("op", "")).lower()
+            item_id = operation.get("item_id", int())
+            body = operation.get("body", dict())
+
+            if op not in BULK_OPERATIONS:
+                errors.append(f"#{i}: op '{op}' must be one of {list(BULK_OPERATIONS)}")
+                continue
+            if op in ("edit", "delete") and not item_id:
+                errors.append(f"#{i}: item_id (int) is required for op '{op}'")
+            if op in ("add", "edit") and not (body and isinstance(body, dict)):
+                errors.append(f"#{i}: body (dict) is required for op '{op}'")
+            elif op == "add" and not body.get("type"):
+                errors.append(f"#{i}: body['type'] (int) is required for op 'add'")
+            grade = body.get("grade") if isinstance(body, dict) else None
+            if grade and grade not in VALID_NUMISTA_GRADES_SET:
+                errors.append(f"#{i}: grade '{grade}' must be one of {VALID_NUMISTA_GRADES}")
+
+            normalized.append({"op": op, "item_id": item_id, "body": body})
+
+        if errors:
+            msg = f"{len(errors)} invalid bulk operation(s): " + "; ".join(errors[:20])
+            if len(errors) > 20:
+                msg += f"; ... {len(errors) - 20} more"
+            self.numista._except_and_log(ex_msg=msg)
+            raise ValueError(msg)
+
+        return normalized
+
+    def _fingerprint(self, operations: list = list()) -> str:
+        """A digest of the user and the normalized operations, identifying the run a checkpoint belongs to"""
+        digest = hashlib.blake2b(str(self.user_id).encode("utf-8"), digest_size=16)
+        for operation in operations:
+            digest.update(json.dumps(operation, sort_keys=True, default=str).encode("utf-8"))
+            digest.update(b"\n")
+        return digest.hexdigest()
+
+    def _load_checkpoint(self, fingerprint: str = str(), total: int = int()) -> dict:
+        """Read the outcomes already recorded in the checkpoint file, or start it with a header line of the run
+        # noqa: E501
+
+        Args:
+            fingerprint (str): The _fingerprint() of the operations
+            total (int): The number of operations
+
+        Returns:
+            dict: Outcomes by operation index
+
+        Raises:
+            ValueError: When the checkpoint file was written by a run of other operations
+        """
+        done = dict()
+        if not self.checkpoint_path:
+            return done
+        if not os.path.exists(self.checkpoint_path) or not os.path.getsize(self.checkpoint_path):
+            header = {"fingerprint": fingerprint, "operations": total}
+            with open(self.checkpoint_path, "w") as f:
+                f.write(json.dumps(header, separators=(",", ":")) + "\n")
+            return done
+
+        with open(self.checkpoint_path, "r") as f:
+            header = json.loads(f.readline() or "{}")
+            if header.get("fingerprint") != fingerprint:
+                msg = (
+                    f"The checkpoint {self.checkpoint_path} was written by a run of other "
+                    "operations, not resuming. Remove it or use another checkpoint_path"
+                )
+                self.numista._except_and_log(ex_msg=msg)
+                raise ValueError(msg)
+            for line in f:
+                if line.strip():
+                    outcome = json.loads(line)
+                    done[outcome["index"]] = outcome
+        self.logger.info(f"Loaded {len(done)} outcomes from checkpoint {self.checkpoint_path}")
+        return done
+
+    def _record(self, outcome: dict = dict()) -> None:
+        """Append an outcome to the checkpoint file"""
+        if not self.checkpoint_path:
+            return
+        record = {k: v for k, v in outcome.items() if k != "data"}
+        line = json.dumps(record, separators=(",", ":"), default=str)
+        with self._checkpoint_lock:
+            with open(self.checkpoint_path, "a") as f:
+                f.write(line + "\n")
+
+    def _send(
+        self, index: int = int(), operation: dict = dict(), add_headers: dict = dict()
+    ) -> dict:
+        """Send one operation, retrying on HTTP 429
+
+        Returns:
+            dict: The outcome of the operation
+        """
+        op = operation["op"]
+        endpoint_uri = f"/users/{self.user_id}/collected_items"
+        if op != "add":
+            endpoint_uri += f"/{operation['item_id']}"
+
+        kwargs = dict()
+        if op != "delete":
+            kwargs["body"] = operation["body"]
+
+        outcome = {"index": index, "op": op, "item_id": operation["item_id"]}
+        for attempt in range(self.retries + 1):
+            self.limiter.acquire()
+            try:
+                result = limited_call(
+                    self.concurrency,
+                    self.numista._call_api,
+                    http_method=BULK_OPERATIONS[op],
+                    endpoint_uri=endpoint_uri,
+                    add_headers=add_headers,
+                    priority=self.priority,
+                    **kwargs,
+                )
+            except Exception as err:
+                outcome.update(failed=True, http_status=0, error=str(err))
+                break
+
+            status = result["http_info"]["http_status"]
+            if status == 429 and attempt < self.retries:
+                backoff = 2**attempt
+                self.logger.info(f"Bulk #{index} got HTTP 429, retrying in {backoff}s")
+                time.sleep(backoff)
+                continue
+
+            data = result["data"]
+            failed = result["failed"] or status not in range(200, 300)
+            outcome.update(failed=failed, http_status=status)
+            if op == "add" and not failed:
+                outcome["item_id"] = data.get("id", int())
+            if failed:
+                outcome["error"] = result["http_info"]["http_msg"]
+            outcome["data"] = data
+            break
+
+        self._record(outcome)
+        return outcome
+
+    def run(self, operations: list = list()) -> dict:
+        """Validate and run the operations
+        # noqa: E501
+
+        Args:
+            operations (list): An iterable of operations. See BulkCollectionWriter
+
+        Returns:
+            dict: A report: {"total", "succeeded", "failed", "resumed", "items": [outcome, ...]} with items in input order
+
+        Raises:
+            LookupError: When no token can be found for token_label
+            ValueError: When any operation is invalid, or the checkpoint file was written by a run of other operations
+        """
+        operations = self.validate(operations)
+
+        # Resolve the user and token once for the whole batch
+        auth = self.numista._auth(
+            token_label=self.token_label, caller="BulkCollectionWriter.run"
+        )
+        if not self.user_id:
+            self.user_id = auth["user_id"]
+        add_headers = auth["headers"]
+
+        done = self._load_checkpoint(self._fingerprint(operations), len(operations))
+        outcomes = dict()
+        resumed = 0
+        for index, outcome in done.items():
+            if not outcome.get("failed") and index < len(operations):
+                outcomes[index] = {**outcome, "resumed": True}
+                resumed += 1
+
+        pending = [i for i in range(len(operations)) if i not in outcomes]
+        self.logger.info(
+            f"Bulk run of {len(operations)} operations, {resumed} resumed from checkpoint"
+        )
+
+        # Bound in-flight work so memory stays flat for very large imports
+        max_in_flight = self.workers * 4
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            in_flight = set()
+            for index in pending:
+                if len(in_flight) >= max_in_flight:
+                    finished, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        outcome = future.result()
+                        outcomes[outcome["index"]] = outcome
+                in_flight.add(
+                    pool.submit(self._send, index, operations[index], add_headers)
+                )
+            for future in in_flight:
+                outcome = future.result()
+                outcomes[outcome["index"]] = outcome
+
+        items = [outcomes[i] for i in range(len(operations))]
+        failed = sum(1 for o in items if o.get("failed"))
+        report = {
+            "total": len(items),
+            "succeeded": len(items) - failed,
+            "failed": failed,
+            "resumed": resumed,
+            "items": items,
+        }
+        self.logger.info(
+            f"Bulk run finished: {report['succeeded']} succeeded, {failed} failed"
+        )
+        return report
@@ -0,0 +1,199 @@
+"""In-memory caching of API results
+
+Attributes:
+    DEFAULT_CACHE_MAX_ENTRIES (int): Default number of entries kept before the oldest are evicted
+    DEFAULT_CACHE_TTL (int): Default number of seconds an entry is fresh for
+    DEFAULT_SWR_HARD_TTL (int): Default number of seconds a stale-while-revalidate entry may be served for
+    DEFAULT_SWR_SOFT_TTL (int): Default number of seconds a stale-while-revalidate entry is fresh for
+    DEFAULT_SWR_WORKERS (int): Default number of concurrent background refreshes
+"""
+import threading
+import time
+from collections import OrderedDict
+
+DEFAULT_CACHE_TTL = 3600
+DEFAULT_CACHE_MAX_ENTRIES = 100000
+DEFAULT_SWR_SOFT_TTL = 300
+DEFAULT_SWR_HARD_TTL = 86400
+DEFAULT_SWR_WORKERS = 2
+
+
+class TTLCache:
+    """A thread-safe, size bounded cache with per entry expiry
+
+    Attributes:
+        max_entries (int): Number of entries kept before the least recently used are evicted
+        ttl (float): Number of seconds an entry is fresh for
+    """
+
+    def __init__(
+        self, ttl: float = DEFAULT_CACHE_TTL, max_entries: int = DEFAULT_CACHE_MAX_ENTRIES
+    ):
+        """Initialize an empty cache
+        # noqa: E501
+
+        Args:
+            ttl (float, optional): Number of seconds an entry is fresh for
+            max_entries (int, optional): Number of entries kept before the least recently used are evicted
+        """
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key: (expires_at, value)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key) -> bool:
+        return self.get(key, count=False) is not None
+
+    def get(self, key=None, default=None, count: bool = True):
+        """Return a fresh entry, or default
+        # noqa: E501
+
+        Args:
+            key (hashable): The cache key
+            default (optional): Returned when the key is missing or expired
+            count (bool, optional): Count the lookup in hits/misses
+
+        Returns:
+            object: The cached value or default
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if count:
+                    self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            if count:
+                self.hits += 1
+            return entry[1]
+
+    def set(self, key=None, value=None, ttl: float = None) -> None:
+        """Store a value
+        # noqa: E501
+
+        Args:
+            key (hashable): The cache key
+            value (object): The value to store
+            ttl (float, optional): Number of seconds the entry is fresh for. Default: TTLCache().ttl
+        """
+        ttl = self.ttl if ttl is None else ttl
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def pop(self, key=None, default=None):
+        """Remove an entry and return its value, or default"""
+        with self._lock:
+            entry = self._entries.pop(key, None)
+        return default if entry is None else entry[1]
+
+    def clear(self) -> None:
+        """Remove every entry"""
+        with self._lock:
+            self._entries.clear()
+
+
+class SWRCache(TTLCache):
+    """A stale-while-revalidate cache: past its soft TTL an entry is still served, and refreshed in the background
+    Entries past the hard TTL (TTLCache().ttl) are gone, which bounds staleness. Only a miss waits for the network
+
+    Attributes:
+        refresh_errors (int): Background refreshes that raised or that cacheable rejected, the stale entry is kept
+        refreshes (int): Background refreshes that stored a new value
+        soft_ttl (float): Number of seconds an entry is fresh for
+        stale_hits (int): Lookups answered with a stale entry
+        workers (int): Number of concurrent background refreshes
+    """
+
+    def __init__(
+        self,
+        soft_ttl: float = DEFAULT_SWR_SOFT_TTL,
+        hard_ttl: float = DEFAULT_SWR_HARD_TTL,
+        max_entries: int = DEFAULT_CACHE_MAX_ENTRIES,
+        workers: int = DEFAULT_SWR_WORKERS,
+    ):
+        """Initialize an empty cache. The refresh threads start on the first stale hit
+        # noqa: E501
+
+        Args:
+            soft_ttl (float, optional): Number of seconds an entry is fresh for
+            hard_ttl (float, optional): Number of seconds an entry may be served for, stale or not
+            max_entries (int, optional): Number of entries kept before the least recently used are evicted
+            workers (int, optional): Number of concurrent background refreshes
+        """
+        super().__init__(ttl=hard_ttl, max_entries=max_entries)
+        self.soft_ttl = soft_ttl
+        self.workers = max(int(workers), 1)
+        self.stale_hits = 0
+        self.refreshes = 0
+        self.refresh_errors = 0
+        self._refreshing = set()
+        self._pool = None
+
+    def _store(self, key=None, value=None, cacheable=None) -> bool:
+        """Store a fetched value, fresh for soft_ttl, unless cacheable rejects it. Returns whether it was stored"""
+        if cacheable is not None and not cacheable(value):
+            return False
+        self.set(key, (time.monotonic() + self.soft_ttl, value))
+        return True
+
+    def _revalidate(self, key=None, refresh=None, cacheable=None) -> None:
+        """Refresh an entry in the background, once at a time per key"""
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+            if self._pool is None:
+                from concurrent.futures import ThreadPoolExecutor
+
+                self._pool = ThreadPoolExecutor(
+                    max_workers=self.workers, thread_name_prefix="numista-swr"
+                )
+
+        def task():
+            try:
+                stored = self._store(key, refresh(), cacheable)
+            except Exception:
+                stored = False
+            with self._lock:
+                self._refreshing.discard(key)
+                if stored:
+                    self.refreshes += 1
+                else:
+                    self.refresh_errors += 1  # The stale entry is served until its hard TTL
+
+        self._pool.submit(task)
+
+    def load(self, key=None, fetch=None, refresh=None, cacheable=None) -> tuple:
+        """Return the cached value, serving stale ones while they refresh in the background
+        # noqa: E501
+
+        Args:
+            key (hashable): The cache key
+            fetch (callable): Returns the value on a miss, called in the caller's thread
+            refresh (callable, optional): Returns the value for a background refresh. Default: fetch
+            cacheable (callable, optional): Takes a fetched value, returns False to not store it. Example: failed API results
+
+        Returns:
+            tuple: (value, state), state is one of "fresh", "stale" or "miss"
+        """
+        entry = self.get(key)
+        if entry is not None:
+            fresh_until, value = entry
+            if time.monotonic() < fresh_until:
+                return value, "fresh"
+            with self._lock:
+                self.stale_hits += 1
+            self._revalidate(key, refresh or fetch, cacheable)
+            return value, "stale"
+
+        value = fetch()
+        self._store(key, value, cacheable)
+        return value, "miss"
@@ -0,0 +1,245 @@
+"""Record and replay of API traffic, for deterministic offline runs
+
+Use a Cassette as the transport of a NumistaContext. Recording sends through a real transport and appends every interaction, OAuth included, to a JSON Lines cassette (gzipped when the path ends in .gz).
+Replaying loads the cassette into a dict keyed by request, so every lookup is O(1) whatever its size.
+
+Attributes:
+    CASSETTE_MODES (list): Supported cassette modes
+    CASSETTE_SCRUBBED_PARAMS (list): Request parameters whose values are never written to a cassette
+    CASSETTE_VERSION (int): Version of the cassette format
+"""
+import base64
+import gzip
+import json
+import threading
+import time
+
+CASSETTE_MODES = ["record", "replay"]
+CASSETTE_SCRUBBED_PARAMS = ["client_secret", "code"]
+CASSETTE_VERSION = 1
+
+
+class CassetteResponse:
+    """The parts of a requests.Response the client uses, rebuilt from a cassette
+
+    Attributes:
+        content (bytes): The response body
+        headers (dict): The recorded response headers
+        status_code (int): The HTTP status
+        url (str): The request URL
+    """
+
+    def __init__(
+        self, status_code: int = 200, content: bytes = b"", headers: dict = dict(), url: str = str()
+    ):
+        self.status_code = status_code
+        self.content = content
+        self.headers = dict(headers)
+        self.url = url
+
+    def __bool__(self) -> bool:
+        return self.status_code < 400
+
+    def __repr__(self) -> str:
+        return f"<CassetteResponse [{self.status_code}]>"
+
+    @property
+    def ok(self) -> bool:
+        return bool(self)
+
+    @property
+    def text(self) -> str:
+        return self.content.decode("utf-8", errors="replace")
+
+    def json(self) -> object:
+        return json.loads(self.content)
+
+
+def _scrub(params: dict = None) -> dict:
+    """Request parameters with the values of CASSETTE_SCRUBBED_PARAMS masked"""
+    return {
+        k: ("***" if k in CASSETTE_SCRUBBED_PARAMS else v) for k, v in (params or dict()).items()
+    }
+
+
+def interaction_key(
+    method: str = "GET", url: str = str(), params: dict = None, json: object = None
+) -> str:
+    """The replay key of a request: method, URL, scrubbed parameters and body. Headers (API key, token) are not part of it"""
+    return _dumps([method.upper(), url, _scrub(params), json])
+
+
+def _dumps(value: object = None) -> str:
+    return json.dumps(value, sort_keys=True, separators=(",", ":"), default=str)
+
+
+class Cassette:
+    """A transport that records API traffic to a cassette, or replays it without the network
+
+    Attributes:
+        interactions (int): Interactions recorded or loaded
+        latency (object): Replay delay: seconds (float), or "recorded" to wait as long as the recorded request took
+        misses (int): Replayed requests not found in the cassette
+        mode (str): One of CASSETTE_MODES
+        path (str): The cassette file
+    """
+
+    def __init__(
+        self,
+        path: str = str(),
+        mode: str = "replay",
+        transport: object = None,
+        latency: object = 0.0,
+    ):
+        """Open a cassette
+        # noqa: E501
+
+        Args:
+            path (str): The cassette file. Gzipped when it ends in .gz. Recording appends to it
+            mode (str, optional): One of CASSETTE_MODES
+            transport (object, optional): The transport to record through. Default: a requests.Session() created on first use
+            latency (object, optional): Replay delay: seconds (float), or "recorded" to wait as long as the recorded request took
+
+        Raises:
+            ValueError: When mode is not one of CASSETTE_MODES
+        """
+        if mode not in CASSETTE_MODES:
+            raise ValueError(f"The cassette mode ({mode}) must be one of {CASSETTE_MODES}")
+
+        self.path = path
+        self.mode = mode
+        self.latency = latency
+        self.interactions = 0
+        self.misses = 0
+
+        self._transport = transport
+        self._lock = threading.Lock()
+        self._file = None
+        self._index = dict()  # key: [interaction, ...] in recorded order
+        self._cursor = dict()  # key: next position, repeated requests replay in order
+
+        if mode == "replay":
+            self._load()
+
+    def _open(self, mode: str = "r") -> object:
+        if self.path.endswith(".gz"):
+            return gzip.open(self.path, mode + "t", encoding="utf-8")
+        return open(self.path, mode, encoding="utf-8")
+
+    def _load(self) -> None:
+        """Index every interaction of the cassette by key"""
+        with self._open("r") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                if "key" not in record:
+                    continue  # The header line
+                self._index.setdefault(record["key"], list()).append(record)
+                self.interactions += 1
+
+    def request(
+        self,
+        method: str = "GET",
+        url: str = str(),
+        headers: dict = None,
+        params: dict = None,
+        json: object = None,
+        timeout: object = None,
+        **kwargs,
+    ) -> object:
+        """Send (recording) or replay a request. Same signature as requests.Session().request()
+
+        Returns:
+            object: A requests.Response when recording, a CassetteResponse when replaying
+
+        Raises:
+            LookupError: When replaying a request that is not in the cassette
+        """
+        key = interaction_key(method, url, params, json)
+        if self.mode == "replay":
+            return self._replay(key, method, url)
+
+        if self._transport is None:
+            import requests
+
+            self._transport = requests.Session()
+        started = time.monotonic()
+        r = self._transport.request(
+            method, url, headers=headers, params=params, json=json, timeout=timeout, **kwargs
+        )
+        self._record(key, method, url, params, r, time.monotonic() - started)
+        return r
+
+    def _record(
+        self,
+        key: str = str(),
+        method: str = "GET",
+        url: str = str(),
+        params: dict = None,
+        r: object = None,
+        elapsed: float = 0.0,
+    ) -> None:
+        """Append an interaction to the cassette"""
+        try:
+            body, encoding = r.content.decode("utf-8"), "utf-8"
+        except UnicodeDecodeError:
+            body, encoding = base64.b64encode(r.content).decode("ascii"), "base64"
+        record = {
+            "key": key,
+            "method": method.upper(),
+            "url": url,
+            "params": _scrub(params),
+            "status": r.status_code,
+            "headers": {
+                k: v for k, v in r.headers.items() if k.lower() in ("content-type", "etag")
+            },
+            "body": body,
+            "encoding": encoding,
+            "elapsed": round(elapsed, 6),
+        }
+        with self._lock:
+            if self._file is None:
+                self._file = self._open("a")
+                if self._file.tell() == 0:
+                    self._file.write(_dumps({"version": CASSETTE_VERSION}) + "\n")
+            self._file.write(_dumps(record) + "\n")
+            self._file.flush()
+            self.interactions += 1
+
+    def _replay(self, key: str = str(), method: str = "GET", url: str = str()) -> CassetteResponse:
+        """The recorded response of a request. Repeated requests get their recordings in order, then the last one again"""
+        with self._lock:
+            recorded = self._index.get(key)
+            if not recorded:
+                self.misses += 1
+                raise LookupError(f"No recorded interaction for {method.upper()} {url} in {self.path}")
+            position = self._cursor.get(key, 0)
+            self._cursor[key] = position + 1
+            record = recorded[min(position, len(recorded) - 1)]
+
+        delay = record["elapsed"] if self.latency == "recorded" else float(self.latency or 0)
+        if delay:
+            time.sleep(delay)
+
+        body = record["body"]
+        content = (
+            base64.b64decode(body) if record.get("encoding") == "base64" else body.encode("utf-8")
+        )
+        return CassetteResponse(
+            status_code=record["status"], content=content, headers=record["headers"], url=url
+        )
+
+    def rewind(self) -> None:
+        """Replay repeated requests from their first recording again"""
+        with self._lock:
+            self._cursor.clear()
+
+    def close(self) -> None:
+        """Close the cassette file, and the transport recorded through"""
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+        if self._transport is not None and hasattr(self._transport, "close"):
+            self._transport.close()
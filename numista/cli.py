@@ -0,0 +1,454 @@
+"""The 'numista' command: streaming export of catalogue and collection data
+
+Examples:
+    numista types --issuer france --category coin > france.ndjson
+    numista issues --input france.ndjson --format csv -o issues.csv
+    numista prices --issue 10637:73608 --currency USD EUR
+    numista collection --checkpoint collection.ckpt -o collection.ndjson
+    numista types --issuer france --format parquet -o france_types/
+
+Attributes:
+    API_KEY_ENV (str): Environment variable the API key is read from when --api-key is not given
+    LOG_FILE (str): Log file of the command, under $XDG_STATE_HOME (default: ~/.local/state) unless --log-path is given
+"""
+import argparse
+import json
+import os
+import sys
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from numista.concurrency import AdaptiveLimiter, limited_call
+from numista.export import COLUMNAR_FORMATS, DEFAULT_BATCH_SIZE, EXPORT_FORMATS, get_writer
+from numista.numista import (
+    DEFAULT_BULK_WORKERS,
+    DEFAULT_CURRENCY,
+    DEFAULT_LANG,
+    DEFAULT_RATE_LIMIT,
+    Numista,
+)
+from numista.ratelimit import RateLimiter
+
+API_KEY_ENV = "NUMISTA_API_KEY"
+LOG_FILE = os.path.join("numista", "numista.log")
+
+
+class Exporter:
+    """Runs export jobs concurrently and streams their rows to a writer in completion order
+    At most workers * 2 jobs are in flight, so memory stays bounded whatever the export size
+
+    Attributes:
+        concurrency (AdaptiveLimiter): Adapts the number of concurrent requests to latency and HTTP 429. None keeps workers fixed
+        done (set): Keys of the jobs already completed, loaded from and recorded to the checkpoint
+        failures (int): Number of jobs that failed
+        limiter (RateLimiter): The rate limiter every request waits on
+        numista (Numista): The Numista() client used to send requests
+        workers (int): Number of concurrent requests, the maximum when concurrency is set
+        writer (object): The NDJSONWriter, CSVWriter or ColumnarWriter rows are written to
+    """
+
+    def __init__(
+        self,
+        numista,
+        writer: object = None,
+        workers: int = DEFAULT_BULK_WORKERS,
+        rate: float = DEFAULT_RATE_LIMIT,
+        checkpoint_path: str = str(),
+        concurrency: AdaptiveLimiter = None,
+    ):
+        """Initialize the exporter
+        # noqa: E501
+
+        Args:
+            numista (Numista): An instantiated Numista() client
+            writer (object): The NDJSONWriter, CSVWriter or ColumnarWriter to write rows to
+            workers (int, optional): Number of concurrent requests
+            rate (float, optional): Maximum requests per second. 0 disables limiting
+            checkpoint_path (str, optional): File completed job keys are recorded to. Jobs found in it are skipped
+            concurrency (AdaptiveLimiter, optional): Adapt the number of concurrent requests, up to its max_limit, to latency and HTTP 429. Overrides workers
+        """
+        self.numista = numista
+        self.writer = writer
+        self.concurrency = concurrency
+        self.workers = concurrency.max_limit if concurrency else max(int(workers), 1)
+        self.limiter = RateLimiter(rate=rate)
+        self.checkpoint_path = checkpoint_path
+        self.failures = 0
+
+        self.done = set()
+        if checkpoint_path and os.path.exists(checkpoint_path):
+            with open(checkpoint_path, "r") as f:
+                self.done = {line.strip() for line in f if line.strip()}
+        self._checkpoint = open(checkpoint_path, "a") if checkpoint_path else None
+        self._uncommitted = deque()
+
+    def call(self, method=None, **kwargs) -> dict:
+        """Call an API method within the rate limit
+
+        Returns:
+            dict: The result data, or None when the request failed
+        """
+        self.limiter.acquire()
+        try:
+            result = limited_call(self.concurrency, method, **kwargs)
+        except Exception as err:
+            print(f"numista: {method.__name__}({kwargs}) failed: {err}", file=sys.stderr)
+            return None
+        if result["failed"] or result["http_info"]["http_status"] != 200:
+            print(
+                f"numista: {method.__name__}({kwargs}) failed: {result['http_info']}",
+                file=sys.stderr,
+            )
+            return None
+        return result["data"]
+
+    def _finish(self, key: str = str(), rows: list = None) -> None:
+        """Write the rows of a completed job and checkpoint it"""
+        if rows is None:
+            self.failures += 1
+            return
+        for row in rows:
+            self.writer.write(row)
+        self.done.add(key)
+        if self._checkpoint:
+            # Rows must be on disk before their job is checkpointed: wait for the writer to flush them
+            self._uncommitted.append((key, self.writer.rows))
+            self._commit()
+
+    def _commit(self) -> None:
+        """Checkpoint the jobs whose rows the writer has flushed"""
+        committed = 0
+        while self._uncommitted and self._uncommitted[0][1] <= self.writer.written:
+            self._checkpoint.write(self._uncommitted.popleft()[0] + "\n")
+            committed += 1
+        if committed:
+            self._checkpoint.flush()
+
+    def run(self, jobs: object = None, fetch=None) -> None:
+        """Run jobs, skipping those already checkpointed
+        # noqa: E501
+
+        Args:
+            jobs (iterable): (key, job) tuples. Consumed lazily
+            fetch (callable): Takes a job and returns its rows as a list, or None when it failed
+        """
+
+        def task(key, job):
+            return key, fetch(job)
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            in_flight = set()
+            for key, job in jobs:
+                if key in self.done:
+                    continue
+                if len(in_flight) >= self.workers * 2:
+                    finished, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        self._finish(*future.result())
+                in_flight.add(pool.submit(task, key, job))
+            for future in in_flight:
+                self._finish(*future.result())
+
+    def close(self) -> None:
+        """Flush the writer and close the checkpoint"""
+        self.writer.close()
+        if self._checkpoint:
+            self._commit()
+            self._checkpoint.close()
+
+
+#
+# Inputs
+#
+
+
+def _input_records(path: str = str(), parse=None) -> object:
+    """Yield parse(record) for each record of a file ("-" for stdin): NDJSON objects, or comma/colon separated IDs
+
+    Records that can't be parsed are reported on stderr and skipped.
+    """
+    stream = sys.stdin if path == "-" else open(path, "r")
+    try:
+        for line in stream:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                if line.startswith("{"):
+                    record = json.loads(line)
+                else:
+                    record = [int(v) for v in line.replace(":", ",").split(",") if v.strip()]
+                parsed = parse(record)
+            except (KeyError, IndexError, TypeError, ValueError) as err:
+                print(f"numista: bad input record {line!r}: {err!r}", file=sys.stderr)
+                continue
+            yield parsed
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+
+
+def _type_id(record: object = None) -> int:
+    """The type ID of an --input record"""
+    if isinstance(record, dict):
+        return int(record.get("type_id") or record["id"])
+    return record[0]
+
+
+def _issue_id(record: object = None) -> tuple:
+    """The (type_id, issue_id) pair of an --input record"""
+    if isinstance(record, dict):
+        return int(record["type_id"]), int(record.get("issue_id") or record["id"])
+    return record[0], record[1]
+
+
+def _issue_arg(value: str = str()) -> tuple:
+    """argparse type of --issue: TYPE_ID:ISSUE_ID"""
+    try:
+        type_id, issue_id = value.split(":")
+        return int(type_id), int(issue_id)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected TYPE_ID:ISSUE_ID, got {value!r}")
+
+
+def _type_ids(args) -> object:
+    """Yield the type IDs given with --type-id and --input"""
+    yield from args.type_id or list()
+    if args.input:
+        yield from _input_records(args.input, _type_id)
+
+
+def _issue_ids(args) -> object:
+    """Yield the (type_id, issue_id) pairs given with --issue and --input"""
+    yield from args.issue or list()
+    if args.input:
+        yield from _input_records(args.input, _issue_id)
+
+
+#
+# Commands
+#
+
+
+def export_types(numista, exporter: Exporter = None, args=None) -> None:
+    """Export searchTypes() results, fetching pages concurrently"""
+    params = {
+        "q": args.q,
+        "issuer": args.issuer,
+        "category": args.category,
+        "count": args.count,
+        "lang": args.lang,
+    }
+
+    def fetch(page):
+        # searchTypes() insists on 'q' and prints when it's missing, go direct instead.
+        data = exporter.call(
+            numista._call_api, http_method="get", endpoint_uri="/types", page=page, **params
+        )
+        return None if data is None else details(data.get("types", list()))
+
+    def details(types):
+        # --details: the full getType() record of each type on the page
+        if not args.details:
+            return types
+        full = [exporter.call(numista.getType, type_id=t["id"], lang=args.lang) for t in types]
+        return None if None in full else full
+
+    first = exporter.call(
+        numista._call_api, http_method="get", endpoint_uri="/types", page=1, **params
+    )
+    if first is None:
+        exporter.failures += 1
+        return
+    if "page:1" not in exporter.done:
+        exporter._finish("page:1", details(first.get("types", list())))
+
+    pages = -(-first.get("count", 0) // args.count)  # ceil
+    exporter.run(((f"page:{p}", p) for p in range(2, pages + 1)), fetch)
+
+
+def export_issues(numista, exporter: Exporter = None, args=None) -> None:
+    """Export getIssues() for many types"""
+
+    def fetch(type_id):
+        data = exporter.call(numista.getIssues, type_id=type_id, lang=args.lang)
+        if data is None:
+            return None
+        return [{"type_id": type_id, **issue} for issue in data]
+
+    exporter.run(((f"type:{t}", t) for t in _type_ids(args)), fetch)
+
+
+def export_prices(numista, exporter: Exporter = None, args=None) -> None:
+    """Export getPrices() for many issues and currencies, one row per grade"""
+
+    def fetch(job):
+        type_id, issue_id, currency = job
+        data = exporter.call(
+            numista.getPrices,
+            type_id=type_id,
+            issue_id=issue_id,
+            currency=currency,
+            lang=args.lang,
+        )
+        if data is None:
+            return None
+        return [
+            {
+                "type_id": type_id,
+                "issue_id": issue_id,
+                "currency": data.get("currency", currency),
+                "grade": p.get("grade"),
+                "price": p.get("price"),
+            }
+            for p in data.get("prices", list())
+        ]
+
+    jobs = (
+        (f"price:{t}:{i}:{c.upper()}", (t, i, c))
+        for t, i in _issue_ids(args)
+        for c in args.currency
+    )
+    exporter.run(jobs, fetch)
+
+
+def export_collection(numista, exporter: Exporter = None, args=None) -> None:
+    """Export getCollectedItems() of a user"""
+
+    def fetch(user_id):
+        data = exporter.call(
+            numista.getCollectedItems,
+            user_id=user_id,
+            category=args.category,
+            collection=args.collection,
+        )
+        return None if data is None else data.get("items", list())
+
+    user_id = args.user_id or numista.myUserId()
+    exporter.run([(f"user:{user_id}", user_id)], fetch)
+
+
+def default_log_path() -> str:
+    """The log file of the command when --log-path is not given: LOG_FILE under $XDG_STATE_HOME, created if needed
+    Writable by the user running the command, unlike DEFAULT_LOG_PATH (/var/log)
+    """
+    state = os.environ.get("XDG_STATE_HOME") or os.path.join(
+        os.path.expanduser("~"), ".local", "state"
+    )
+    path = os.path.join(state, LOG_FILE)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    return path
+
+
+COMMANDS = {
+    "types": export_types,
+    "issues": export_issues,
+    "prices": export_prices,
+    "collection": export_collection,
+}
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """The argument parser of the 'numista' command"""
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--api-key", default=os.environ.get(API_KEY_ENV, ""),
+                        help=f"Numista API key. Default: ${API_KEY_ENV}")
+    common.add_argument("--format", choices=EXPORT_FORMATS, default="ndjson")
+    common.add_argument("-o", "--output", default="-",
+                        help="Output file, or directory for columnar formats. Default: stdout")
+    common.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE,
+                        help="Rows buffered before they are written")
+    common.add_argument("--workers", type=int, default=DEFAULT_BULK_WORKERS,
+                        help="Concurrent requests, the maximum with --adaptive")
+    common.add_argument("--adaptive", action="store_true",
+                        help="Adapt concurrency, up to --workers, to latency and HTTP 429")
+    common.add_argument("--rate", type=float, default=DEFAULT_RATE_LIMIT,
+                        help="Maximum requests per second, 0 for no limit")
+    common.add_argument("--checkpoint", default="",
+                        help="Checkpoint file. Re-run with the same file to resume")
+    common.add_argument("--lang", default=DEFAULT_LANG)
+    common.add_argument("--log-path", default="",
+                        help="Log file. Default: $XDG_STATE_HOME/numista/numista.log")
+
+    parser = argparse.ArgumentParser(prog="numista", description=__doc__.split("\n")[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    types = commands.add_parser("types", parents=[common], help="Export searchTypes() results")
+    types.add_argument("--q", default="")
+    types.add_argument("--issuer", default="")
+    types.add_argument("--category", default="")
+    types.add_argument("--count", type=int, default=50, help="Results per page")
+    types.add_argument("--details", action="store_true",
+                       help="Export the full getType() record of each type")
+
+    issues = commands.add_parser("issues", parents=[common], help="Export getIssues()")
+    issues.add_argument("--type-id", type=int, nargs="*")
+    issues.add_argument("--input", help="File of type IDs or NDJSON types, - for stdin")
+
+    prices = commands.add_parser("prices", parents=[common], help="Export getPrices()")
+    prices.add_argument("--issue", type=_issue_arg, nargs="*", help="TYPE_ID:ISSUE_ID")
+    prices.add_argument("--input", help="File of TYPE_ID,ISSUE_ID or NDJSON issues, - for stdin")
+    prices.add_argument("--currency", nargs="+", default=[DEFAULT_CURRENCY])
+
+    collection = commands.add_parser(
+        "collection", parents=[common], help="Export getCollectedItems()"
+    )
+    collection.add_argument("--user-id", type=int, default=0, help="Default: your own")
+    collection.add_argument("--category", default="")
+    collection.add_argument("--collection", type=int, default=0)
+
+    return parser
+
+
+def main(argv: list = None) -> int:
+    """Entry point of the 'numista' command
+
+    Returns:
+        int: The exit code. 1 when any request failed
+    """
+    args = build_parser().parse_args(argv)
+    if not args.api_key:
+        print(f"numista: an API key is required (--api-key or ${API_KEY_ENV})", file=sys.stderr)
+        return 2
+
+    numista = Numista(api_key=args.api_key, log_path=args.log_path or default_log_path(), lazy=True)
+
+    # When resuming, rows of completed jobs are already in the output: append to it.
+    # Columnar formats write a directory, to which each run adds a part file.
+    resuming = bool(args.checkpoint) and os.path.exists(args.checkpoint)
+    stream = None
+    if args.format in COLUMNAR_FORMATS:
+        if args.output == "-":
+            print(f"numista: --format {args.format} needs an output directory (-o)", file=sys.stderr)
+            return 2
+        writer = get_writer(args.format, path=args.output, batch_size=args.batch_size)
+    else:
+        if args.output == "-":
+            stream = sys.stdout
+        else:
+            stream = open(args.output, "a" if resuming else "w", newline="")
+        kwargs = {"batch_size": args.batch_size}
+        if args.format == "csv":
+            kwargs["header"] = not (resuming and stream is not sys.stdout and stream.tell() > 0)
+        writer = get_writer(args.format, stream, **kwargs)
+
+    exporter = Exporter(
+        numista,
+        writer=writer,
+        workers=args.workers,
+        rate=args.rate,
+        checkpoint_path=args.checkpoint,
+        concurrency=AdaptiveLimiter(max_limit=args.workers) if args.adaptive else None,
+    )
+    try:
+        COMMANDS[args.command](numista, exporter, args)
+    finally:
+        exporter.close()
+        if stream not in (None, sys.stdout):
+            stream.close()
+
+    return 1 if exporter.failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,195 @@
+"""Adaptive concurrency of the batch helpers, driven by observed latency and HTTP 429
+
+Attributes:
+    DEFAULT_ADAPTIVE_DECREASE (float): Default factor the limit is multiplied by on overload
+    DEFAULT_ADAPTIVE_MAX (int): Default maximum concurrent requests
+    DEFAULT_LATENCY_TOLERANCE (float): Default latency, as a multiple of the baseline, above which requests count as overloaded
+"""
+import threading
+import time
+from contextlib import contextmanager
+
+from numista.numista import DEFAULT_BULK_WORKERS
+
+DEFAULT_ADAPTIVE_DECREASE = 0.5
+DEFAULT_ADAPTIVE_MAX = 32
+DEFAULT_LATENCY_TOLERANCE = 2.0
+
+
+class AdaptiveLimiter:
+    """An AIMD (additive increase, multiplicative decrease) limit on concurrent requests
+    While requests succeed at a healthy latency, the limit grows by `increase` per limit's worth of completed requests. An HTTP 429, a 5xx, a transport error or a recent latency above latency_tolerance times the baseline (the long-run average) multiplies it by `decrease`, at most once per round trip
+
+    Attributes:
+        decrease (float): Factor the limit is multiplied by on overload
+        increase (float): Requests added to the limit per limit's worth of healthy requests
+        latency_tolerance (float): Recent latency, as a multiple of the baseline (the long-run average latency), above which requests count as overloaded
+        max_limit (int): Maximum concurrent requests. Size thread pools with it
+        min_limit (int): Minimum concurrent requests
+    """
+
+    def __init__(
+        self,
+        initial: int = DEFAULT_BULK_WORKERS,
+        min_limit: int = 1,
+        max_limit: int = DEFAULT_ADAPTIVE_MAX,
+        increase: float = 1.0,
+        decrease: float = DEFAULT_ADAPTIVE_DECREASE,
+        latency_tolerance: float = DEFAULT_LATENCY_TOLERANCE,
+    ):
+        """Initialize the limiter
+        # noqa: E501
+
+        Args:
+            initial (int, optional): Concurrent requests to start with
+            min_limit (int, optional): Minimum concurrent requests
+            max_limit (int, optional): Maximum concurrent requests
+            increase (float, optional): Requests added to the limit per limit's worth of healthy requests
+            decrease (float, optional): Factor (between 0 and 1) the limit is multiplied by on overload
+            latency_tolerance (float, optional): Latency, as a multiple of the baseline, above which requests count as overloaded. 0 ignores latency
+
+        Raises:
+            ValueError: When decrease is not between 0 and 1
+        """
+        if not 0 < decrease < 1:
+            raise ValueError(f"The decrease ({decrease}) must be between 0 and 1")
+        self.min_limit = max(int(min_limit), 1)
+        self.max_limit = max(int(max_limit), self.min_limit)
+        self.increase = float(increase)
+        self.decrease = float(decrease)
+        self.latency_tolerance = float(latency_tolerance)
+
+        self._limit = float(min(max(int(initial), self.min_limit), self.max_limit))
+        self._in_flight = 0
+        self._baseline = None  # Long-run average latency
+        self._latency = None  # Recent average latency
+        self._last_decrease = 0.0
+        self._increases = 0
+        self._decreases = 0
+        self._cond = threading.Condition()
+
+    @property
+    def limit(self) -> int:
+        """The current limit on concurrent requests"""
+        return int(self._limit)
+
+    @property
+    def in_flight(self) -> int:
+        """Requests acquired and not released yet"""
+        return self._in_flight
+
+    def acquire(self, timeout: float = None) -> float:
+        """Block until fewer than limit requests are in flight. Call release() once the request completed
+        # noqa: E501
+
+        Args:
+            timeout (float, optional): Seconds to wait. None waits as long as needed
+
+        Returns:
+            float: The start time of the request, to pass to release()
+
+        Raises:
+            TimeoutError: When no slot was free within timeout
+        """
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._in_flight < int(self._limit), timeout):
+                raise TimeoutError(
+                    f"No concurrency slot was free within {timeout}s (limit: {self.limit})"
+                )
+            self._in_flight += 1
+        return time.monotonic()
+
+    def release(self, started: float = 0.0, status: int = 200) -> None:
+        """Free the slot of a request and adapt the limit to its outcome
+        # noqa: E501
+
+        Args:
+            started (float): The start time returned by acquire()
+            status (int, optional): The HTTP status of the response. 0 for a transport error (Example: a timeout)
+        """
+        now = time.monotonic()
+        latency = now - started
+        with self._cond:
+            saturated = self._in_flight >= int(self._limit)
+            self._in_flight -= 1
+
+            overloaded = status == 429 or status == 0 or status >= 500
+            if not overloaded:
+                overloaded = self._observe(latency)
+
+            if overloaded:
+                # Requests started before the last decrease saw the old limit, don't punish it twice
+                if started >= self._last_decrease:
+                    self._limit = max(self._limit * self.decrease, float(self.min_limit))
+                    self._last_decrease = now
+                    self._decreases += 1
+            elif saturated and self._limit < self.max_limit:
+                # Only grow a limit that is being used
+                self._limit = min(self._limit + self.increase / self._limit, float(self.max_limit))
+                self._increases += 1
+            self._cond.notify_all()
+
+    def _observe(self, latency: float = 0.0) -> bool:
+        """Update the baseline and recent latency with a successful request
+
+        Returns:
+            bool: Whether the recent latency shows overload
+        """
+        if self._baseline is None:
+            self._baseline = self._latency = latency
+        else:
+            self._baseline += (latency - self._baseline) * 0.02  # Long-run average
+            self._latency += (latency - self._latency) * 0.2  # Recent average
+        if self.latency_tolerance <= 0 or not self._baseline:
+            return False
+        return self._latency > self._baseline * self.latency_tolerance
+
+    @contextmanager
+    def slot(self, timeout: float = None):
+        """acquire() and release() around a block. Set the response's HTTP status on the yielded dict
+        Example: with limiter.slot() as outcome: outcome["status"] = result["http_info"]["http_status"]
+        """
+        outcome = {"status": 200}
+        started = self.acquire(timeout=timeout)
+        try:
+            yield outcome
+        except Exception:
+            outcome["status"] = 0
+            raise
+        finally:
+            self.release(started, status=outcome["status"])
+
+    def call(self, method=None, **kwargs) -> dict:
+        """Call a Numista() method within the limit, adapting it to the result's HTTP status
+        Example: limiter.call(numista.getPrices, type_id=420, issue_id=1)
+
+        Returns:
+            dict: The result of the method
+        """
+        with self.slot() as outcome:
+            result = method(**kwargs)
+            outcome["status"] = result["http_info"]["http_status"]
+        return result
+
+    def stats(self) -> dict:
+        """The current limit and what drove it
+
+        Returns:
+            dict: {"limit", "in_flight", "increases", "decreases", "baseline_latency", "latency"}
+        """
+        with self._cond:
+            return {
+                "limit": self.limit,
+                "in_flight": self._in_flight,
+                "increases": self._increases,
+                "decreases": self._decreases,
+                "baseline_latency": self._baseline,
+                "latency": self._latency,
+            }
+
+
+def limited_call(concurrency: AdaptiveLimiter = None, method=None, **kwargs) -> dict:
+    """Call a Numista() method within an AdaptiveLimiter, or straight away when concurrency is None"""
+    if concurrency is None:
+        return method(**kwargs)
+    return concurrency.call(method, **kwargs)
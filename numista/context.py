@@ -0,0 +1,80 @@
+"""State that many Numista() clients can share: transport, cache and token store"""
+import threading
+
+from numista.cache import TTLCache
+from numista.transfer import TransferStats
+
+
+class NumistaContext:
+    """Shared transport, cache and token store for Numista() clients
+    Build one per process (or per worker) and pass it to every Numista(context=...)
+
+    Attributes:
+        auth (dict): User ID, token and Authorization header by token label, resolved once per token. See Numista()._auth()
+        breaker (CircuitBreaker): Fails requests fast, per endpoint, while the API is failing. None to always send
+        cache (TTLCache): Cache shared by the clients. Example: price lookups of valueCollection()
+        hedge (HedgePolicy): Sends a duplicate of GETs slower than their endpoint's latency percentile, within a budget. None to never hedge
+        lock (object): Re-entrant lock guarding the shared state. Never held during network I/O, see token_lock()
+        oauthTokens (dict): Dictionary containing all generated tokens by label
+        scheduler (RequestScheduler): Orders the requests of every client by priority, None to send them straight away
+        swr (SWRCache): Serves getType(), getIssuers() and getPrices() from cache, refreshing stale entries in the background. None to always send
+        transfer (TransferStats): Response bytes on the wire against decoded, per endpoint, of every client
+    """
+
+    def __init__(
+        self,
+        cache: TTLCache = None,
+        transport: object = None,
+        scheduler: object = None,
+        breaker: object = None,
+        swr: object = None,
+        hedge: object = None,
+    ):
+        """Initialize the context. Nothing is opened until first use
+        # noqa: E501
+
+        Args:
+            cache (TTLCache, optional): A cache to share. Default: a new TTLCache()
+            transport (object, optional): An object with a requests.Session compatible request() method. Default: a requests.Session() created on first use
+            scheduler (RequestScheduler, optional): Scheduler every request of the clients goes through. Default: none
+            breaker (CircuitBreaker, optional): Circuit breaker every request of the clients goes through. Default: none
+            swr (SWRCache, optional): Stale-while-revalidate cache for getType(), getIssuers() and getPrices(). Default: none
+            hedge (HedgePolicy, optional): Hedging of the clients' GET requests. Default: none
+        """
+        self.cache = cache if cache is not None else TTLCache()
+        self.oauthTokens = dict()
+        self.auth = dict()
+        self.lock = threading.RLock()
+        self.scheduler = scheduler
+        self.breaker = breaker
+        self.swr = swr
+        self.hedge = hedge
+        self.transfer = TransferStats()
+        self._transport = transport
+        self._token_locks = dict()  # token label: lock
+
+    @property
+    def transport(self) -> object:
+        """The HTTP transport, a pooled requests.Session() unless one was provided"""
+        if self._transport is None:
+            with self.lock:
+                if self._transport is None:
+                    import requests
+
+                    self._transport = requests.Session()
+        return self._transport
+
+    @transport.setter
+    def transport(self, transport: object = None) -> None:
+        self._transport = transport
+
+    def token_lock(self, token_label: str = "self") -> object:
+        """The lock serializing the generation of a token label: concurrent callers wait for one OAuth request, other requests are not held up"""
+        with self.lock:
+            return self._token_locks.setdefault(token_label, threading.Lock())
+
+    def close(self) -> None:
+        """Close the transport's pooled connections"""
+        transport, self._transport = self._transport, None
+        if transport is not None and hasattr(transport, "close"):
+            transport.close()
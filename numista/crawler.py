@@ -0,0 +1,323 @@
+"""Multi-process harvesting of the whole catalogue, sharded by issuer or category
+
+Attributes:
+    CRAWL_CATEGORIES (list): Category shards when sharding by category
+    CRAWL_MERGED_FILE (str): File name of the merged output
+    CRAWL_SHARD_KEYS (list): Supported shard keys
+    CRAWL_SHARDS_DIR (str): Directory (inside the crawl path) of the per-shard outputs
+    DEFAULT_CRAWL_PATH (str): Default directory for crawl outputs
+"""
+import json
+import os
+import time
+from urllib.parse import quote
+
+from numista.export import NDJSONWriter
+from numista.numista import DEFAULT_BULK_WORKERS, DEFAULT_LANG, DEFAULT_RATE_LIMIT
+
+CRAWL_CATEGORIES = ["coin", "banknote", "exonumia"]
+CRAWL_MERGED_FILE = "types.ndjson"
+CRAWL_SHARD_KEYS = ["issuer", "category"]
+CRAWL_SHARDS_DIR = "shards"
+DEFAULT_CRAWL_PATH = "./numista_crawl"
+
+_WORKER = dict()  # The client and limiter of a crawler process, set by _init_worker()
+
+
+def _init_worker(
+    api_key: str = str(),
+    api_ver: int = int(),
+    log_path: str = str(),
+    debug: bool = False,
+    limiter: object = None,
+) -> None:
+    """Build the Numista() client of a crawler process, once per process"""
+    from numista.numista import Numista
+
+    _WORKER["numista"] = Numista(
+        api_key=api_key, api_ver=api_ver, log_path=log_path, debug=debug, lazy=True
+    )
+    _WORKER["limiter"] = limiter
+
+
+def _crawl_shard(
+    shard: str = str(),
+    filters: dict = dict(),
+    output: str = str(),
+    workers: int = DEFAULT_BULK_WORKERS,
+    details: bool = True,
+    issues: bool = True,
+    lang: str = DEFAULT_LANG,
+    count: int = 50,
+) -> dict:
+    """Harvest one shard in a crawler process: pages in order, types on a thread pool
+    Written to output + ".part", renamed to output once every type succeeded
+    # noqa: E501
+
+    Returns:
+        dict: {"shard", "types", "failed", "seconds"}
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    numista = _WORKER["numista"]
+    limiter = _WORKER["limiter"]
+    started = time.monotonic()
+    report = {"shard": shard, "types": 0, "failed": 0, "seconds": 0.0}
+
+    def call(method, **kwargs):
+        limiter.acquire()
+        result = method(**kwargs)
+        if result["failed"] or result["http_info"]["http_status"] != 200:
+            numista.logger.info(f"Crawl of {shard}: {kwargs} failed: {result['http_info']}")
+            return None
+        return result["data"]
+
+    def fetch(summary):
+        record = summary
+        if details:
+            record = call(numista.getType, type_id=summary["id"], lang=lang)
+            if record is None:
+                return None
+        if issues:
+            data = call(numista.getIssues, type_id=summary["id"], lang=lang)
+            if data is None:
+                return None
+            record = {**record, "issues": data}
+        return record
+
+    part = output + ".part"
+    with open(part, "w") as stream, ThreadPoolExecutor(max_workers=workers) as pool:
+        writer = NDJSONWriter(stream)
+        page = 1
+        seen = 0
+        while True:
+            # searchTypes() insists on 'q' and prints when it's missing, go direct instead.
+            data = call(
+                numista._call_api,
+                http_method="get",
+                endpoint_uri="/types",
+                page=page,
+                count=count,
+                lang=lang,
+                **filters,
+            )
+            if data is None:
+                report["failed"] += 1
+                break
+            summaries = data.get("types", list())
+            for record in pool.map(fetch, summaries):
+                if record is None:
+                    report["failed"] += 1
+                else:
+                    writer.write(record)
+                    report["types"] += 1
+            seen += len(summaries)
+            if not summaries or seen >= data.get("count", 0):
+                break
+            page += 1
+        writer.close()
+
+    if not report["failed"]:
+        os.replace(part, output)
+    report["seconds"] = time.monotonic() - started
+    return report
+
+
+class CatalogueCrawler:
+    """Harvests the catalogue with a process pool, one shard (issuer or category) per task
+    Every process shares one rate budget. Each shard is written to its own file, merge() joins them
+
+    Attributes:
+        logger (object): The logger class is attached here
+        numista (Numista): The Numista() client used to list shards. Its API key is used by every process
+        path (str): Directory the shard outputs and the merged output are written to
+        processes (int): Number of crawler processes
+        rate (float): Maximum requests per second, across every process
+        shard_by (str): One of CRAWL_SHARD_KEYS
+        workers (int): Number of concurrent requests per process
+    """
+
+    def __init__(
+        self,
+        numista,
+        path: str = DEFAULT_CRAWL_PATH,
+        shard_by: str = "issuer",
+        processes: int = int(),
+        workers: int = DEFAULT_BULK_WORKERS,
+        rate: float = DEFAULT_RATE_LIMIT,
+        details: bool = True,
+        issues: bool = True,
+        lang: str = DEFAULT_LANG,
+        count: int = 50,
+    ):
+        """Initialize the crawler
+        # noqa: E501
+
+        Args:
+            numista (Numista): An instantiated Numista() client
+            path (str, optional): Directory to write to, created if missing
+            shard_by (str, optional): One of CRAWL_SHARD_KEYS
+            processes (int, optional): Number of crawler processes. Default: one per CPU
+            workers (int, optional): Number of concurrent requests per process
+            rate (float, optional): Maximum requests per second, across every process. 0 disables limiting
+            details (bool, optional): Fetch the full record of each type with getType()
+            issues (bool, optional): Add the issues of each type (getIssues()) to its record as "issues"
+            lang (str, optional): Language. Available values : en, es, fr. Default value : en
+            count (int, optional): Results per page. Default value : 50
+
+        Raises:
+            ValueError: When shard_by is not one of CRAWL_SHARD_KEYS
+        """
+        self.numista = numista
+        self.logger = numista.logger
+
+        if shard_by not in CRAWL_SHARD_KEYS:
+            msg = f"shard_by ({shard_by}) must be one of {CRAWL_SHARD_KEYS}"
+            self.numista._except_and_log(ex_msg=msg)
+            raise ValueError(msg)
+
+        self.path = path
+        self.shard_by = shard_by
+        self.processes = processes or os.cpu_count() or 1
+        self.workers = max(int(workers), 1)
+        self.rate = rate
+        self.details = details
+        self.issues = issues
+        self.lang = lang
+        self.count = count
+
+        os.makedirs(os.path.join(path, CRAWL_SHARDS_DIR), exist_ok=True)
+
+    def _shard_file(self, shard: str = str()) -> str:
+        """Path of the output of a shard"""
+        name = quote(f"{self.shard_by}-{shard}", safe="")
+        return os.path.join(self.path, CRAWL_SHARDS_DIR, f"{name}.ndjson")
+
+    def shards(self) -> list:
+        """The shards to crawl: every issuer code (getIssuers()), or CRAWL_CATEGORIES
+
+        Returns:
+            list: Issuer codes or categories
+
+        Raises:
+            ValueError: When the issuers could not be fetched
+        """
+        if self.shard_by == "category":
+            return list(CRAWL_CATEGORIES)
+
+        result = self.numista.getIssuers(lang=self.lang)
+        if result["failed"] or result["http_info"]["http_status"] != 200:
+            msg = f"getIssuers() failed: {result['http_info']}"
+            self.numista._except_and_log(ex_msg=msg)
+            raise ValueError(msg)
+        return [issuer["code"] for issuer in result["data"].get("issuers", list())]
+
+    def run(self, shards: list = None) -> dict:
+        """Crawl shards on the process pool. Shards already completed are skipped, so an interrupted crawl resumes
+        # noqa: E501
+
+        Args:
+            shards (list, optional): Issuer codes or categories. Default: shards()
+
+        Returns:
+            dict: {"shards", "completed", "skipped", "failed": [shards], "types", "seconds"}
+        """
+        from concurrent.futures import ProcessPoolExecutor, as_completed
+
+        from numista.ratelimit import SharedRateLimiter
+
+        started = time.monotonic()
+        shards = self.shards() if shards is None else list(shards)
+        todo = [s for s in shards if not os.path.exists(self._shard_file(s))]
+        report = {
+            "shards": len(shards),
+            "completed": 0,
+            "skipped": len(shards) - len(todo),
+            "failed": list(),
+            "types": 0,
+            "seconds": 0.0,
+        }
+        self.logger.info(
+            f"Crawling {len(todo)} of {len(shards)} {self.shard_by} shards "
+            f"with {self.processes} processes at {self.rate} requests/s"
+        )
+
+        limiter = SharedRateLimiter(rate=self.rate)
+        initargs = (
+            self.numista.inputs["api_key"],
+            self.numista.inputs["api_ver"],
+            self.numista._log_path,
+            self.numista._debug,
+            limiter,
+        )
+        with ProcessPoolExecutor(
+            max_workers=self.processes, initializer=_init_worker, initargs=initargs
+        ) as pool:
+            futures = {
+                pool.submit(
+                    _crawl_shard,
+                    shard=shard,
+                    filters={self.shard_by: shard},
+                    output=self._shard_file(shard),
+                    workers=self.workers,
+                    details=self.details,
+                    issues=self.issues,
+                    lang=self.lang,
+                    count=self.count,
+                ): shard
+                for shard in todo
+            }
+            for future in as_completed(futures):
+                shard = futures[future]
+                try:
+                    result = future.result()
+                except Exception as err:
+                    self.logger.warning(f"Crawl of shard {shard} raised: {err}")
+                    report["failed"].append(shard)
+                    continue
+                report["types"] += result["types"]
+                if result["failed"]:
+                    report["failed"].append(shard)
+                else:
+                    report["completed"] += 1
+                self.logger.debug(f"Crawl of shard {shard}: {result}")
+
+        report["seconds"] = time.monotonic() - started
+        self.logger.info(f"Crawl finished: {report}")
+        return report
+
+    def merge(self, shards: list = None) -> int:
+        """Join completed shard outputs into one file, each type once
+        # noqa: E501
+
+        Args:
+            shards (list, optional): Shards to merge. Default: every completed shard in the crawl path
+
+        Returns:
+            int: The number of types written to the merged file
+        """
+        shards_dir = os.path.join(self.path, CRAWL_SHARDS_DIR)
+        if shards is None:
+            files = sorted(
+                os.path.join(shards_dir, f) for f in os.listdir(shards_dir) if f.endswith(".ndjson")
+            )
+        else:
+            files = [self._shard_file(s) for s in shards if os.path.exists(self._shard_file(s))]
+
+        seen = set()
+        merged = os.path.join(self.path, CRAWL_MERGED_FILE)
+        with open(merged + ".tmp", "w") as out:
+            for name in files:
+                with open(name, "r") as f:
+                    for line in f:
+                        if not line.strip():
+                            continue
+                        type_id = json.loads(line)["id"]
+                        if type_id in seen:
+                            continue
+                        seen.add(type_id)
+                        out.write(line if line.endswith("\n") else line + "\n")
+        os.replace(merged + ".tmp", merged)
+
+        self.logger.info(f"Merged {len(files)} shards, {len(seen)} types, into {merged}")
+        return len(seen)
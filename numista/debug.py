@@ -0,0 +1,130 @@
+"""Bounded capture of request/response summaries for debugging
+
+Attributes:
+    DEFAULT_DEBUG_BODY (int): Default number of characters of each body kept
+    DEFAULT_DEBUG_SIZE (int): Default number of requests kept
+    DEBUG_SCRUBBED_PARAMS (list): Request parameters whose values are never captured
+"""
+import json
+import threading
+import time
+from collections import deque
+
+DEFAULT_DEBUG_BODY = 2048
+DEFAULT_DEBUG_SIZE = 100
+DEBUG_SCRUBBED_PARAMS = ["client_secret", "code"]
+
+
+class DebugLog:
+    """A ring buffer of the last requests: method, URL, status, timing, sizes and truncated bodies
+    Memory is bounded by size and body_limit whatever the traffic. Responses themselves are never kept
+
+    Attributes:
+        body_limit (int): Characters of each request/response body kept. 0 keeps none, None keeps them whole
+        size (int): Number of requests kept, older ones are dropped
+    """
+
+    def __init__(self, size: int = DEFAULT_DEBUG_SIZE, body_limit: int = DEFAULT_DEBUG_BODY):
+        """Initialize an empty log
+        # noqa: E501
+
+        Args:
+            size (int, optional): Number of requests kept
+            body_limit (int, optional): Characters of each request/response body kept. 0 keeps none, None keeps them whole
+        """
+        self.size = max(int(size), 1)
+        self.body_limit = body_limit
+        self._entries = deque(maxlen=self.size)
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _body(self, body: object = None) -> str:
+        """A body as text, truncated to body_limit"""
+        if body is None or self.body_limit == 0:
+            return None
+        if not isinstance(body, (bytes, str)):
+            body = json.dumps(body, default=str)
+        total = len(body)
+        if self.body_limit is not None and total > self.body_limit:
+            body = body[: self.body_limit]
+        else:
+            total = None
+        if isinstance(body, bytes):
+            body = body.decode("utf-8", errors="replace")
+        if total is not None:
+            body += f"... ({total} total)"
+        return body
+
+    def record(
+        self,
+        method: str = "GET",
+        url: str = str(),
+        endpoint: str = str(),
+        params: dict = None,
+        request_body: object = None,
+        status: int = 0,
+        elapsed: float = 0.0,
+        wire_bytes: int = 0,
+        decoded_bytes: int = 0,
+        response_body: object = None,
+        error: object = None,
+    ) -> dict:
+        """Capture one request
+        # noqa: E501
+
+        Args:
+            method (str): The HTTP method
+            url (str): The request URL
+            endpoint (str, optional): The endpoint template. Example: "GET /types/{id}"
+            params (dict, optional): GET parameters. DEBUG_SCRUBBED_PARAMS are masked
+            request_body (object, optional): The JSON body sent
+            status (int, optional): The HTTP status. 0 when no response was received
+            elapsed (float, optional): Seconds from sending to the response
+            wire_bytes (int, optional): Response bytes received, before decompression
+            decoded_bytes (int, optional): Response bytes after decompression
+            response_body (bytes, optional): The response body. None when it was not read (Example: streamed)
+            error (object, optional): The exception raised by the transport
+
+        Returns:
+            dict: The captured entry
+        """
+        entry = {
+            "time": time.time(),
+            "thread": threading.current_thread().name,
+            "method": method.upper(),
+            "url": url,
+            "endpoint": endpoint,
+            "params": {
+                k: ("***" if k in DEBUG_SCRUBBED_PARAMS else v)
+                for k, v in (params or dict()).items()
+            },
+            "request_body": self._body(request_body),
+            "status": status,
+            "elapsed": round(elapsed, 6),
+            "wire_bytes": wire_bytes,
+            "decoded_bytes": decoded_bytes,
+            "response_body": self._body(response_body),
+            "error": repr(error) if error is not None else None,
+        }
+        with self._lock:
+            self._entries.append(entry)
+        return entry
+
+    def last(self, n: int = 10) -> list:
+        """The last n requests, oldest first"""
+        with self._lock:
+            entries = list(self._entries)
+        return entries[-n:] if n > 0 else list()
+
+    def failures(self, n: int = 10) -> list:
+        """The last n failed requests (transport errors and HTTP statuses of 400 and above), oldest first"""
+        with self._lock:
+            failed = [e for e in self._entries if e["status"] == 0 or e["status"] >= 400]
+        return failed[-n:] if n > 0 else list()
+
+    def clear(self) -> None:
+        """Drop every captured request"""
+        with self._lock:
+            self._entries.clear()
@@ -0,0 +1,441 @@
+"""Streaming writers for exported records
+
+Row formats (ndjson, csv) write to a text stream. Columnar formats write typed columns, in batches, to a directory:
+"columns" is one JSON Lines file per column, "parquet" and "feather" need pyarrow (pip install numista[arrow]).
+Each session of a columnar writer resumes the schema kept in schema.json and, for parquet and feather, adds a part file, so interrupted exports can be resumed.
+read_columns() only reads the columns asked for.
+
+Attributes:
+    COLUMN_TYPES (dict): Column types of columnar formats, with the Python type they are coerced to
+    COLUMNAR_FORMATS (list): Supported columnar export formats, written to a directory
+    DEFAULT_BATCH_SIZE (int): Rows buffered before a writer flushes
+    EXPORT_FORMATS (list): Supported export formats
+    FLATTEN_SEPARATOR (str): Separator between the keys of nested fields in flattened records
+"""
+import csv
+import json
+import os
+from urllib.parse import quote
+
+from numista.optional import load_pyarrow
+
+COLUMN_TYPES = {"bool": bool, "int": int, "float": float, "str": str}
+COLUMNAR_FORMATS = ["columns", "parquet", "feather"]
+DEFAULT_BATCH_SIZE = 10000
+EXPORT_FORMATS = ["ndjson", "csv", *COLUMNAR_FORMATS]
+FLATTEN_SEPARATOR = "."
+
+
+def flatten(record: dict = dict(), sep: str = FLATTEN_SEPARATOR, prefix: str = str()) -> dict:
+    """Flatten nested dicts into a single level with joined keys
+    Lists are kept as JSON strings. Example: {"issuer": {"code": "france"}} -> {"issuer.code": "france"}
+    # noqa: E501
+
+    Args:
+        record (dict): The record to flatten
+        sep (str, optional): Separator between the keys of nested fields
+        prefix (str, optional): Prefix for every key, used when recursing
+
+    Returns:
+        dict: The flattened record
+    """
+    flat = dict()
+    for key, value in record.items():
+        name = f"{prefix}{sep}{key}" if prefix else str(key)
+        if isinstance(value, dict):
+            flat.update(flatten(value, sep=sep, prefix=name))
+        elif isinstance(value, list):
+            flat[name] = json.dumps(value, separators=(",", ":"))
+        else:
+            flat[name] = value
+    return flat
+
+
+class NDJSONWriter:
+    """Writes one JSON document per line
+
+    Attributes:
+        rows (int): Records written
+        written (int): Records flushed to the stream's file
+    """
+
+    def __init__(self, stream: object = None, batch_size: int = DEFAULT_BATCH_SIZE):
+        """Initialize the writer
+        # noqa: E501
+
+        Args:
+            stream (object): A text file object to write to
+            batch_size (int, optional): Records written between flushes
+        """
+        self.stream = stream
+        self.batch_size = max(int(batch_size), 1)
+        self.rows = 0
+        self.written = 0
+
+    def write(self, record: dict = dict()) -> None:
+        """Write a record"""
+        self.stream.write(json.dumps(record, separators=(",", ":"), default=str) + "\n")
+        self.rows += 1
+        if self.rows - self.written >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        """Flush the stream"""
+        self.stream.flush()
+        self.written = self.rows
+
+    def close(self) -> None:
+        """Flush the stream. It is left open"""
+        self.flush()
+
+
+class CSVWriter(NDJSONWriter):
+    """Writes flattened records as CSV
+    Columns are taken from the first record, fields that later records add are dropped
+
+    Attributes:
+        fields (list): The CSV columns
+    """
+
+    def __init__(
+        self,
+        stream: object = None,
+        fields: list = list(),
+        header: bool = True,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+    ):
+        """Initialize the writer
+        # noqa: E501
+
+        Args:
+            stream (object): A text file object to write to
+            fields (list, optional): The CSV columns. Default: the keys of the first (flattened) record
+            header (bool, optional): Write the header line. Disable when appending to an existing file
+            batch_size (int, optional): Records written between flushes
+        """
+        super().__init__(stream, batch_size=batch_size)
+        self.fields = list(fields)
+        self.header = header
+        self._writer = None
+
+    def write(self, record: dict = dict()) -> None:
+        """Write a record"""
+        row = flatten(record)
+        if self._writer is None:
+            self.fields = self.fields or list(row)
+            self._writer = csv.DictWriter(
+                self.stream, fieldnames=self.fields, extrasaction="ignore"
+            )
+            if self.header:
+                self._writer.writeheader()
+        self._writer.writerow(row)
+        self.rows += 1
+        if self.rows - self.written >= self.batch_size:
+            self.flush()
+
+
+def column_type(values: list = list()) -> str:
+    """Infer the type of a column from its values. None is ignored
+    Mixed ints and floats are "float", any other mix is "str"
+
+    Returns:
+        str: One of COLUMN_TYPES, None when every value is None
+    """
+    kinds = {type(v) for v in values if v is not None}
+    if not kinds:
+        return None
+    if kinds == {bool}:
+        return "bool"
+    if kinds == {int}:
+        return "int"
+    if kinds <= {int, float}:
+        return "float"
+    return "str"
+
+
+def widen_type(kind: str = None, other: str = None) -> str:
+    """The narrowest column type holding the values of two column types
+    int and float widen to "float", any other mix to "str". None (no values yet) takes the other type
+
+    Returns:
+        str: One of COLUMN_TYPES, or None when both are None
+    """
+    if kind is None or kind == other:
+        return other
+    if other is None:
+        return kind
+    if {kind, other} == {"int", "float"}:
+        return "float"
+    return "str"
+
+
+def _coerce(values: list = list(), kind: str = "str") -> list:
+    """Coerce values to a column type they fit, see widen_type()"""
+    if kind is None:
+        return list(values)
+    cast = COLUMN_TYPES[kind]
+    return [v if v is None or type(v) is cast else cast(v) for v in values]
+
+
+class ColumnarWriter:
+    """Writes flattened records as typed columns, in batches
+    The schema grows with the data and is kept in schema.json across sessions: a field first seen in a later record adds a column, null in the rows before it, and a batch that does not fit a column's type widens it (int to float to str). Values are never truncated or dropped. Parquet and feather start a new part file when the schema changes, and read_columns() casts every part to the widest types
+
+    Attributes:
+        fmt (str): One of COLUMNAR_FORMATS
+        path (str): The directory written to
+        rows (int): Records written
+        types (dict): Column name to column type (one of COLUMN_TYPES, None while a column only had nulls), as of the last batch written to the directory
+        written (int): Records flushed to disk
+    """
+
+    def __init__(
+        self,
+        path: str = str(),
+        fmt: str = "columns",
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        fields: list = list(),
+    ):
+        """Initialize the writer, resuming the schema of the directory. Nothing is written until the first batch is full or flush() is called
+        # noqa: E501
+
+        Args:
+            path (str): Directory to write to. Created if needed
+            fmt (str, optional): One of COLUMNAR_FORMATS
+            batch_size (int, optional): Records buffered before a batch is written. For parquet, a row group
+            fields (list, optional): The first columns, in order. Fields of the records that are not in it are added after
+
+        Raises:
+            ValueError: When fmt is not one of COLUMNAR_FORMATS, or the directory holds an export of another format
+            ImportError: When fmt needs pyarrow and it is not installed
+        """
+        if fmt not in COLUMNAR_FORMATS:
+            raise ValueError(f"The columnar format ({fmt}) must be one of {COLUMNAR_FORMATS}")
+        if fmt != "columns" and load_pyarrow() is None:
+            raise ImportError(f"The {fmt} format requires pyarrow (pip install numista[arrow])")
+
+        self.path = path
+        self.fmt = fmt
+        self.batch_size = max(int(batch_size), 1)
+        self.rows = 0
+        self.written = 0
+        self.types = dict()
+
+        self._fields = list(fields)
+        self._pending = 0
+        self._total = 0  # Rows in the directory, of every session
+        self._writer = None
+        self._writer_schema = None
+
+        os.makedirs(path, exist_ok=True)
+        self._schema_path = os.path.join(path, "schema.json")
+        if os.path.exists(self._schema_path):
+            with open(self._schema_path, "r") as f:
+                schema = json.load(f)
+            if schema.get("format", "columns") != fmt:
+                raise ValueError(f"{path} holds a {schema.get('format', 'columns')} export, not {fmt}")
+            self.types = schema["types"]
+            self._total = schema["rows"]
+            self._fields = list(self.types) + [f for f in self._fields if f not in self.types]
+        self._columns = {f: list() for f in self._fields}
+
+    def write(self, record: dict = dict()) -> None:
+        """Buffer a record, writing a batch when batch_size records are buffered"""
+        row = flatten(record)
+        for name in row:
+            if name not in self._columns:
+                self._columns[name] = [None] * self._pending
+                self._fields.append(name)
+        for name in self._fields:
+            self._columns[name].append(row.get(name))
+        self._pending += 1
+        self.rows += 1
+        if self._pending >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        """Write the buffered records as a batch, widening the column types it does not fit"""
+        if not self._pending:
+            return
+        for name in self._fields:
+            self.types[name] = widen_type(self.types.get(name), column_type(self._columns[name]))
+        columns = {name: _coerce(self._columns[name], self.types[name]) for name in self._fields}
+
+        if self.fmt == "columns":
+            self._write_json_columns(columns)
+        else:
+            self._write_arrow(columns)
+        self._total += self._pending
+
+        # After the data: a schema.json narrower than the parts is still widened by read_columns()
+        tmp = self._schema_path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump({"format": self.fmt, "rows": self._total, "types": self.types}, f)
+        os.replace(tmp, self._schema_path)
+
+        self.written += self._pending
+        self._pending = 0
+        self._columns = {f: list() for f in self._fields}
+
+    def _write_json_columns(self, columns: dict = dict()) -> None:
+        """Append one JSON array per column file. A new column first gets nulls for the rows before it"""
+        for name, values in columns.items():
+            column_path = os.path.join(self.path, _column_file(name))
+            with open(column_path, "a") as f:
+                if self._total and not f.tell():
+                    f.write(json.dumps([None] * self._total) + "\n")
+                f.write(json.dumps(values, separators=(",", ":")) + "\n")
+
+    def _write_arrow(self, columns: dict = dict()) -> None:
+        """Write a batch to the session's part file, starting a new part when the schema changed"""
+        pa = load_pyarrow()
+        schema = pa.schema([(name, _arrow_type(pa, self.types[name])) for name in self._fields])
+        table = pa.table(
+            [pa.array(columns[name], type=schema.field(name).type) for name in self._fields],
+            schema=schema,
+        )
+
+        if self._writer is not None and not schema.equals(self._writer_schema):
+            self._writer.close()
+            self._writer = None
+        if self._writer is None:
+            ext = "parquet" if self.fmt == "parquet" else "feather"
+            parts = [p for p in os.listdir(self.path) if p.startswith("part-")]
+            part = os.path.join(self.path, f"part-{len(parts):05d}.{ext}")
+            if self.fmt == "parquet":
+                import pyarrow.parquet as pq
+
+                self._writer = pq.ParquetWriter(part, schema)
+            else:
+                import pyarrow.ipc
+
+                self._writer = pyarrow.ipc.new_file(part, schema)
+            self._writer_schema = schema
+        self._writer.write_table(table)
+
+    def close(self) -> None:
+        """Write the buffered records and close the part file"""
+        self.flush()
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+
+def _column_file(name: str = str()) -> str:
+    """File name of a column of the "columns" format"""
+    return quote(name, safe="") + ".jsonl"
+
+
+def _arrow_type(pa, kind: str = None) -> object:
+    """The pyarrow type of a column type"""
+    if kind is None:
+        return pa.null()
+    return {"bool": pa.bool_(), "int": pa.int64(), "float": pa.float64(), "str": pa.string()}[kind]
+
+
+def _arrow_kind(arrow_type: object = None) -> str:
+    """The column type of a pyarrow type written by ColumnarWriter"""
+    return {"bool": "bool", "int64": "int", "double": "float", "string": "str"}.get(str(arrow_type))
+
+
+def _read_part(pa, part: str = str(), names: list = list()) -> object:
+    """Read the columns of a parquet or feather part file, among names, that it has"""
+    if part.endswith(".parquet"):
+        import pyarrow.parquet as pq
+
+        present = [n for n in names if n in pq.read_schema(part).names]
+        return pq.read_table(part, columns=present)
+
+    import pyarrow.ipc
+
+    # Memory mapped: only the pages of the columns selected are read
+    with pa.memory_map(part) as source:
+        table = pyarrow.ipc.open_file(source).read_all()
+    return table.select([n for n in names if n in table.column_names])
+
+
+def read_columns(path: str = str(), columns: list = None) -> object:
+    """Read columns written by a ColumnarWriter. Only the columns asked for are read from disk
+    Values are returned in the column's widest type: part files written before a column was widened are cast, and rows written before a column was added are null
+    # noqa: E501
+
+    Args:
+        path (str): The directory written to
+        columns (list, optional): Column names to read. Default: all
+
+    Returns:
+        dict | pyarrow.Table: Column name to list of values for the "columns" format, a pyarrow.Table for parquet and feather
+
+    Raises:
+        ValueError: When path holds no columnar export, or a column is unknown
+        ImportError: When reading parquet or feather and pyarrow is not installed
+    """
+    schema_path = os.path.join(path, "schema.json")
+    if not os.path.exists(schema_path):
+        raise ValueError(f"{path} holds no columnar export (no schema.json)")
+    with open(schema_path, "r") as f:
+        schema = json.load(f)
+    types = schema["types"]
+    names = list(types) if columns is None else columns
+    for name in names:
+        if name not in types:
+            raise ValueError(f"Unknown column ({name}), expected one of {list(types)}")
+
+    if schema.get("format", "columns") == "columns":
+        result = dict()
+        for name in names:
+            values = list()
+            with open(os.path.join(path, _column_file(name)), "r") as f:
+                for line in f:
+                    values.extend(json.loads(line))
+            result[name] = _coerce(values, types[name])
+        return result
+
+    pa = load_pyarrow()
+    if pa is None:
+        raise ImportError("Reading parquet and feather exports requires pyarrow (pip install numista[arrow])")
+    parts = sorted(p for p in os.listdir(path) if p.startswith("part-"))
+    tables = [_read_part(pa, os.path.join(path, p), names) for p in parts]
+
+    # A part may be wider than schema.json when a session stopped before saving it
+    kinds = {name: types[name] for name in names}
+    for table in tables:
+        for field in table.schema:
+            kinds[field.name] = widen_type(kinds[field.name], _arrow_kind(field.type))
+    schema = pa.schema([(name, _arrow_type(pa, kinds[name])) for name in names])
+    if not tables:
+        return schema.empty_table()
+    aligned = list()
+    for table in tables:
+        arrays = [
+            table[name].cast(schema.field(name).type)
+            if name in table.column_names
+            else pa.nulls(table.num_rows, schema.field(name).type)
+            for name in names
+        ]
+        aligned.append(pa.Table.from_arrays(arrays, schema=schema))
+    return pa.concat_tables(aligned)
+
+
+def get_writer(fmt: str = "ndjson", stream: object = None, **kwargs) -> object:
+    """Returns a writer for an export format
+    # noqa: E501
+
+    Args:
+        fmt (str, optional): One of EXPORT_FORMATS
+        stream (object): A text file object to write to, for ndjson and csv
+        **kwargs: Passed to the writer. Columnar formats need path
+
+    Returns:
+        object: An NDJSONWriter, CSVWriter or ColumnarWriter
+
+    Raises:
+        ValueError: When fmt is not one of EXPORT_FORMATS
+    """
+    if fmt == "ndjson":
+        return NDJSONWriter(stream, **kwargs)
+    if fmt == "csv":
+        return CSVWriter(stream, **kwargs)
+    if fmt in COLUMNAR_FORMATS:
+        return ColumnarWriter(fmt=fmt, **kwargs)
+    raise ValueError(f"The export format ({fmt}) must be one of {EXPORT_FORMATS}")
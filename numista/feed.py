@@ -0,0 +1,387 @@
+"""Change feed of users' collections, polled adaptively with conditional requests
+
+Attributes:
+    DEFAULT_FEED_MAX_INTERVAL (float): Default longest seconds between two polls of a user
+    DEFAULT_FEED_MIN_INTERVAL (float): Default shortest seconds between two polls of a user
+    DEFAULT_FEED_RATIO (float): Default interval between two polls of a user, as a fraction of the time since its collection last changed
+    FEED_EVENTS (list): Kinds of change events
+"""
+import hashlib
+import heapq
+import itertools
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from numista.numista import DEFAULT_BULK_WORKERS, DEFAULT_RATE_LIMIT
+from numista.ratelimit import RateLimiter
+
+DEFAULT_FEED_MAX_INTERVAL = 3600.0
+DEFAULT_FEED_MIN_INTERVAL = 30.0
+DEFAULT_FEED_RATIO = 0.1
+FEED_EVENTS = ["added", "changed", "removed"]
+
+
+def _digest(item: dict = dict()) -> bytes:
+    """A short fingerprint of a collected item, to detect changes without keeping the item"""
+    return hashlib.blake2b(
+        json.dumps(item, sort_keys=True, default=str).encode("utf-8"), digest_size=8
+    ).digest()
+
+
+class CollectionFeed:
+    """Tracks the collections of many users and emits an event for every item added, changed or removed
+    Each user is polled on its own interval: a fraction (ratio) of the time since its collection last changed, between min_interval and max_interval. Users changing often are polled often, idle ones less and less. Polls send the last ETag with If-None-Match, so an unchanged collection costs an empty HTTP 304. Items are kept as fingerprints only
+    A failed poll backs its user off exponentially: min_interval doubled per consecutive failure, up to max_interval, and never sooner than the response's Retry-After. The next successful poll resets it
+
+    An event is a dict: {"event": "added" | "changed" | "removed", "user_id", "item_id", "item", "time"}. "item" is None for removed items
+
+    Attributes:
+        limiter (RateLimiter): The rate limiter every poll waits on
+        logger (object): The logger class is attached here
+        max_interval (float): Longest seconds between two polls of a user
+        min_interval (float): Shortest seconds between two polls of a user
+        numista (Numista): The Numista() client used to send requests
+        priority (str): Priority class of the polls when the client's context has a RequestScheduler
+        ratio (float): Interval between two polls of a user, as a fraction of the time since its collection last changed
+        workers (int): Number of concurrent polls
+    """
+
+    def __init__(
+        self,
+        numista,
+        min_interval: float = DEFAULT_FEED_MIN_INTERVAL,
+        max_interval: float = DEFAULT_FEED_MAX_INTERVAL,
+        ratio: float = DEFAULT_FEED_RATIO,
+        workers: int = DEFAULT_BULK_WORKERS,
+        rate: float = DEFAULT_RATE_LIMIT,
+        limiter: RateLimiter = None,
+        priority: str = "background",
+    ):
+        """Initialize the feed, watching nobody
+        # noqa: E501
+
+        Args:
+            numista (Numista): An instantiated Numista() client
+            min_interval (float, optional): Shortest seconds between two polls of a user, the interval of users changing often
+            max_interval (float, optional): Longest seconds between two polls of a user, the interval of users never changing
+            ratio (float, optional): Interval between two polls of a user, as a fraction (between 0 and 1) of the time since its collection last changed, or since it was watched
+            workers (int, optional): Number of concurrent polls
+            rate (float, optional): Maximum polls per second. 0 disables limiting. Ignored when limiter is provided
+            limiter (RateLimiter, optional): A rate limiter to share with other jobs
+            priority (str, optional): Priority class of the polls when the client's context has a RequestScheduler
+
+        Raises:
+            ValueError: When ratio is not between 0 and 1
+        """
+        if not 0 < ratio < 1:
+            raise ValueError(f"The ratio ({ratio}) must be between 0 and 1")
+        self.numista = numista
+        self.logger = numista.logger
+        self.min_interval = float(min_interval)
+        self.max_interval = max(float(max_interval), self.min_interval)
+        self.ratio = float(ratio)
+        self.workers = max(int(workers), 1)
+        self.limiter = limiter if limiter else RateLimiter(rate=rate)
+        self.priority = priority
+
+        self._users = dict()  # user_id: state, see watch()
+        self._due = list()  # Heap of (due time, sequence, user_id)
+        self._sequence = itertools.count()
+        self._callbacks = list()
+        self._stats = {"polls": 0, "not_modified": 0, "full": 0, "failed": 0, "events": 0}
+        self._cond = threading.Condition()
+        self._thread = None
+        self._stop = False
+
+    def __len__(self) -> int:
+        return len(self._users)
+
+    #
+    # Users
+    #
+
+    def watch(self, user_id: int = int(), token_label: str = "self") -> int:
+        """Start tracking a user's collection. Its first poll, due at once, records the baseline without events
+        # noqa: E501
+
+        Args:
+            user_id (int, optional): ID of the User, defaults to the user of the token
+            token_label (str, optional): The Label of the token that is stored to use as authorization
+
+        Returns:
+            int: The user ID watched
+
+        Raises:
+            LookupError: A lookup for other data failed. Example: trying to find a token by a label that doesnt exist
+        """
+        auth = self.numista._auth(token_label=token_label, caller="CollectionFeed.watch")
+        user_id = user_id or auth["user_id"]
+        with self._cond:
+            if user_id not in self._users:
+                self._users[user_id] = {
+                    "token_label": token_label,
+                    "etag": None,
+                    "items": None,  # item_id: fingerprint, None until the baseline poll
+                    "interval": self.min_interval,
+                    "polls": 0,
+                    "failures": 0,  # Consecutive failed polls
+                    "changes": 0,
+                    "changed": time.monotonic(),  # Last change, or when it was watched
+                    "queued": None,  # Sequence of the queued poll, older ones are skipped
+                }
+                self._schedule(user_id, time.monotonic())
+        return user_id
+
+    def unwatch(self, user_id: int = int()) -> None:
+        """Stop tracking a user. Its pending poll is dropped"""
+        with self._cond:
+            self._users.pop(user_id, None)
+
+    def _schedule(self, user_id: int = int(), due: float = 0.0) -> None:
+        """Queue the next poll of a user, replacing any queued one. Call with the condition held"""
+        sequence = next(self._sequence)
+        self._users[user_id]["queued"] = sequence
+        heapq.heappush(self._due, (due, sequence, user_id))
+        self._cond.notify_all()
+
+    #
+    # Events
+    #
+
+    def subscribe(self, callback=None) -> object:
+        """Call callback(event) for every change event, from the polling threads. Returns the callback"""
+        with self._cond:
+            self._callbacks.append(callback)
+        return callback
+
+    def unsubscribe(self, callback=None) -> None:
+        """Stop calling a subscribed callback"""
+        with self._cond:
+            if callback in self._callbacks:
+                self._callbacks.remove(callback)
+
+    def _emit(self, events: list = list()) -> None:
+        with self._cond:
+            callbacks = list(self._callbacks)
+            self._stats["events"] += len(events)
+        for event in events:
+            for callback in callbacks:
+                try:
+                    callback(event)
+                except Exception as err:
+                    self.logger.warning(f"Collection feed callback {callback} failed: {err}")
+
+    async def events(self, start: bool = True):
+        """Iterate change events asynchronously. Example: async for event in feed.events(): ...
+        # noqa: E501
+
+        Args:
+            start (bool, optional): start() the background polling if it is not running
+        """
+        import asyncio
+
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue()
+
+        def forward(event):
+            loop.call_soon_threadsafe(queue.put_nowait, event)
+
+        self.subscribe(forward)
+        if start:
+            self.start()
+        try:
+            while True:
+                yield await queue.get()
+        finally:
+            self.unsubscribe(forward)
+
+    def __aiter__(self):
+        return self.events()
+
+    #
+    # Polling
+    #
+
+    def _poll(self, user_id: int = int()) -> list:
+        """Poll one user's collection and update its interval
+
+        Returns:
+            list: The change events found
+        """
+        with self._cond:
+            state = self._users.get(user_id)
+        if state is None:
+            return list()
+
+        self.limiter.acquire()
+        try:
+            auth = self.numista._auth(token_label=state["token_label"], caller="CollectionFeed")
+            headers = dict(auth["headers"])
+            if state["etag"]:
+                headers["If-None-Match"] = state["etag"]
+            result = self.numista._call_api(
+                http_method="get",
+                endpoint_uri=f"/users/{user_id}/collected_items",
+                add_headers=headers,
+                priority=self.priority,
+            )
+        except Exception as err:
+            result = {"failed": True, "http_info": {"http_status": 0}, "extra": {"error": str(err)}}
+
+        status = result["http_info"]["http_status"]
+        events = list()
+
+        if status == 304:
+            outcome = "not_modified"
+        elif result["failed"] or status != 200:
+            outcome = "failed"
+            self.logger.info(
+                f"Collection feed poll of user {user_id} failed (HTTP {status}), backing off"
+            )
+        else:
+            outcome = "full"
+            state["etag"] = result["extra"].get("etag")
+            events = self._diff(user_id, state, result["data"].get("items", list()))
+
+        with self._cond:
+            self._stats["polls"] += 1
+            self._stats[outcome] += 1
+            state["polls"] += 1
+            now = time.monotonic()
+            if events:
+                state["changes"] += len(events)
+                state["changed"] = now
+            if outcome == "failed":
+                state["failures"] += 1
+                state["interval"] = self._backoff(state["failures"], result["extra"].get("retry_after"))
+            else:
+                state["failures"] = 0
+                # A collection that changed recently is likely to change again soon
+                state["interval"] = min(
+                    max((now - state["changed"]) * self.ratio, self.min_interval), self.max_interval
+                )
+            if user_id in self._users:
+                self._schedule(user_id, now + state["interval"])
+        return events
+
+    def _backoff(self, failures: int = 1, retry_after: float = None) -> float:
+        """Seconds before polling again a user whose last polls failed: min_interval doubled per failure, up to max_interval, and at least Retry-After"""
+        interval = min(self.min_interval * 2 ** min(failures, 32), self.max_interval)
+        return max(interval, retry_after or 0.0)
+
+    def _diff(self, user_id: int = int(), state: dict = dict(), items: list = list()) -> list:
+        """Compare a fresh copy of a collection with the fingerprints of the last one
+
+        Returns:
+            list: The change events. None are found by the baseline poll
+        """
+        current = {item["id"]: item for item in items}
+        fingerprints = {item_id: _digest(item) for item_id, item in current.items()}
+        previous, state["items"] = state["items"], fingerprints
+        if previous is None:
+            return list()
+
+        now = time.time()
+        events = list()
+        for item_id, fingerprint in fingerprints.items():
+            known = previous.get(item_id)
+            if known != fingerprint:
+                kind = "added" if known is None else "changed"
+                events.append(
+                    {
+                        "event": kind,
+                        "user_id": user_id,
+                        "item_id": item_id,
+                        "item": current[item_id],
+                        "time": now,
+                    }
+                )
+        for item_id in previous.keys() - fingerprints.keys():
+            events.append(
+                {"event": "removed", "user_id": user_id, "item_id": item_id, "item": None, "time": now}
+            )
+        return events
+
+    def _take_due(self) -> list:
+        """Unqueue the users whose poll is due"""
+        now = time.monotonic()
+        due = list()
+        with self._cond:
+            while self._due and self._due[0][0] <= now:
+                _, sequence, user_id = heapq.heappop(self._due)
+                state = self._users.get(user_id)
+                if state is not None and state["queued"] == sequence:
+                    due.append(user_id)
+        return due
+
+    def pollDue(self) -> list:
+        """Poll every user whose poll is due, concurrently, and emit their events
+
+        Returns:
+            list: The change events found
+        """
+        due = self._take_due()
+        if not due:
+            return list()
+
+        events = list()
+        with ThreadPoolExecutor(max_workers=min(self.workers, len(due))) as pool:
+            for found in pool.map(self._poll, due):
+                events.extend(found)
+        self._emit(events)
+        return events
+
+    def _poll_and_emit(self, user_id: int = int()) -> None:
+        try:
+            self._emit(self._poll(user_id))
+        except Exception as err:
+            self.logger.warning(f"Collection feed poll of user {user_id} failed: {err}")
+
+    def _run(self) -> None:
+        # Each poll is sent as soon as it is due, not held back by slower polls of the same round
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="numista-feed") as pool:
+            while True:
+                with self._cond:
+                    while not self._stop:
+                        wait = self._due[0][0] - time.monotonic() if self._due else None
+                        if wait is not None and wait <= 0:
+                            break
+                        self._cond.wait(timeout=wait)
+                    if self._stop:
+                        return
+                for user_id in self._take_due():
+                    pool.submit(self._poll_and_emit, user_id)
+
+    def start(self) -> None:
+        """Poll in a background thread until stop()"""
+        with self._cond:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop = False
+            self._thread = threading.Thread(target=self._run, name="numista-feed", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the background polling once the current polls complete"""
+        with self._cond:
+            self._stop = True
+            self._cond.notify_all()
+            thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join()
+
+    def stats(self) -> dict:
+        """Counters of the polls sent and the current interval of every user
+
+        Returns:
+            dict: {"users", "polls", "not_modified", "full", "failed", "events", "intervals": {user_id: seconds}, "backing_off": {user_id: consecutive failures}}
+        """
+        with self._cond:
+            return {
+                "users": len(self._users),
+                **self._stats,
+                "intervals": {k: round(v["interval"], 3) for k, v in self._users.items()},
+                "backing_off": {k: v["failures"] for k, v in self._users.items() if v["failures"]},
+            }
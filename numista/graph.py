@@ -0,0 +1,285 @@
+"""Catalogue relationship graph: types, their issues and the issues' prices, loaded level by level"""
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from numista.concurrency import AdaptiveLimiter, limited_call
+from numista.numista import DEFAULT_BULK_WORKERS, DEFAULT_CURRENCY, DEFAULT_LANG, DEFAULT_RATE_LIMIT
+from numista.ratelimit import RateLimiter
+
+
+class TypeNode:
+    """A catalogue type, linked to its issues
+
+    Attributes:
+        data (dict): The getType() record, or the searchTypes() hit when details were not loaded
+        detailed (bool): Whether data is the full getType() record
+        errors (list): Failed lookups of this node. Example: ["getIssues: HTTP 503"]
+        id (int): ID of the type
+        issues (list): IssueNode of every issue, None until loaded
+    """
+
+    def __init__(self, type_id: int = int(), data: dict = None):
+        self.id = type_id
+        self.data = data or {"id": type_id}
+        self.detailed = False
+        self.issues = None
+        self.errors = list()
+
+    def __repr__(self) -> str:
+        issues = "?" if self.issues is None else len(self.issues)
+        return f"TypeNode({self.id}, {self.data.get('title')!r}, issues={issues})"
+
+    def to_dict(self) -> dict:
+        """The type with its issues and their prices nested, for export"""
+        record = dict(self.data)
+        if self.issues is not None:
+            record["issues"] = [issue.to_dict() for issue in self.issues]
+        return record
+
+
+class IssueNode:
+    """An issue of a type, linked back to it, with its prices per currency
+
+    Attributes:
+        data (dict): The issue, as in getIssues()["data"]
+        errors (list): Failed lookups of this node. Example: ["getPrices: HTTP 503 (EUR)"]
+        id (int): ID of the issue
+        prices (dict): {currency: {grade: price}} for every currency loaded
+        type (TypeNode): The type of the issue
+    """
+
+    def __init__(self, type_node: TypeNode = None, data: dict = None):
+        self.type = type_node
+        self.data = data
+        self.id = data["id"]
+        self.prices = dict()
+        self.errors = list()
+
+    def __repr__(self) -> str:
+        return f"IssueNode({self.type.id}/{self.id}, {self.data.get('year')!r}, prices={list(self.prices)})"
+
+    def to_dict(self) -> dict:
+        """The issue with its prices, for export"""
+        return {**self.data, "prices": dict(self.prices)}
+
+
+class CatalogueGraph:
+    """Loads types with their issues and prices as a linked graph, one parallel round per level
+    getType() and getIssues() only need the type ID, so they share the first round; getPrices() of every issue is the second. Latency grows with the depth of the graph, not its number of nodes. Nodes are kept by ID: a type or issue reached twice, within or across load() calls, is fetched once
+
+    Attributes:
+        concurrency (AdaptiveLimiter): Adapts the number of concurrent requests to latency and HTTP 429. None keeps workers fixed
+        issues (dict): Every IssueNode loaded, by (type_id, issue_id)
+        levels (list): Requests and seconds of each round of the last load(): [{"level", "requests", "failed", "seconds"}]
+        limiter (RateLimiter): The rate limiter every request waits on
+        logger (object): The logger class is attached here
+        numista (Numista): The Numista() client used to send requests
+        roots (list): The TypeNode of each type of the last load(), in the order given
+        types (dict): Every TypeNode loaded, by type ID
+        workers (int): Number of concurrent requests, the maximum when concurrency is set
+    """
+
+    def __init__(
+        self,
+        numista,
+        lang: str = DEFAULT_LANG,
+        workers: int = DEFAULT_BULK_WORKERS,
+        rate: float = DEFAULT_RATE_LIMIT,
+        limiter: RateLimiter = None,
+        concurrency: AdaptiveLimiter = None,
+    ):
+        """Initialize the graph
+        # noqa: E501
+
+        Args:
+            numista (Numista): An instantiated Numista() client
+            lang (str, optional): Language of the records. Available values : en, es, fr
+            workers (int, optional): Number of concurrent requests
+            rate (float, optional): Maximum requests per second. 0 disables limiting. Ignored when limiter is provided
+            limiter (RateLimiter, optional): A rate limiter to share with other jobs
+            concurrency (AdaptiveLimiter, optional): Adapt the number of concurrent requests, up to its max_limit, to latency and HTTP 429. Overrides workers
+        """
+        self.numista = numista
+        self.logger = numista.logger
+        self.concurrency = concurrency
+        self.workers = concurrency.max_limit if concurrency else max(int(workers), 1)
+        self.limiter = limiter if limiter else RateLimiter(rate=rate)
+        self.types = dict()
+        self.issues = dict()
+        self.levels = list()
+        self.roots = list()
+
+        # Built once, every node of a level reuses them
+        self._get_type = numista.prepare("getType", lang=lang)
+        self._get_issues = numista.prepare("getIssues", lang=lang)
+        self._get_prices = numista.prepare("getPrices", lang=lang)
+
+    def _call(self, prepared: object = None, **kwargs) -> tuple:
+        """Send one prepared call within the rate and concurrency limits
+
+        Returns:
+            tuple: (data, error). error is None on success, a short message otherwise
+        """
+        self.limiter.acquire()
+        try:
+            result = limited_call(self.concurrency, prepared, **kwargs)
+        except Exception as err:
+            return None, f"{prepared.operation}: {err}"
+        status = result["http_info"]["http_status"]
+        if result["failed"] or status != 200:
+            return None, f"{prepared.operation}: HTTP {status}"
+        return result["data"], None
+
+    def _run_level(self, level: str = str(), tasks: list = list()) -> None:
+        """Run one round: every task in parallel. A task is (prepared call, kwargs, callback(data, error))"""
+        started = time.monotonic()
+        failed = 0
+        if tasks:
+            with ThreadPoolExecutor(max_workers=min(self.workers, len(tasks))) as pool:
+                futures = [
+                    (pool.submit(self._call, prepared, **kwargs), callback)
+                    for prepared, kwargs, callback in tasks
+                ]
+                for future, callback in futures:
+                    data, error = future.result()
+                    failed += error is not None
+                    callback(data, error)
+        seconds = time.monotonic() - started
+        self.levels.append(
+            {"level": level, "requests": len(tasks), "failed": failed, "seconds": round(seconds, 4)}
+        )
+        self.logger.debug(f"Graph level {level}: {len(tasks)} requests, {failed} failed, {seconds:.3f}s")
+
+    def _type_node(self, type_id: int = int(), hit: dict = None) -> TypeNode:
+        """The node of a type, created on first sight"""
+        node = self.types.get(type_id)
+        if node is None:
+            node = self.types[type_id] = TypeNode(type_id, hit)
+        return node
+
+    def _set_type(self, node: TypeNode = None):
+        """Callback storing a getType() record on its node"""
+
+        def callback(data: dict = None, error: str = None) -> None:
+            if error:
+                node.errors.append(error)
+                self.logger.info(f"Graph: {error} for type {node.id}")
+                return
+            node.data = data
+            node.detailed = True
+
+        return callback
+
+    def _set_issues(self, node: TypeNode = None):
+        """Callback linking the issues of a type to its node, reusing known issue nodes"""
+
+        def callback(data: list = None, error: str = None) -> None:
+            if error:
+                node.errors.append(error)
+                self.logger.info(f"Graph: {error} for type {node.id}")
+                return
+            issues = list()
+            for issue in data or list():
+                key = (node.id, issue["id"])
+                issue_node = self.issues.get(key)
+                if issue_node is None:
+                    issue_node = self.issues[key] = IssueNode(node, issue)
+                else:
+                    issue_node.data = issue
+                issues.append(issue_node)
+            node.issues = issues
+
+        return callback
+
+    def _set_prices(self, node: IssueNode = None, currency: str = DEFAULT_CURRENCY):
+        """Callback storing the prices of an issue in one currency"""
+
+        def callback(data: dict = None, error: str = None) -> None:
+            if error:
+                node.errors.append(f"{error} ({currency})")
+                self.logger.info(f"Graph: {error} for issue {node.type.id}/{node.id} ({currency})")
+                return
+            node.prices[currency] = {
+                p["grade"]: float(p["price"])
+                for p in data.get("prices", list())
+                if p.get("price") is not None
+            }
+
+        return callback
+
+    def load(
+        self,
+        types: list = list(),
+        details: bool = True,
+        issues: bool = True,
+        prices: bool = True,
+        currency: str = DEFAULT_CURRENCY,
+    ) -> list:
+        """Load types and, level by level, the related entities asked for
+        # noqa: E501
+
+        Args:
+            types (list): Type IDs, or searchTypes() hits (dicts with an "id"). Duplicates are loaded once
+            details (bool, optional): Load the full getType() record of each type
+            issues (bool, optional): Load the issues of each type
+            prices (bool, optional): Load the prices of each issue in currency. Implies issues
+            currency (str, optional): 3-letter ISO 4217 currency code of the prices
+
+        Returns:
+            list: The TypeNode of each type, in the order given. Nodes already loaded by a previous call are not fetched again
+
+        Raises:
+            ValueError: When currency is not an ISO 4217 currency code
+        """
+        from numista.validation import currency_codes
+
+        currency = currency.upper()
+        if currency not in currency_codes():
+            msg = f"The currency provided ({currency}) is not an ISO 4217 currency code"
+            self.numista._except_and_log(ex_msg=msg)
+            raise ValueError(msg)
+        roots = list()
+        for t in types:
+            type_id, hit = (t["id"], t) if isinstance(t, dict) else (int(t), None)
+            roots.append(self._type_node(type_id, hit))
+        distinct = list(dict.fromkeys(roots))
+        self.levels = list()
+
+        # Round 1: everything that only needs the type ID
+        tasks = list()
+        for node in distinct:
+            if details and not node.detailed:
+                tasks.append((self._get_type, {"type_id": node.id}, self._set_type(node)))
+            if (issues or prices) and node.issues is None:
+                tasks.append((self._get_issues, {"type_id": node.id}, self._set_issues(node)))
+        self._run_level("types", tasks)
+
+        # Round 2: the prices of every issue reached
+        if prices:
+            tasks = [
+                (
+                    self._get_prices,
+                    {"type_id": node.id, "issue_id": issue.id, "currency": currency},
+                    self._set_prices(issue, currency),
+                )
+                for node in distinct
+                for issue in node.issues or list()
+                if currency not in issue.prices
+            ]
+            self._run_level("prices", tasks)
+
+        self.roots = roots
+        return roots
+
+    def stats(self) -> dict:
+        """Size of the graph and the rounds of the last load()
+
+        Returns:
+            dict: {"types", "issues", "priced_issues", "levels"}
+        """
+        return {
+            "types": len(self.types),
+            "issues": len(self.issues),
+            "priced_issues": sum(1 for issue in self.issues.values() if issue.prices),
+            "levels": list(self.levels),
+        }
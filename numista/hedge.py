@@ -0,0 +1,227 @@
+"""Hedged GET requests, to cut the latency tail of idempotent reads
+
+Attributes:
+    DEFAULT_HEDGE_BUDGET (float): Default hedges allowed per request sent, on average
+    DEFAULT_HEDGE_PERCENTILE (float): Default latency percentile after which a hedge is sent
+    DEFAULT_HEDGE_SAMPLES (int): Default number of recent latencies kept per endpoint
+    HEDGE_EXCLUDED_ENDPOINTS (frozenset): Endpoint templates never hedged, even when listed: a duplicate would not be harmless
+"""
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+DEFAULT_HEDGE_BUDGET = 0.05
+DEFAULT_HEDGE_PERCENTILE = 0.95
+DEFAULT_HEDGE_SAMPLES = 200
+HEDGE_EXCLUDED_ENDPOINTS = frozenset(["GET /oauth_token"])  # Each call issues a new token
+
+
+class HedgeRefused(Exception):
+    """A hedge that was not sent: no slot was admitted for it, or the first response already won"""
+
+
+class HedgePolicy:
+    """Sends a duplicate of a GET still unanswered after its endpoint's latency percentile. The first response wins, the other is closed unread
+    Hedges are paid from a budget earned by the requests sent: each earns `budget` of a hedge, so hedges stay within that fraction of the quota. Only GETs are hedged: they are idempotent. HEDGE_EXCLUDED_ENDPOINTS never are
+
+    Attributes:
+        budget (float): Hedges earned per request sent. Example: 0.05 allows one hedge per 20 requests
+        burst (float): Maximum hedges saved up in the budget
+        endpoints (set): Endpoint templates to hedge (Example: "GET /types/{id}"). None hedges every GET but HEDGE_EXCLUDED_ENDPOINTS
+        min_delay (float): Seconds a request is always given before hedging
+        min_samples (int): Latencies an endpoint needs before its requests are hedged
+        percentile (float): Latency percentile (between 0 and 1) after which a hedge is sent
+    """
+
+    def __init__(
+        self,
+        percentile: float = DEFAULT_HEDGE_PERCENTILE,
+        budget: float = DEFAULT_HEDGE_BUDGET,
+        burst: float = 10.0,
+        endpoints: list = None,
+        min_delay: float = 0.01,
+        min_samples: int = 20,
+        samples: int = DEFAULT_HEDGE_SAMPLES,
+        workers: int = 32,
+    ):
+        """Initialize the policy
+        # noqa: E501
+
+        Args:
+            percentile (float, optional): Latency percentile (between 0 and 1) of the endpoint after which a hedge is sent
+            budget (float, optional): Hedges earned per request sent, the maximum fraction of requests hedged
+            burst (float, optional): Maximum hedges saved up in the budget
+            endpoints (list, optional): Endpoint templates to hedge. Example: ["GET /types/{id}", "GET /types/{id}/issues/{id}/prices"]. Default: every GET but HEDGE_EXCLUDED_ENDPOINTS
+            min_delay (float, optional): Seconds a request is always given before hedging
+            min_samples (int, optional): Latencies an endpoint needs before its requests are hedged
+            samples (int, optional): Recent latencies kept per endpoint to compute the percentile
+            workers (int, optional): Threads sending hedged requests
+
+        Raises:
+            ValueError: When percentile is not between 0 and 1
+        """
+        if not 0 < percentile < 1:
+            raise ValueError(f"The percentile ({percentile}) must be between 0 and 1")
+        self.percentile = float(percentile)
+        self.budget = float(budget)
+        self.burst = float(burst)
+        self.endpoints = set(endpoints) if endpoints else None
+        self.min_delay = float(min_delay)
+        self.min_samples = max(int(min_samples), 1)
+
+        self._samples = samples
+        self._latencies = dict()  # endpoint: deque of recent latencies
+        self._delays = dict()  # endpoint: [delay, samples since it was computed]
+        self._tokens = 0.0
+        self._stats = {"requests": 0, "hedged": 0, "hedge_wins": 0, "denied": 0, "refused": 0}
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="numista-hedge")
+
+    def hedges(self, endpoint: str = str()) -> bool:
+        """Whether requests to an endpoint template are hedged"""
+        if endpoint in HEDGE_EXCLUDED_ENDPOINTS:
+            return False
+        return self.endpoints is None or endpoint in self.endpoints
+
+    def delay(self, endpoint: str = str()) -> float:
+        """Seconds to wait for a response before hedging, None until the endpoint has min_samples latencies"""
+        with self._lock:
+            latencies = self._latencies.get(endpoint)
+            if latencies is None or len(latencies) < self.min_samples:
+                return None
+            cached = self._delays.get(endpoint)
+            # Sorting a few hundred floats is cheap, but not on every request
+            if cached is None or cached[1] >= 16:
+                ordered = sorted(latencies)
+                cached = self._delays[endpoint] = [
+                    ordered[int(self.percentile * (len(ordered) - 1))],
+                    0,
+                ]
+            return max(cached[0], self.min_delay)
+
+    def observe(self, endpoint: str = str(), latency: float = 0.0) -> None:
+        """Add the latency of a request, hedged or not, to its endpoint's samples"""
+        with self._lock:
+            latencies = self._latencies.get(endpoint)
+            if latencies is None:
+                latencies = self._latencies[endpoint] = deque(maxlen=self._samples)
+            latencies.append(latency)
+            if endpoint in self._delays:
+                self._delays[endpoint][1] += 1
+
+    def _earn(self) -> None:
+        with self._lock:
+            self._stats["requests"] += 1
+            self._tokens = min(self._tokens + self.budget, self.burst)
+
+    def _spend(self) -> bool:
+        """Take one hedge from the budget, if there is one"""
+        with self._lock:
+            if self._tokens < 1.0:
+                self._stats["denied"] += 1
+                return False
+            self._tokens -= 1.0
+            self._stats["hedged"] += 1
+            return True
+
+    def _refused(self) -> None:
+        with self._lock:
+            self._stats["refused"] += 1
+
+    def _send_hedge(self, send=None, admit=None, cancelled: object = None) -> object:
+        """Send the hedge once admit() lets it through, unless the first response won in the meantime
+
+        Raises:
+            HedgeRefused: When admit() refused the hedge, or the first response won while it waited
+        """
+        release = None
+        if admit is not None:
+            try:
+                release = admit()
+            except Exception as err:
+                self._refused()
+                raise HedgeRefused(f"Hedge not admitted: {err}") from err
+        try:
+            if cancelled.is_set():
+                self._refused()
+                raise HedgeRefused("The first response won before the hedge was sent")
+            return send(cancelled)
+        finally:
+            if release is not None:
+                release()
+
+    def run(self, endpoint: str = str(), send=None, admit=None) -> object:
+        """Call send(), and once more if the first call is slower than the endpoint's delay and the budget allows
+        # noqa: E501
+
+        Args:
+            endpoint (str): The endpoint template. Example: "GET /types/{id}"
+            send (callable): Sends the request and reads its response: send(cancelled) -> (response, content). It should skip reading the body once the threading.Event cancelled is set
+            admit (callable, optional): Called in the hedge's thread before it is sent, so the hedge uses quota like any request: admit() blocks until it may be sent and returns a callable releasing what it took, or raises to drop the hedge. Example: a RequestScheduler slot
+
+        Returns:
+            object: What the first successful call returned. The other call's response is closed once it completes
+
+        Raises:
+            Exception: What the calls raised, when both failed
+        """
+        self._earn()
+        cancelled = threading.Event()
+        delay = self.delay(endpoint)
+        if delay is None:
+            started = time.monotonic()
+            outcome = send(cancelled)
+            self.observe(endpoint, time.monotonic() - started)
+            return outcome
+
+        started = time.monotonic()
+        primary = self._pool.submit(send, cancelled)
+        # The primary's latency counts whether or not it wins, keeping the percentile honest
+        primary.add_done_callback(
+            lambda f: f.exception() or self.observe(endpoint, time.monotonic() - started)
+        )
+        done, _ = wait([primary], timeout=delay)
+        if done or not self._spend():
+            return primary.result()
+
+        hedge = self._pool.submit(self._send_hedge, send, admit, cancelled)
+        pending = {primary, hedge}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is not None:
+                    if not isinstance(future.exception(), HedgeRefused):
+                        error = error or future.exception()  # The primary is never refused
+                    continue
+                cancelled.set()
+                for loser in pending:
+                    loser.add_done_callback(_close)
+                if future is hedge:
+                    with self._lock:
+                        self._stats["hedge_wins"] += 1
+                return future.result()
+        raise error
+
+    def stats(self) -> dict:
+        """Counters of the hedges sent and the current delay per endpoint
+
+        Returns:
+            dict: {"requests", "hedged", "hedge_wins", "denied", "refused", "budget", "delays": {endpoint: seconds}}. refused hedges were paid for but not sent
+        """
+        delays = {endpoint: self.delay(endpoint) for endpoint in list(self._latencies)}
+        with self._lock:
+            return {**self._stats, "budget": round(self._tokens, 3), "delays": delays}
+
+    def close(self) -> None:
+        """Stop the hedging threads once their requests complete"""
+        self._pool.shutdown(wait=False)
+
+
+def _close(future: object = None) -> None:
+    """Release the connection of a losing request without reading the rest of its body"""
+    if future.exception() is None:
+        response = future.result()[0]
+        if hasattr(response, "close"):
+            response.close()
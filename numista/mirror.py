@@ -0,0 +1,438 @@
+"""Local mirror of the Numista catalogue with an offline full-text search index
+
+Attributes:
+    DEFAULT_MIRROR_PATH (str): Default directory for the on-disk mirror
+    MIRROR_INDEX_FILE (str): File name of the persisted inverted index
+    MIRROR_SCOPES_FILE (str): File name of the harvested scopes (issuer/category pairs)
+    MIRROR_TYPES_FILE (str): File name of the append-only type record store
+    MIRROR_TOKEN_PATTERN (object): Compiled pattern used to split text into index tokens
+"""
+import bisect
+import html
+import json
+import logging
+import os
+import re
+import time
+
+from numista.numista import DEFAULT_LANG, HTTP_STATUS_RESPONSE_MESSAGE
+
+DEFAULT_MIRROR_PATH = "./numista_mirror"
+MIRROR_TYPES_FILE = "types.jsonl"
+MIRROR_INDEX_FILE = "index.json"
+MIRROR_SCOPES_FILE = "scopes.json"
+MIRROR_TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+
+class CatalogueMirror:
+    """A local copy of catalogue type records, searchable without the network
+
+    Attributes:
+        details (dict): Full type records (as returned by getType) by type ID
+        logger (object): The logger class is attached here
+        numista (object): The Numista() client used to harvest records, None for offline use
+        path (str): Directory the mirror is stored in
+        scopes (dict): Harvested issuer/category scopes and when they were last harvested
+        types (dict): Search result records (as returned by searchTypes) by type ID
+    """
+
+    def __init__(self, numista=None, path: str = DEFAULT_MIRROR_PATH):
+        """Open (or create) a mirror stored at path
+        # noqa: E501
+
+        Args:
+            numista (Numista, optional): An instantiated Numista() client. Only required to harvest or refresh
+            path (str, optional): Directory the mirror is stored in, created if missing
+        """
+        self.numista = numista
+        self.logger = numista.logger if numista else logging
+        self.path = path
+
+        self.types = dict()
+        self.details = dict()
+        self.scopes = dict()
+
+        self._index = dict()  # token: set(type_id)
+        self._tokens = list()  # sorted keys of _index, used for prefix lookups
+
+        os.makedirs(self.path, exist_ok=True)
+        self._load()
+
+    #
+    # Storage
+    #
+
+    def _file(self, name: str = str()) -> str:
+        """Path of a file inside the mirror directory"""
+        return os.path.join(self.path, name)
+
+    def _load(self) -> None:
+        """Load the record store, scopes and index from disk"""
+        types_file = self._file(MIRROR_TYPES_FILE)
+        if os.path.exists(types_file):
+            with open(types_file, "r") as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    record = json.loads(line)
+                    type_id = int(record["id"])
+                    if record.get("type"):
+                        self.types[type_id] = record["type"]
+                    if record.get("detail"):
+                        self.details[type_id] = record["detail"]
+
+        scopes_file = self._file(MIRROR_SCOPES_FILE)
+        if os.path.exists(scopes_file):
+            with open(scopes_file, "r") as f:
+                self.scopes = json.load(f)
+
+        index_file = self._file(MIRROR_INDEX_FILE)
+        index = None
+        if os.path.exists(index_file):
+            with open(index_file, "r") as f:
+                index = json.load(f)
+
+        # The index is only current for the exact store it was built from: records rewritten in place keep the count
+        if index and index.get("store") == self._store_signature():
+            self._index = {t: set(ids) for t, ids in index["tokens"].items()}
+            self._tokens = sorted(self._index)
+        else:
+            self.logger.debug("Mirror index missing or out of date, rebuilding")
+            self._rebuild_index()
+
+        self.logger.debug(f"Mirror loaded from {self.path} with {len(self.types)} types")
+
+    def _store_signature(self) -> list:
+        """Size and modification time of the record store, None when it doesn't exist"""
+        try:
+            stat = os.stat(self._file(MIRROR_TYPES_FILE))
+        except OSError:
+            return None
+        return [stat.st_size, stat.st_mtime_ns]
+
+    def _append(self, records: list = list()) -> None:
+        """Append records to the store. The newest line for an ID wins on load"""
+        if not records:
+            return
+        with open(self._file(MIRROR_TYPES_FILE), "a") as f:
+            for record in records:
+                f.write(json.dumps(record, separators=(",", ":")) + "\n")
+
+    def _write_json(self, name: str = str(), data: dict = dict()) -> None:
+        """Atomically replace a JSON file in the mirror directory"""
+        tmp_path = self._file(f"{name}.tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(data, f, separators=(",", ":"))
+        os.replace(tmp_path, self._file(name))
+
+    def _save(self) -> None:
+        """Persist the scopes and the inverted index"""
+        self._write_json(MIRROR_SCOPES_FILE, self.scopes)
+        tokens = {t: sorted(ids) for t, ids in self._index.items()}
+        self._write_json(
+            MIRROR_INDEX_FILE,
+            {"record_count": len(self.types), "store": self._store_signature(), "tokens": tokens},
+        )
+
+    def compact(self) -> None:
+        """Rewrite the record store with a single line per type ID"""
+        tmp_path = self._file(f"{MIRROR_TYPES_FILE}.tmp")
+        with open(tmp_path, "w") as f:
+            for type_id, summary in self.types.items():
+                record = {"id": type_id, "type": summary}
+                if type_id in self.details:
+                    record["detail"] = self.details[type_id]
+                f.write(json.dumps(record, separators=(",", ":")) + "\n")
+        os.replace(tmp_path, self._file(MIRROR_TYPES_FILE))
+        self._save()  # Same records, new store: keep the index current for it
+        self.logger.info(f"Mirror store compacted to {len(self.types)} records")
+
+    #
+    # Index
+    #
+
+    @staticmethod
+    def _tokenize(text: str = str()) -> list:
+        """Split text into lowercase index tokens"""
+        return MIRROR_TOKEN_PATTERN.findall(html.unescape(str(text)).lower())
+
+    def _record_text(self, summary: dict = dict()) -> str:
+        """The searchable text of a type record"""
+        issuer = summary.get("issuer") or dict()
+        return " ".join(
+            str(v)
+            for v in (
+                summary.get("title", ""),
+                issuer.get("name", ""),
+                issuer.get("code", ""),
+            )
+            if v
+        )
+
+    def _index_record(self, type_id: int = int(), summary: dict = dict()) -> bool:
+        """Add a record to the inverted index
+
+        Returns:
+            bool: True if a new token was added (and _tokens needs resorting)
+        """
+        new_token = False
+        for token in self._tokens_for(summary):
+            ids = self._index.get(token)
+            if ids is None:
+                ids = self._index[token] = set()
+                new_token = True
+            ids.add(type_id)
+        return new_token
+
+    def _tokens_for(self, summary: dict = dict()) -> set:
+        """The set of tokens a record is indexed under"""
+        return set(self._tokenize(self._record_text(summary)))
+
+    def _rebuild_index(self) -> None:
+        """Rebuild the inverted index from the record store"""
+        self._index = dict()
+        for type_id, summary in self.types.items():
+            self._index_record(type_id, summary)
+        self._tokens = sorted(self._index)
+
+    def _prefix_ids(self, prefix: str = str()) -> set:
+        """All IDs indexed under a token starting with prefix"""
+        ids = set()
+        i = bisect.bisect_left(self._tokens, prefix)
+        while i < len(self._tokens) and self._tokens[i].startswith(prefix):
+            ids |= self._index[self._tokens[i]]
+            i += 1
+        return ids
+
+    def _store(self, summaries: list = list(), details: dict = dict()) -> int:
+        """Store and index harvested records
+
+        Returns:
+            int: The number of type IDs that were not in the mirror before
+        """
+        records = list()
+        added = 0
+        resort = False
+        for summary in summaries:
+            type_id = int(summary["id"])
+            if type_id not in self.types:
+                added += 1
+            elif self.types[type_id] != summary:
+                # Drop tokens the record is no longer indexed under
+                for token in self._tokens_for(self.types[type_id]):
+                    self._index.get(token, set()).discard(type_id)
+            elif type_id not in details:
+                continue  # Nothing new
+            self.types[type_id] = summary
+            resort |= self._index_record(type_id, summary)
+            record = {"id": type_id, "type": summary}
+            if type_id in details:
+                self.details[type_id] = details[type_id]
+                record["detail"] = details[type_id]
+            records.append(record)
+
+        self._append(records)
+        if resort:
+            self._tokens = sorted(self._index)
+        return added
+
+    #
+    # Harvesting
+    #
+
+    def _scope_key(self, issuer: str = str(), category: str = str()) -> str:
+        return f"{issuer}|{category}"
+
+    def harvest(
+        self,
+        issuer: str = str(),
+        category: str = str(),
+        q: str = str(),
+        details: bool = True,
+        count: int = 50,
+        lang: str = DEFAULT_LANG,
+        new_only: bool = False,
+    ) -> int:
+        """Page through searchTypes for an issuer/category and mirror every type found
+        # noqa: E501
+
+        Args:
+            issuer (str, optional): Issuer code to harvest. Example: "france"
+            category (str, optional): Category to harvest. Available values : coin, banknote, exonumia
+            q (str, optional): Optional search query to narrow the harvest
+            details (bool, optional): Also fetch the full record of each type with getType()
+            count (int, optional): Results per page. Default value : 50
+            lang (str, optional): Language. Available values : en, es, fr. Default value : en
+            new_only (bool, optional): Only fetch full records for type IDs not already mirrored
+
+        Returns:
+            int: The number of type IDs added to the mirror
+
+        Raises:
+            ValueError: When the mirror was opened without a Numista() client, or a page request fails
+        """
+        if not self.numista:
+            msg = "A Numista() client is required to harvest the catalogue"
+            self.logger.critical(msg)
+            raise ValueError(msg)
+
+        self.logger.info(f"Harvesting types for issuer: {issuer} category: {category}")
+
+        added = 0
+        page = 1
+        seen = 0
+        while True:
+            # searchTypes() insists on 'q' and prints when it's missing, go direct instead.
+            result = self.numista._call_api(
+                http_method="get",
+                endpoint_uri="/types",
+                q=q,
+                issuer=issuer,
+                category=category,
+                page=page,
+                count=count,
+                lang=lang,
+            )
+            if result["failed"] or result["http_info"]["http_status"] != 200:
+                msg = f"Harvest of page {page} failed: {result['http_info']}"
+                self.numista._except_and_log(ex_msg=msg)
+                raise ValueError(msg)
+
+            summaries = result["data"].get("types", list())
+            full = dict()
+            if details:
+                for summary in summaries:
+                    type_id = int(summary["id"])
+                    if new_only and type_id in self.details:
+                        continue
+                    r = self.numista.getType(type_id=type_id, lang=lang)
+                    if not r["failed"] and r["http_info"]["http_status"] == 200:
+                        full[type_id] = r["data"]
+                    else:
+                        self.logger.info(f"getType() failed for {type_id}, skipping")
+
+            added += self._store(summaries, full)
+            seen += len(summaries)
+            self.logger.debug(f"Harvested page {page} ({seen} types)")
+
+            if not summaries or seen >= result["data"].get("count", 0):
+                break
+            page += 1
+
+        self.scopes[self._scope_key(issuer, category)] = {
+            "issuer": issuer,
+            "category": category,
+            "q": q,
+            "details": details,
+            "lang": lang,
+            "harvested_at": int(time.time()),
+            "count": seen,
+        }
+        self._save()
+        self.logger.info(f"Harvest finished, {added} new types ({len(self.types)} total)")
+
+        return added
+
+    def refresh(self) -> int:
+        """Incrementally refresh every harvested scope
+        Search pages are re-read (cheap), full records are only fetched for new type IDs
+
+        Returns:
+            int: The number of type IDs added to the mirror
+        """
+        added = 0
+        for scope in list(self.scopes.values()):
+            added += self.harvest(
+                issuer=scope["issuer"],
+                category=scope["category"],
+                q=scope.get("q", ""),
+                details=scope.get("details", True),
+                lang=scope.get("lang", DEFAULT_LANG),
+                new_only=True,
+            )
+        return added
+
+    #
+    # Offline queries
+    #
+
+    @staticmethod
+    def _result(data: dict = dict(), http_status: int = 200) -> dict:
+        """Format a result the same way Numista()._result_format() does"""
+        return {
+            "data": data,
+            "http_info": {
+                "http_status": http_status,
+                "http_msg": HTTP_STATUS_RESPONSE_MESSAGE[http_status],
+            },
+            "failed": False,
+            "extra": {"mirror": True},
+        }
+
+    def searchTypes(
+        self,
+        q: str = str(),
+        issuer: str = str(),
+        category: str = str(),
+        page: int = 1,
+        count: int = 50,
+        **kwargs,
+    ) -> dict:
+        """Search the mirrored catalogue, in the same shape as Numista().searchTypes()
+        Every word in q must match, the last word matches as a prefix (type-ahead)
+        # noqa: E501
+
+        Args:
+            q (str, optional): Search query. Example: "Buffalo"
+            issuer (str, optional): Issuer code. If provided, only the coins from the given issuer are returned.
+            category (str, optional): If this parameter is provided, only items of the given category are returned. Available values : coin, banknote, exonumia
+            page (int, optional): Page of results. Default value : 1
+            count (int, optional): Results per page. Default value : 50
+            **kwargs: Accepted for signature compatibility with Numista().searchTypes(), ignored
+
+        Returns:
+            dict: Return a dictionary with the result data and other metadata
+        """
+        words = self._tokenize(q)
+        if words:
+            ids = None
+            for i, word in enumerate(words):
+                if i == len(words) - 1:
+                    matched = self._prefix_ids(word)
+                else:
+                    matched = self._index.get(word, set())
+                ids = matched if ids is None else ids & matched
+                if not ids:
+                    break
+        else:
+            ids = set(self.types)
+
+        hits = list()
+        for type_id in sorted(ids):
+            summary = self.types[type_id]
+            if issuer and (summary.get("issuer") or dict()).get("code") != issuer:
+                continue
+            if category and summary.get("category") != category:
+                continue
+            hits.append(summary)
+
+        start = (max(page, 1) - 1) * count
+        return self._result(
+            data={"count": len(hits), "types": hits[start : start + count]}
+        )
+
+    def getType(self, type_id: int = int(), **kwargs) -> dict:
+        """Find a mirrored type by ID, in the same shape as Numista().getType()
+        # noqa: E501
+
+        Args:
+            type_id (int, optional): ID of the type
+            **kwargs: Accepted for signature compatibility with Numista().getType(), ignored
+
+        Returns:
+            dict: Return a dictionary with the result data and other metadata. HTTP 404 when not mirrored
+        """
+        detail = self.details.get(int(type_id)) if type_id else None
+        if detail is None:
+            return self._result(data=dict(), http_status=404)
+        return self._result(data=detail)
@@ -5,28 +5,37 @@ Attributes:
     API_DOCS_URL (str): URL for the documentation of the Numista API
     API_SCHEMA_URL (str): URL for the schema of the Numista API
     DEFAULT_API_VER (int): Default version of the api to use
+    DEFAULT_BULK_WORKERS (int): Default number of concurrent requests for bulk operations
     DEFAULT_CURRENCY (str): Default 3-letter ISO 4217 currency code
     DEFAULT_DATETIME_FMT (str): Default format for DateTime strings
     DEFAULT_ENDPOINT_URI (str): Default endpoint URI
     DEFAULT_LANG (str): Default language for results
     DEFAULT_LOG_LEVEL (object): Default logging level for the logger
     DEFAULT_LOG_PATH (str): Default path for the log file
+    DEFAULT_PRIORITY (str): Default priority class of requests sent through a RequestScheduler
+    DEFAULT_RATE_LIMIT (float): Default number of requests per second for bulk operations
+    DEFAULT_TIMEOUT (tuple): Default (connect, read) timeouts of requests, in seconds
     DEFAULT_TOKEN_LABEL (str): Default label for new tokens
     HTTP_STATUS_RESPONSE_MESSAGE (dict): A dictionary of HTTP repsonse codes and messages
     VALID_API_USER_SCOPES (list): Valid user scopes supported by the API
+    VALID_API_USER_SCOPES_SET (frozenset): VALID_API_USER_SCOPES, for membership checks
     VALID_CATEGORY_TYPES (list): Valid categories supported by the API
+    VALID_CATEGORY_TYPES_SET (frozenset): VALID_CATEGORY_TYPES, for membership checks
     VALID_HTTP_METHODS (list): Valid HTTP methods supported by the API
+    VALID_HTTP_METHODS_SET (frozenset): VALID_HTTP_METHODS, for membership checks
     VALID_NUMISTA_GRADES (list): Valid grading labels supported by the API
+    VALID_NUMISTA_GRADES_SET (frozenset): VALID_NUMISTA_GRADES, for membership checks
     VALID_OAUTH_GRANT_TYPES (list): Valid permission grants supported by the API
+    VALID_PRIORITY_CLASSES (list): Priority classes of a RequestScheduler, highest first
 """
+import hashlib
 import json
 import logging
+import threading
 import time
 
-import requests
-import ruamel.yaml
-import validators
-from iso4217 import Currency
+# requests, ruamel.yaml, validators and iso4217 are imported where they are used
+# so that 'import numista' stays cheap for short lived processes.
 
 API_BASE_URL = "https://api.numista.com/api"
 API_DOCS_URL = "https://en.numista.com/api/doc/index.php"
@@ -40,17 +49,27 @@ DEFAULT_CURRENCY = "USD"  # 3-letter ISO 4217 currency code
 DEFAULT_LANG = "en"  # ["en", "fr", "es"]
 DEFAULT_DATETIME_FMT = "%Y-%m-%d %H:%M:%S"
 DEFAULT_TOKEN_LABEL = "unnamed_token"
+DEFAULT_BULK_WORKERS = 4
+DEFAULT_RATE_LIMIT = 5.0  # requests per second
+DEFAULT_PRIORITY = "default"
+DEFAULT_TIMEOUT = (3.05, 30.0)  # (connect, read) seconds
 
 HTTP_STATUS_RESPONSE_MESSAGE = {
+    0: "No response from the API",
     200: "Request successful",
     201: "The requested operation was accepted and successful",
     202: "The requested operation was accepted and successful",
     204: "The item has been deleted",
+    304: "Not modified since the ETag sent with If-None-Match",
     400: "Invalid parameter or missing mandatory parameter",
     401: "Invalid or missing API key, or insufficient permission",
     404: "The requested item not found, or you are not allowed to access it",
     429: "Quota exceeded",
+    500: "Internal server error",
     501: "No user associated to your API key (for grant type 'client_credentials')",
+    502: "Bad gateway",
+    503: "Service unavailable",
+    504: "Gateway timeout",
 }
 
 VALID_HTTP_METHODS = ["get", "post", "patch", "delete"]
@@ -64,12 +83,21 @@ VALID_OAUTH_GRANT_TYPES = ["authorization_code", "client_credentials"]
 
 VALID_NUMISTA_GRADES = ["g", "vg", "f", "vf", "xf", "au", "unc"]
 
+VALID_PRIORITY_CLASSES = ["interactive", "default", "background"]  # Highest first
 
-def load_yaml(yaml_path=None) -> dict:
+# Precomputed once for O(1) membership checks, the lists above keep their order for messages
+VALID_HTTP_METHODS_SET = frozenset(VALID_HTTP_METHODS)
+VALID_API_USER_SCOPES_SET = frozenset(VALID_API_USER_SCOPES)
+VALID_CATEGORY_TYPES_SET = frozenset(VALID_CATEGORY_TYPES)
+VALID_NUMISTA_GRADES_SET = frozenset(VALID_NUMISTA_GRADES)
+
+
+def load_yaml(yaml_path=None, timeout: object = DEFAULT_TIMEOUT) -> dict:
     """Loads a YAML file by file path or URL
 
     Args:
         yaml_path (None, optional): The URL or file path of the source YAML doc
+        timeout (tuple, optional): (connect, read) timeouts of the request in seconds, or one number for both. Only used for URLs
 
     Returns:
         dict: A dictionary of the parsed YAML doc
@@ -79,10 +107,15 @@ def load_yaml(yaml_path=None) -> dict:
     """
     if not yaml_path:
         raise ValueError("a yaml file path was not provided, returning None")
+
+    import requests
+    import ruamel.yaml
+    import validators
+
     yml = ruamel.yaml.YAML(typ="safe")
     url = True if validators.url(yaml_path) else False
     if url:
-        r = requests.get(API_SCHEMA_URL)
+        r = requests.get(yaml_path, timeout=timeout)
         parsed_yaml = yml.load(r.content)
     else:
         with open(yaml_path, "r") as f:
@@ -90,16 +123,66 @@ def load_yaml(yaml_path=None) -> dict:
     return {**parsed_yaml}
 
 
+_ACCEPT_ENCODING = None
+
+
+def accept_encoding() -> str:
+    """The Accept-Encoding header of requests: brotli first when the brotli module is installed (pip install numista[brotli]), then gzip"""
+    global _ACCEPT_ENCODING
+    if _ACCEPT_ENCODING is None:
+        from numista.optional import load_brotli
+
+        _ACCEPT_ENCODING = "br, gzip, deflate" if load_brotli() else "gzip, deflate"
+    return _ACCEPT_ENCODING
+
+
+def _wire_bytes(r: object = None, decoded: int = 0) -> int:
+    """Bytes of a response body as received, before decompression
+    From the urllib3 stream when there is one, then Content-Length, then the decoded size (Example: a replayed CassetteResponse)
+    """
+    tell = getattr(getattr(r, "raw", None), "tell", None)
+    if callable(tell):
+        try:
+            return int(tell())
+        except Exception:
+            pass
+    length = str(r.headers.get("Content-Length", ""))
+    return int(length) if length.isdigit() else decoded
+
+
+def _retry_after(value: str = str()) -> float:
+    """Seconds to wait from a Retry-After header, in seconds or an HTTP date. None when it can't be read"""
+    value = str(value).strip()
+    if value.isdigit():
+        return float(value)
+    from datetime import timezone
+    from email.utils import parsedate_to_datetime
+
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)  # "-0000": UTC, source unknown
+    return max(when.timestamp() - time.time(), 0.0)
+
+
 class Numista:
     """Initialize the Class
 
     Attributes:
         addCollectedItems (method): operationId inconsistency, backwards compatability fix
+        compression (bool): Ask the API for gzip/brotli compressed responses
+        context (NumistaContext): Transport, cache and token store, possibly shared with other instances
+        debugLog (DebugLog): Summaries of the last requests, with truncated bodies. None unless debug or debug_log is set
         getCatalogs (method): Alternate spelling of API perfered language
         inputs (dict): A dictionary of the original inputs when instantiated
-        logger (object): The logger class is attached here
+        logger (object): The logger class is attached here (initialized on first use when lazy)
         myTokenGenerate (method): Helper to a private method
         oauthTokens (dict): Dictionary containing all generated tokens by label
+        priority (str): Priority class of this instance's requests when the context has a RequestScheduler
+        timeout (tuple): (connect, read) timeouts of requests, in seconds
+        versionPath (str): The 'version' part of request paths, of the API version in use. Example: "/v3"
     """
 
     def __init__(
@@ -109,6 +192,12 @@ class Numista:
         api_ver: int = DEFAULT_API_VER,
         auto_self_token: bool = False,
         log_path: str = DEFAULT_LOG_PATH,
+        lazy: bool = False,
+        context: object = None,
+        priority: str = DEFAULT_PRIORITY,
+        timeout: tuple = DEFAULT_TIMEOUT,
+        compression: bool = True,
+        debug_log: object = None,
     ):
         """Initialize the Class
         # noqa: E501
@@ -117,24 +206,49 @@ class Numista:
             debug (bool, optional): Initialize the logger as level: DEBUG
             api_key (str, optional): Your Numista API key
             api_ver (int, optional): The API version to use (You probably dont want to change this)
-            auto_self_token (bool, optional): Generate a self token on class instantiation
+            auto_self_token (bool, optional): Generate a self token on class instantiation. Ignored when lazy, the token is generated on first use
             log_path (str, optional): Desired path to log file (including filename)
+            lazy (bool, optional): Defer logger setup and token generation until first use, for cheap per-request instances
+            context (NumistaContext, optional): Transport, cache and token store to share with other instances. Default: a new NumistaContext()
+            priority (str, optional): Default priority class (one of VALID_PRIORITY_CLASSES) of requests when the context has a RequestScheduler. A request can override it with priority=
+            timeout (tuple, optional): (connect, read) timeouts of requests in seconds, or one number for both. A request can override it with timeout=
+            compression (bool, optional): Ask the API for brotli (when installed) or gzip compressed responses. False asks for identity
+            debug_log (DebugLog, optional): Capture request summaries in this bounded log. Default: a DebugLog() when debug, else none
 
         Raises:
             ValueError: When an API Key is not provided
         """
         self._debug = debug
-        self._raw = dict()  # For shoving debug data into.
-        self._init_logger(path=log_path)
+        self._local = threading.local()  # Per-thread debug data, see _raw
+        self._log_path = log_path
+        self._logger = None
+        if not lazy:
+            self._init_logger(path=log_path)
 
         self.inputs = dict()
         self.inputs["api_key"] = api_key
         self.inputs["api_ver"] = api_ver
+        self.priority = priority
+        self.timeout = timeout
+        self.compression = compression
+
+        if debug_log is None and debug:
+            from numista.debug import DebugLog
+
+            debug_log = DebugLog()
+        self.debugLog = debug_log
+
+        api_ver = self.inputs["api_ver"]
+        self._call_api = getattr(self, f"_api_v{api_ver}", None)
+
+        if context is None:
+            from numista.context import NumistaContext
 
-        self._call_api = getattr(self, f"_api_v{self.inputs['api_ver']}", None)
+            context = NumistaContext()
+        self.context = context
 
-        # Store any oauth tokens generated
-        self.oauthTokens = dict()
+        # Store any oauth tokens generated, shared through the context
+        self.oauthTokens = context.oauthTokens
 
         # Add any alternate namings for methods and attributes
         self.getCatalogs = getattr(self, "getCatalogues", None)
@@ -148,21 +262,47 @@ class Numista:
         if not self._call_api:
             msg = f"An unrecognized API Version was provided, setting to version: {DEFAULT_API_VER}"
             self.logger.warning(msg)
+            api_ver = DEFAULT_API_VER
+            self._call_api = getattr(self, f"_api_v{api_ver}")
+        self.versionPath = f"/v{api_ver}"
 
-        if auto_self_token:
+        if auto_self_token and not lazy:
             self.myTokenGenerate()
 
         # API inconsistency that will get patched someday probably. making break proof now.
         self.addCollectedItems = getattr(self, "addCollectedItem")
 
         self._schemas = dict()  # populated by getSchema()
+        self._schema_lock = threading.Lock()  # Held while the schema is fetched, see _fetch_api_schema()
 
-        self.logger.info("Numista() has been initialized")
+        if not lazy:
+            self.logger.info("Numista() has been initialized")
 
     #
     # Helpers
     #
 
+    @property
+    def logger(self) -> object:
+        """The logger, initialized on first use"""
+        if self._logger is None:
+            with self.context.lock:
+                if self._logger is None:
+                    self._init_logger(path=self._log_path)
+        return self._logger
+
+    @logger.setter
+    def logger(self, logger: object = None) -> None:
+        self._logger = logger
+
+    @property
+    def _raw(self) -> dict:
+        """Debug data (Example: _raw['last_request'], the debugLog entry of the thread's last request) of the calling thread"""
+        raw = getattr(self._local, "raw", None)
+        if raw is None:
+            raw = self._local.raw = dict()
+        return raw
+
     def _init_logger(self, path: str = str()) -> None:
         """Initialize logic for the logger
         # noqa: E501
@@ -170,7 +310,7 @@ class Numista:
         Args:
             path (str, optional): Desired path to log file (including filename)
         """
-        self.logger = logging
+        self._logger = logging
         debug = getattr(self, "_debug", None)
 
         # TODO: #9 | Allow to easily modify log level
@@ -234,19 +374,24 @@ class Numista:
             endpoint_uri (str, optional): the URI of the API Endpoint, comes after "/v3"
             body (dict, optional): The body or 'payload' of the request. Only used with POST/PATCH/PUT operations
             add_headers (dict, optional): Headers to add to the default headers. Format: dict({"header": "value"})
-            **kwargs: Other fields that need to be passed. Typically, **kwargs: Other fields that need to be passed. Typically, KWARGS are passed as GET paramters in the URI
+            **kwargs: Other fields that need to be passed. Typically, **kwargs: Other fields that need to be passed. Typically, KWARGS are passed as GET paramters in the URI. Except priority (str) and deadline (float, seconds), used by the context's RequestScheduler, timeout (tuple), overriding Numista().timeout, and stream (True or a key), see _send()
 
         Returns:
             dict: Return a dictionary with the result data and other metadata
 
         Raises:
             ValueError: When an invalid value is provided. Example: a value of "string" to an input wanting a dictionary, or an invalid value that has a limited set of valid values
+            TimeoutError: When the request's deadline passed before the scheduler sent it. It was not sent
         """
         http_method = http_method.lower()
+        priority = kwargs.pop("priority", None) or self.priority
+        deadline = kwargs.pop("deadline", None)
+        timeout = kwargs.pop("timeout", None) or self.timeout
+        stream = kwargs.pop("stream", None)
 
         self.logger.debug(f"Input kwargs: {kwargs}")
 
-        if http_method not in VALID_HTTP_METHODS:
+        if http_method not in VALID_HTTP_METHODS_SET:
             msg = f"The provided HTTP Method ({http_method}) is not valid ({VALID_HTTP_METHODS})"
             self._except_and_log(ex_msg=msg)
             raise ValueError(msg)
@@ -268,6 +413,7 @@ class Numista:
             "Numista-API-Key": self.inputs["api_key"],  # fmt: skip
             "Accept": "application/json",
             "Content-Type": "application/json",
+            "Accept-Encoding": accept_encoding() if self.compression else "identity",
         }
 
         if add_headers:
@@ -292,26 +438,157 @@ class Numista:
         self.logger.debug(f"HTTP Method: {http_method}")
         self.logger.debug("Attempting to send to API")
 
-        r = None
-        if http_method == "get":
-            r = requests.get(api_url, headers=headers, params=kwargs)
-        elif http_method == "post":
-            r = requests.post(api_url, headers=headers, params=kwargs, json=body)
-        elif http_method == "patch":
-            r = requests.patch(api_url, headers=headers, params=kwargs, json=body)
-        elif http_method == "delete":
-            r = requests.delete(api_url, headers=headers, params=kwargs)
+        return self._send(
+            http_method=http_method,
+            endpoint_uri=endpoint_uri,
+            api_url=api_url,
+            headers=headers,
+            params=kwargs,
+            body=body,
+            priority=priority,
+            deadline=deadline,
+            timeout=timeout,
+            stream=stream,
+        )
+
+    def _send(
+        self,
+        http_method: str = "get",
+        endpoint_uri: str = str(),
+        api_url: str = str(),
+        headers: dict = dict(),
+        params: dict = dict(),
+        body: dict = dict(),
+        priority: str = DEFAULT_PRIORITY,
+        deadline: float = None,
+        timeout: tuple = DEFAULT_TIMEOUT,
+        template: str = None,
+        stream: object = None,
+    ) -> dict:
+        """Sends a built request through the context's breaker, scheduler and transport, and formats the response
+        Shared by _api_client() and PreparedCall, which builds the request once per operation
+        # noqa: E501
+
+        Args:
+            http_method (str, optional): The HTTP method, lower case
+            endpoint_uri (str, optional): the URI of the API Endpoint, comes after "/v3"
+            api_url (str, optional): The full URL of the request
+            headers (dict, optional): The complete request headers
+            params (dict, optional): GET parameters, without null values
+            body (dict, optional): The body or 'payload' of the request. Only used with POST/PATCH/PUT operations
+            priority (str, optional): Priority class of the request when the context has a RequestScheduler
+            deadline (float, optional): Seconds the request may wait for the RequestScheduler
+            timeout (tuple, optional): (connect, read) timeouts of the request, in seconds
+            template (str, optional): The endpoint template (Example: "GET /types/{id}"), when already known
+            stream (object, optional): Parse a 2xx response incrementally: True for a top-level array, or the key of the array in the top-level object (Example: "types"). data is then a generator of its elements, and extra["meta"] fills with the other top-level values as they are parsed
+
+        Returns:
+            dict: Return a dictionary with the result data and other metadata
+
+        Raises:
+            ValueError: When priority is not one of VALID_PRIORITY_CLASSES and the context has a RequestScheduler. It was not sent
+            TimeoutError: When the request's deadline passed before the scheduler sent it. It was not sent
+        """
+        from numista.breaker import STALE_EXCLUDED_ENDPOINTS, endpoint_template
+
+        if template is None:
+            template = endpoint_template(http_method, endpoint_uri)
+
+        breaker = self.context.breaker
+        if breaker is not None:
+            circuit = template
+            stale_key = None
+            if template not in STALE_EXCLUDED_ENDPOINTS:
+                # Stale data is only served back to the credentials it was fetched with: it can be private to them
+                credentials = "\n".join(headers.get(h, "") for h in ("Numista-API-Key", "Authorization"))
+                stale_key = (
+                    api_url,
+                    json.dumps(params, sort_keys=True, default=str),
+                    hashlib.sha256(credentials.encode("utf-8")).hexdigest(),
+                )
+            if not breaker.allow(circuit):
+                self.logger.info(f"Circuit open for {circuit}, not sending")
+                return self._circuit_fallback(breaker, circuit, stale_key)
+
+        scheduler = self.context.scheduler
+        if scheduler is not None:
+            try:
+                scheduler.acquire(priority=priority, deadline=deadline)
+            except Exception:
+                # Not sent (deadline passed, or an unknown priority): give back a half-open probe
+                if breaker is not None:
+                    breaker.release(circuit)
+                raise
+
+        def fetch(cancelled: object = None) -> tuple:
+            r = self.context.transport.request(
+                http_method.upper(),
+                api_url,
+                headers=headers,
+                params=params,
+                json=body if http_method in ("post", "patch") else None,
+                timeout=timeout,
+                stream=True,
+            )
+            if cancelled is not None and cancelled.is_set():
+                return r, None  # A hedge already won, leave the body unread
+            # Streamed: the body is decompressed chunk by chunk as it is read
+            streaming = stream and r.status_code in range(200, 300)
+            return r, None if streaming else r.content
+
+        def admit() -> object:
+            # A hedge is a request of its own: it takes a scheduler slot, and its rate token
+            scheduler.acquire(priority=priority, deadline=deadline)
+            return lambda: scheduler.release(priority=priority)
+
+        hedge = self.context.hedge
+        sent = time.monotonic()
+        try:
+            if hedge is not None and http_method == "get" and not stream and hedge.hedges(template):
+                r, content = hedge.run(template, fetch, admit=admit if scheduler is not None else None)
+            else:
+                r, content = fetch()
+            streaming = stream and r.status_code in range(200, 300)
+        except Exception as err:
+            if self.debugLog is not None:
+                self._debug_capture(http_method, api_url, template, params, body, sent, error=err)
+            if breaker is None:
+                raise
+            breaker.record(circuit, ok=False)
+            self.logger.warning(f"Request to {circuit} failed: {err}")
+            result = self._circuit_fallback(breaker, circuit, stale_key, error=err)
+            if result["failed"]:
+                raise
+            return result
+        finally:
+            if scheduler is not None:
+                scheduler.release(priority=priority)
 
         self.logger.debug("Completed API Attempt")
 
-        if self._debug and r:
-            self.logger.debug("Storing raw request in _raw['last_request']")
-            self._raw["last_request"] = r
+        if self.debugLog is not None:
+            self._debug_capture(http_method, api_url, template, params, body, sent, r, content)
+
+        if streaming:
+            if breaker is not None:
+                breaker.record(circuit, ok=True)
+            meta = dict()
+            return self._result_format(
+                data=self._stream_elements(r, template, stream, meta),
+                http_status=r.status_code,
+                meta=meta,
+            )
+
+        self._count_transfer(template, r, len(content or b""))
 
         # TODO: #12 | This all can be done better I think
-        if r.status_code in range(100, 599):
+        if r.status_code == 304:
+            # Not modified, the answer to If-None-Match: there is no body to parse
+            result = self._result_format(data=None, http_status=r.status_code)
+
+        elif r.status_code in range(100, 599):
             try:
-                r.json()
+                data = r.json()
             except Exception as err:
                 if http_method != "delete":
                     # TODO: #12 | Find a better way to handle the response coming in from a delete.
@@ -333,27 +610,177 @@ class Numista:
                     data = {"content": r.content}  # Probably empty anyway
                 else:
                     data = json.loads(content)
-            else:
-                data = r.json()
 
-            self.logger.debug(f"API request succeeded, parsed data: {data}")
+            self.logger.debug("API request succeeded, parsed data: %s", data)
 
-            result = self._result_format(
-                data=data, http_status=r.status_code, requests=r
-            )
+            result = self._result_format(data=data, http_status=r.status_code)
 
         else:
             self.logger.debug("API request failed ungracefully")
             http_status = r.status_code if r.status_code else 0
-            result = self._result_format(
-                data=data,
-                failed=True,
-                http_status=http_status,
-                requests=r,
-            )
+            result = self._result_format(data=dict(), failed=True, http_status=http_status)
+
+        etag = r.headers.get("ETag")
+        if etag:
+            result["extra"]["etag"] = etag  # For conditional requests: add_headers={"If-None-Match": etag}
+        retry_after = r.headers.get("Retry-After")
+        if retry_after:
+            result["extra"]["retry_after"] = _retry_after(retry_after)
+
+        if breaker is not None:
+            ok = r.status_code < 500
+            breaker.record(circuit, ok=ok)
+            if not ok:
+                self.logger.warning(f"Request to {circuit} failed with HTTP {r.status_code}")
+                stale = self._circuit_fallback(breaker, circuit, stale_key)
+                if not stale["failed"]:
+                    return stale
+            elif http_method == "get" and r.status_code == 200 and stale_key is not None:
+                breaker.store(stale_key, result["data"])
 
         return result
 
+    def _debug_capture(
+        self,
+        http_method: str = str(),
+        api_url: str = str(),
+        template: str = str(),
+        params: dict = None,
+        body: dict = None,
+        sent: float = 0.0,
+        r: object = None,
+        content: bytes = None,
+        error: object = None,
+    ) -> None:
+        """Add a summary of a request to debugLog, and to _raw['last_request'] of the calling thread"""
+        decoded = len(content) if content is not None else 0
+        self._raw["last_request"] = self.debugLog.record(
+            method=http_method,
+            url=api_url,
+            endpoint=template,
+            params=params,
+            request_body=body if http_method in ("post", "patch") else None,
+            status=r.status_code if r is not None else 0,
+            elapsed=time.monotonic() - sent,
+            wire_bytes=_wire_bytes(r, decoded) if content is not None else 0,
+            decoded_bytes=decoded,
+            response_body=content,
+            error=error,
+        )
+
+    def _stream_elements(
+        self, r: object = None, template: str = str(), stream: object = True, meta: dict = None
+    ) -> object:
+        """Yield the elements of a streamed response's array as they are read, then count its bytes and release its connection"""
+        from numista.streaming import DEFAULT_STREAM_CHUNK, iter_json_array
+
+        decoded = [0]
+
+        def chunks():
+            # Transports without iter_content() (Example: a replaying Cassette) hold the whole body already
+            iter_content = getattr(r, "iter_content", None)
+            for chunk in iter_content(DEFAULT_STREAM_CHUNK) if iter_content else [r.content]:
+                decoded[0] += len(chunk)
+                yield chunk
+
+        key = None if stream is True else stream
+        try:
+            yield from iter_json_array(chunks(), key=key, meta=meta)
+        finally:
+            self._count_transfer(template, r, decoded[0])
+            if hasattr(r, "close"):
+                r.close()
+
+    def _stream_data(self, result: dict = dict(), key: str = str(), caller: str = str()) -> object:
+        """The elements of a result requested with stream=key: a generator, or a list when the result was not streamed (Example: served stale by the CircuitBreaker)
+        # noqa: E501
+
+        Raises:
+            ValueError: When the request failed
+        """
+        if result["failed"] or result["http_info"]["http_status"] not in range(200, 300):
+            msg = f"{caller}() failed: {result['http_info']}"
+            self._except_and_log(ex_msg=msg)
+            raise ValueError(msg)
+        data = result["data"]
+        if isinstance(data, dict):
+            return data.get(key, list())
+        return data
+
+    def _count_transfer(self, template: str = str(), r: object = None, decoded: int = 0) -> None:
+        """Add a response to the context's TransferStats, by endpoint template"""
+        self.context.transfer.record(
+            endpoint=template,
+            wire_bytes=_wire_bytes(r, decoded),
+            decoded_bytes=decoded,
+            encoding=r.headers.get("Content-Encoding", "identity") or "identity",
+        )
+
+    def _cached_get(self, endpoint_uri: str = str(), **kwargs) -> dict:
+        """A GET through the context's SWRCache, when it has one. Otherwise the same as _call_api()
+        Stale results are returned at once and refreshed in the background (priority: background)
+        # noqa: E501
+
+        Args:
+            endpoint_uri (str, optional): the URI of the API Endpoint, comes after "/v3"
+            **kwargs: Passed to _call_api()
+
+        Returns:
+            dict: Return a dictionary with the result data and other metadata. With an SWRCache, extra has "cache": "fresh", "stale" or "miss"
+        """
+        swr = self.context.swr
+        if swr is None:
+            return self._call_api(http_method="get", endpoint_uri=endpoint_uri, **kwargs)
+
+        params = {k: v for k, v in kwargs.items() if k not in ("priority", "deadline", "timeout")}
+        key = (endpoint_uri, json.dumps(params, sort_keys=True, default=str))
+
+        def fetch(**overrides):
+            return self._call_api(
+                http_method="get", endpoint_uri=endpoint_uri, **{**kwargs, **overrides}
+            )
+
+        def cacheable(result):
+            return (
+                not result["failed"]
+                and result["http_info"]["http_status"] == 200
+                and not result["extra"].get("stale")
+            )
+
+        result, state = swr.load(
+            key,
+            fetch,
+            refresh=lambda: fetch(priority="background"),
+            cacheable=cacheable,
+        )
+        return {**result, "extra": {**result["extra"], "cache": state}}
+
+    def _circuit_fallback(
+        self, breaker, circuit: str = str(), stale_key: tuple = tuple(), error: object = None
+    ) -> dict:
+        """The result of a request the CircuitBreaker stopped, or that failed: stale data when kept, otherwise a failed result
+        # noqa: E501
+
+        Args:
+            breaker (CircuitBreaker): The context's breaker
+            circuit (str): The circuit key of the request
+            stale_key (tuple): The key of the request's stale data. None when it is never served stale
+            error (object, optional): The exception the request failed with
+
+        Returns:
+            dict: Return a dictionary with the result data and other metadata. extra has "circuit" (the circuit state) and "stale" (bool)
+        """
+        state = breaker.state(circuit)
+        data = None if stale_key is None else breaker.stale(stale_key)
+        if data is not None:
+            self.logger.info(f"Serving stale data for {circuit} (circuit {state})")
+            return self._result_format(data=data, http_status=200, circuit=state, stale=True)
+
+        extra = {"circuit": state, "stale": False}
+        if error is not None:
+            extra["error"] = str(error)
+        return self._result_format(data=dict(), http_status=0, failed=True, **extra)
+
     def _api_v3(self, **kwargs) -> dict:
         """SHIM: Any logic that is API Version 3 specific
         # noqa: E501
@@ -407,7 +834,7 @@ class Numista:
             "data": data,
             "http_info": {
                 "http_status": http_status,
-                "http_msg": HTTP_STATUS_RESPONSE_MESSAGE[http_status],
+                "http_msg": HTTP_STATUS_RESPONSE_MESSAGE.get(http_status, "Unexpected HTTP status"),
             },
             "failed": failed,
             "extra": kwargs,
@@ -485,17 +912,10 @@ class Numista:
                 self._except_and_log(ex_msg=msg)
                 raise ValueError(msg)
 
-        if not token_label:
-            token_count = len(self.oauthTokens)
-            token_label = f"{DEFAULT_TOKEN_LABEL}{token_count+1}"
-            self.logger.warn(
-                f"token_label is required but none provided. Setting to {token_label}"
-            )
-
         # Make sure scope is valid
         self.logger.debug(f"Validating scope string comma seperated list: {scope}")
         scopes = [
-            s.strip() for s in scope.split(",") if s.strip() in VALID_API_USER_SCOPES
+            s.strip() for s in scope.split(",") if s.strip() in VALID_API_USER_SCOPES_SET
         ]
 
         if not scopes:
@@ -524,7 +944,7 @@ class Numista:
                 "to OAuth. Please check logs for details. (Try Numista().debug=True)"
             )
             self.logger.critical(msg)
-            self._except_and_log(ex_msg=result.json())
+            self._except_and_log(ex_msg=str(result["http_info"]))
             raise ValueError(msg)
 
         # Trim 1 second to ensure we assume exp before actual exp and to account for process delay
@@ -536,19 +956,30 @@ class Numista:
 
         # Format and store token
         token = {
-            token_label: {
-                "token": result["data"]["access_token"],
-                "user_id": result["data"]["user_id"],
-                "type": result["data"]["token_type"],
-                "scope": kwargs["scope"],
-                "exp_epoch": expires_at,
-                "exp_date": expires_date,
-            }
+            "token": result["data"]["access_token"],
+            "user_id": result["data"]["user_id"],
+            "type": result["data"]["token_type"],
+            "scope": kwargs["scope"],
+            "exp_epoch": expires_at,
+            "exp_date": expires_date,
         }
-        self.oauthTokens.update(token)
+
+        # Pick the label and store under one lock, so concurrent calls never share a label
+        with self.context.lock:
+            if not token_label:
+                token_count = len(self.oauthTokens)
+                token_label = f"{DEFAULT_TOKEN_LABEL}{token_count+1}"
+                while token_label in self.oauthTokens:
+                    token_count += 1
+                    token_label = f"{DEFAULT_TOKEN_LABEL}{token_count+1}"
+                self.logger.warning(
+                    f"token_label is required but none provided. Setting to {token_label}"
+                )
+            self.oauthTokens[token_label] = token
+            self.context.auth.pop(token_label, None)
         self.logger.info(f"Token with label: {token_label} stored in dict(oauthTokens)")
 
-        return self.oauthTokens[token_label]
+        return token
 
     def _oauth_self(self, scope: str = str(), **kwargs) -> dict:
         """Authenticate yourself for OAuth
@@ -611,6 +1042,8 @@ class Numista:
         """
         # TODO: #13 | This can be written SO much better
         token = None
+        if token_label == "self" and not no_self:
+            token_label = str()  # Generated on first use, as with no label (lazy clients)
         if token_label:
             self.logger.debug(
                 f"Attempting to fetch bearer token with label: {token_label}"
@@ -640,7 +1073,7 @@ class Numista:
                     self.logger.debug(msg)
 
                     # result = self._oauth_self(scopes=["view_collection"])
-                    result = self.myTokenGenerate()
+                    result = self._my_token_dict()
                     gen_attempted = True
                 elif not my_token and gen_attempted:
                     msg = "Attempted to generate bearer token for 'self' and failed"
@@ -654,6 +1087,46 @@ class Numista:
         self.logger.debug("Token found")
         return token
 
+    def _auth(self, token_label: str = "self", caller: str = str()) -> dict:
+        """The user ID, token and Authorization header of a token label, resolved once per token
+        Kept in the context until the token under that label is refreshed, so repeated collection calls skip the lookups
+        # noqa: E501
+
+        Args:
+            token_label (str, optional): The Label of the token that is stored to use as authorization
+            caller (str, optional): Name of the calling method, for the error message
+
+        Returns:
+            dict: {"user_id", "token", "headers": {"Authorization": "Bearer ..."}}
+
+        Raises:
+            LookupError: When no token can be found for token_label
+        """
+        label = token_label or "self"
+        auth = self.context.auth.get(label)
+        if auth is not None and auth["source"] is self.oauthTokens.get(label):
+            return auth
+
+        token_dict = self._get_token_by_label(token_label=token_label)
+        token = token_dict["token"] if token_dict else None
+        if not token:
+            self.logger.critical("No token found")
+            ex_msg = (
+                "A critical error was found when trying to access a collection with "
+                f"a token labeled: {token_label} in method '{caller}()'"
+            )
+            self._except_and_log(ex_msg=ex_msg)
+            raise LookupError(ex_msg)
+
+        auth = {
+            "source": token_dict,  # A refreshed token is a new dict: the entry is stale
+            "user_id": token_dict["user_id"],
+            "token": token,
+            "headers": {"Authorization": f"Bearer {token}"},
+        }
+        self.context.auth[label] = auth
+        return auth
+
     def _validate_body(self, body: dict = dict()) -> bool:
         """Check if body is populated by something
         Enables consistent logging and reduction of code copypasta
@@ -678,7 +1151,7 @@ class Numista:
         return result
 
     def _validate_field_in(
-        self, field: str = str(), in_iter: (list, set, tuple) = list()
+        self, field: str = str(), in_iter: (list, set, frozenset, tuple) = list()
     ) -> str:
         """Accepts a field as a string, and checks if it is in the iterable (valid set)
         Returns the field if valid
@@ -686,15 +1159,14 @@ class Numista:
 
         Args:
             field (str, optional): The field to check
-            in_iter (list, set, tuple, optional): The iterable that should be checked if field is in
+            in_iter (list, set, frozenset, tuple, optional): The iterable that should be checked if field is in. Prefer a frozenset
 
         Returns:
             str: If the field is valid, you will receive
         """
-        valid_iter_types = (list, set, tuple)
+        valid_iter_types = (list, set, frozenset, tuple)
         result = str()
 
-        self.logger.debug(f"Validating if {field} in {in_iter}")
         if isinstance(in_iter, valid_iter_types):
             result = str(field) if field in in_iter else str()
         else:
@@ -702,15 +1174,18 @@ class Numista:
                 f"A non-iterable type ({type(in_iter)}) was provided to 'in_iter'. "
                 f"Valid types: {valid_iter_types}"
             )
-            self.logger.warn(msg)
+            self.logger.warning(msg)
 
         return result
 
     def _fetch_api_schema(self) -> bool:
         """Fetch the schema defined in API_SCHEMA_URL
-        Stores result in Numista()._schemas
+        Stores result in Numista()._schemas. Concurrent callers wait for one fetch, under a lock of the schema only
         """
-        self._schemas = load_yaml(API_SCHEMA_URL)
+        with self._schema_lock:
+            if not self._schemas:
+                schemas = load_yaml(API_SCHEMA_URL, timeout=self.timeout)
+                self._schemas = schemas  # Only published once complete
 
     def validateGrade(self, grade: str = str()) -> str:
         """Validates a grade.
@@ -725,8 +1200,7 @@ class Numista:
         """
         result = str()
         if grade:
-            self.logger.debug(f"Validating Grade: {grade}")
-            result = self._validate_field_in(field=grade, in_iter=VALID_NUMISTA_GRADES)
+            result = str(grade) if grade in VALID_NUMISTA_GRADES_SET else str()
         else:
             self.logger.info(
                 "No value for grade provided, returning json string of valid grades"
@@ -736,6 +1210,22 @@ class Numista:
 
         return result
 
+    def _my_token_dict(self) -> dict:
+        """Returns the token dict with label: 'self'
+        Generates it if not present, once: concurrent callers wait for the first one, under the context's token_lock('self')
+
+        Returns:
+            dict: The token dict ('self')
+        """
+        my_token = self.oauthTokens.get("self", None)
+        if not my_token:
+            with self.context.token_lock("self"):
+                my_token = self.oauthTokens.get("self", None)
+                if not my_token:
+                    self.logger.debug("My Token hasn't been generated yet, generating now...")
+                    my_token = self.myTokenGenerate()
+        return my_token
+
     def myToken(self) -> str:
         """Returns the token with label: 'self'
         Generates token if not present
@@ -743,10 +1233,7 @@ class Numista:
         Returns:
             str: Returns your token ('self')
         """
-        my_token = self.oauthTokens.get("self", None)
-        if not my_token:
-            self.logger.debug("My Token hasn't been generated yet, generating now...")
-            my_token = self.myTokenGenerate()
+        my_token = self._my_token_dict()
 
         return my_token["token"]
 
@@ -757,8 +1244,11 @@ class Numista:
             str: Returns your new token ('self')
         """
         self.logger.debug("Destroying existing token 'self'")
-        self.oauthTokens.pop("self")
-        return self.myToken()
+        with self.context.token_lock("self"):
+            with self.context.lock:
+                self.oauthTokens.pop("self", None)
+                self.context.auth.pop("self", None)
+            return self.myTokenGenerate()["token"]
 
     def myUserId(self) -> str:
         """Returns the user_id from token with with label: 'self'
@@ -766,10 +1256,7 @@ class Numista:
         Returns:
             str: Returns your user ID
         """
-        my_token = self.oauthTokens.get("self", None)
-        if not my_token:
-            self.logger.debug("My Token hasn't been generated yet, generating now...")
-            my_token = self.myTokenGenerate()
+        my_token = self._my_token_dict()
 
         return my_token["user_id"]
 
@@ -784,13 +1271,42 @@ class Numista:
             str: Returns the Expiration of your token. Always a string even when epoch: True
         """
         time_field = "exp_epoch" if epoch else "exp_date"
-        my_token = self.oauthTokens.get("self", None)
-        if not my_token:
-            self.logger.debug("My Token hasn't been generated yet, generating now...")
-            my_token = self.myTokenGenerate()
+        my_token = self._my_token_dict()
 
         return my_token[time_field]
 
+    def prepare(self, operation: str = str(), token_label: str = "self", **defaults) -> object:
+        """Prepare an operation for hot loops: its URL, headers and parameter schema are built once, calls only fill in IDs
+        Example: prices = n.prepare("getPrices", currency="EUR"); prices(420, 1); prices(type_id=420, issue_id=2, lang="fr")
+        # noqa: E501
+
+        Args:
+            operation (str): One of PREPARED_OPERATIONS (numista.prepared). Example: "getPrices"
+            token_label (str, optional): The Label of the token that is stored to use as authorization, for operations requiring OAuth
+            **defaults: Parameters every call sends unless it overrides them. Example: currency="EUR", lang="fr"
+
+        Returns:
+            PreparedCall: Call it with the IDs and parameters of each request
+
+        Raises:
+            ValueError: When operation is not one of PREPARED_OPERATIONS, or a default is not one of its parameters
+        """
+        from numista.prepared import PreparedCall
+
+        return PreparedCall(self, operation=operation, token_label=token_label, **defaults)
+
+    def transferStats(self, reset: bool = False) -> dict:
+        """Response bytes on the wire against decoded, per endpoint template, of every client sharing this context
+        # noqa: E501
+
+        Args:
+            reset (bool, optional): Zero the counters after reading them
+
+        Returns:
+            dict: {"endpoints": {"GET /types/{id}": {"requests", "wire_bytes", "decoded_bytes", "ratio", "encodings"}}, "total": {"requests", "wire_bytes", "decoded_bytes", "ratio"}}. ratio is wire / decoded bytes
+        """
+        return self.context.transfer.snapshot(reset=reset)
+
     def schemaFind(
         self, operationId: str = str(), http_method: str = "get", flat: bool = True
     ) -> dict:
@@ -819,7 +1335,7 @@ class Numista:
             self._except_and_log(ex_msg=msg)
             raise ValueError(msg)
 
-        if http_method not in VALID_HTTP_METHODS:
+        if http_method not in VALID_HTTP_METHODS_SET:
             msg = f"The provided http_method: {http_method} must be one of {VALID_HTTP_METHODS}"
             self.logger.info(msg)
             self._except_and_log(ex_msg=msg)
@@ -956,12 +1472,12 @@ class Numista:
         else:
             kwargs["q"] = q
 
-        if category not in VALID_CATEGORY_TYPES:
+        if category not in VALID_CATEGORY_TYPES_SET:
             msg = (
                 f"The Category provided ({category}) is not in the list of valid options: "
                 f"({VALID_CATEGORY_TYPES}). Attempting with category: coins"
             )
-            self.logger.warn(msg)
+            self.logger.warning(msg)
             self._except_and_log(ex_msg=msg)
             kwargs["category"] = "coins"
         else:
@@ -974,6 +1490,65 @@ class Numista:
 
         return self._call_api(http_method="get", endpoint_uri=endpoint_uri, **kwargs)
 
+    def streamTypes(
+        self,
+        q: str = str(),
+        issuer: str = str(),
+        category: str = str(),
+        count: int = 50,
+        lang: str = DEFAULT_LANG,
+        max_pages: int = 0,
+        **kwargs,
+    ) -> object:
+        """Search the catalogue like searchTypes(), yielding types one at a time across pages as they are parsed off the socket
+        Memory stays flat whatever the number of results: a page is never held in full
+        # noqa: E501
+
+        Args:
+            q (str, optional): Search query. Example: "Buffalo"
+            issuer (str, optional): Issuer code. If provided, only the coins from the given issuer are returned.
+            category (str, optional): If this parameter is provided, only items of the given category are returned. Available values : coin, banknote, exonumia
+            count (int, optional): Results per page. Default value : 50
+            lang (str, optional): Language. Available values : en, es, fr. Default value : en
+            max_pages (int, optional): Stop after this many pages. 0 for all
+            **kwargs: Other fields that need to be passed. Typically, KWARGS are passed as GET paramters in the URI
+
+        Yields:
+            dict: Each type, as in searchTypes()["data"]["types"]
+
+        Raises:
+            ValueError: When category is invalid, or a page could not be fetched
+        """
+        if category not in VALID_CATEGORY_TYPES_SET:
+            msg = f"The Category provided ({category}) must be one of {VALID_CATEGORY_TYPES}"
+            self._except_and_log(ex_msg=msg)
+            raise ValueError(msg)
+
+        page = 1
+        yielded = 0
+        while True:
+            result = self._call_api(
+                http_method="get",
+                endpoint_uri="/types",
+                stream="types",
+                q=q,
+                issuer=issuer,
+                category=category,
+                page=page,
+                count=count,
+                lang=lang,
+                **kwargs,
+            )
+            on_page = 0
+            for on_page, item in enumerate(self._stream_data(result, "types", "streamTypes"), 1):
+                yield item
+            yielded += on_page
+
+            total = result["extra"].get("meta", result["data"]).get("count", 0)
+            if on_page < count or yielded >= total or (max_pages and page >= max_pages):
+                return
+            page += 1
+
     def addType(self, lang: str = DEFAULT_LANG, body: dict = dict(), **kwargs) -> dict:
         """This endpoint allows to add a coin to the catalogue.
         It requires a specific permission associated to your API key.
@@ -1042,7 +1617,7 @@ class Numista:
 
         kwargs["lang"] = lang
 
-        return self._call_api(http_method="get", endpoint_uri=endpoint_uri, **kwargs)
+        return self._cached_get(endpoint_uri=endpoint_uri, **kwargs)
 
     def getIssues(
         self, type_id: int = int(), lang: str = DEFAULT_LANG, **kwargs
@@ -1167,16 +1742,16 @@ class Numista:
             self._except_and_log(ex_msg=msg)
             raise ValueError(msg)
 
+        from numista.validation import currency_codes
+
         # Munge string and check validity
         currency = currency.upper()
-        currency = (
-            currency if getattr(Currency, currency.lower(), None) else DEFAULT_CURRENCY
-        )
+        currency = currency if currency in currency_codes() else DEFAULT_CURRENCY
 
         kwargs["lang"] = lang
         kwargs["currency"] = currency
 
-        return self._call_api(http_method="get", endpoint_uri=endpoint_uri, **kwargs)
+        return self._cached_get(endpoint_uri=endpoint_uri, **kwargs)
 
     def getIssuers(self, lang: str = DEFAULT_LANG, **kwargs) -> dict:
         """Retrieve the list of issuing countries and territories
@@ -1195,7 +1770,9 @@ class Numista:
         self.logger.debug(f"Language: {lang}")
         self.logger.debug(f"KWARGS: {kwargs}")
 
-        return self._call_api(http_method="get", endpoint_uri=endpoint_uri, **kwargs)
+        kwargs["lang"] = lang
+
+        return self._cached_get(endpoint_uri=endpoint_uri, **kwargs)
 
     def getCatalogues(self, **kwargs) -> dict:
         """Retrieve the list of catalogues used for coin references
@@ -1272,49 +1849,27 @@ class Numista:
         Raises:
             LookupError: A lookup for other data failed. Example: trying to find a token by a label that doesnt exist
         """
-        if not user_id:
-            msg = "user_id (int) is a required field, defaulting to myUserId()"
-            self.logger.info(msg)
-            user_id = self.myUserId()
-
-        endpoint_uri = f"/users/{user_id}/collections"
-
-        self.logger.debug(f"getUserCollections() | at endpoint: {endpoint_uri}")
-        self.logger.debug(f"User ID: {user_id}")
-        self.logger.debug(f"Category: {category}")
-        self.logger.debug(f"Trying Token with Label: {token_label}")
-        self.logger.debug(f"KWARGS: {kwargs}")
-
-        if category not in VALID_CATEGORY_TYPES:
+        if category not in VALID_CATEGORY_TYPES_SET:
             msg = (
                 f"The Category provided ({category}) is not in the list of valid options: "
                 f"({VALID_CATEGORY_TYPES}). Attempting with category: coins"
             )
-            self.logger.warn(msg)
+            self.logger.warning(msg)
             self._except_and_log(ex_msg=msg)
             kwargs["category"] = "coins"
         else:
             kwargs["category"] = category
 
-        token_dict = self._get_token_by_label(token_label=token_label)
-        token = token_dict["token"]
-
-        if not token:
-            msg = "No token found"
-            self.logger.critical(msg)
-            ex_msg = (
-                "A critical error was found when trying to get a collection with "
-                f"a token labeled: {token_label} in method 'getUserCollections()'"
-            )
-            self._except_and_log(ex_msg=ex_msg)
-            raise LookupError(ex_msg)
+        auth = self._auth(token_label=token_label, caller="getUserCollections")
+        user_id = user_id or auth["user_id"]
+        endpoint_uri = f"/users/{user_id}/collections"
 
-        add_headers = {"Authorization": f"Bearer {token}"}
+        self.logger.debug(f"getUserCollections() | at endpoint: {endpoint_uri} | KWARGS: {kwargs}")
 
         return self._call_api(
             http_method="get",
             endpoint_uri=endpoint_uri,
-            add_headers=add_headers,
+            add_headers=auth["headers"],
             **kwargs,
         )
 
@@ -1347,58 +1902,80 @@ class Numista:
         No Longer Raises:
             ValueError: When an invalid value is provided. Example: a value of "string" to an input wanting a dictionary, or an invalid value that has a limited set of valid values
         """
-        if not user_id:
-            msg = "user_id (int) is a required field, defaulting to myUserId()"
-            self.logger.info(msg)
-            user_id = self.myUserId()
-
-        endpoint_uri = f"/users/{user_id}/collected_items"
-
-        self.logger.debug(f"getCollectedItems() | at endpoint: {endpoint_uri}")
-        self.logger.debug(f"User ID: {user_id}")
-        self.logger.debug(f"Category: {category}")
-        self.logger.debug(f"Type ID: {type_id}")
-        self.logger.debug(f"Collection ID: {collection}")
-        self.logger.debug(f"Using Token with Label: {token_label}")
-        self.logger.debug(f"KWARGS: {kwargs}")
-
-        if category not in VALID_CATEGORY_TYPES:
+        if category not in VALID_CATEGORY_TYPES_SET:
             msg = (
                 f"The Category provided ({category}) is not in the list of valid options: "
                 f"({VALID_CATEGORY_TYPES}). Attempting with category: coins"
             )
-            self.logger.warn(msg)
+            self.logger.warning(msg)
             self._except_and_log(ex_msg=msg)
             kwargs["category"] = "coins"
         else:
             kwargs["category"] = category
 
-        token_dict = self._get_token_by_label(token_label=token_label)
-        token = token_dict["token"]
-
-        if not token:
-            msg = "No token found"
-            self.logger.critical(msg)
-            ex_msg = (
-                "A critical error was found when trying to get a collection with "
-                f"a token labeled: {token_label} in method 'getUserItems()'"
-            )
-            self._except_and_log(ex_msg=ex_msg)
-            raise LookupError(ex_msg)
-
-        kwargs["type"] = type_id  # TODO: #5
-        kwargs["type"] = type
-
+        kwargs["type"] = type_id
         kwargs["collection"] = collection
 
-        add_headers = {"Authorization": f"Bearer {token}"}
+        auth = self._auth(token_label=token_label, caller="getCollectedItems")
+        user_id = user_id or auth["user_id"]
+        endpoint_uri = f"/users/{user_id}/collected_items"
+
+        self.logger.debug(f"getCollectedItems() | at endpoint: {endpoint_uri} | KWARGS: {kwargs}")
 
         return self._call_api(
             http_method="get",
             endpoint_uri=endpoint_uri,
-            add_headers=add_headers,
+            add_headers=auth["headers"],
+            **kwargs,
+        )
+
+    def streamCollectedItems(
+        self,
+        user_id: int = int(),
+        category: str = str(),
+        type_id: int = int(),
+        collection: int = int(),
+        token_label: str = "self",
+        **kwargs,
+    ) -> object:
+        """Get the items owned by a user like getCollectedItems(), yielding them one at a time as they are parsed off the socket
+        Memory stays flat whatever the size of the collection
+        # noqa: E501
+
+        Args:
+            user_id (int, optional): ID of the User, defaults to the user of the token
+            category (str, optional): If this parameter is provided, only items of the given category are returned. Available values : coin, banknote, exonumia
+            type_id (int, optional): If this parameter is provided, only items of the given type are returned.
+            collection (int, optional): Collection ID. If this parameter is provided, only items in the given collection are returned.
+            token_label (str, optional): The Label of the token that is stored to use as authorization
+            **kwargs: Other fields that need to be passed. Typically, KWARGS are passed as GET paramters in the URI
+
+        Yields:
+            dict: Each collected item, as in getCollectedItems()["data"]["items"]
+
+        Raises:
+            LookupError: A lookup for other data failed. Example: trying to find a token by a label that doesnt exist
+            ValueError: When category is invalid, or the items could not be fetched
+        """
+        if category not in VALID_CATEGORY_TYPES_SET:
+            msg = f"The Category provided ({category}) must be one of {VALID_CATEGORY_TYPES}"
+            self._except_and_log(ex_msg=msg)
+            raise ValueError(msg)
+
+        auth = self._auth(token_label=token_label, caller="streamCollectedItems")
+        user_id = user_id or auth["user_id"]
+
+        result = self._call_api(
+            http_method="get",
+            endpoint_uri=f"/users/{user_id}/collected_items",
+            add_headers=auth["headers"],
+            stream="items",
+            category=category,
+            type=type_id,
+            collection=collection,
             **kwargs,
         )
+        yield from self._stream_data(result, "items", "streamCollectedItems")
 
     def addCollectedItem(
         self,
@@ -1423,19 +2000,6 @@ class Numista:
             LookupError: A lookup for other data failed. Example: trying to find a token by a label that doesnt exist
             ValueError: When an invalid value is provided. Example: a value of "string" to an input wanting a dictionary, or an invalid value that has a limited set of valid values
         """
-        if not user_id:
-            msg = "user_id (int) is a required field, defaulting to myUserId()"
-            self.logger.info(msg)
-            user_id = self.myUserId()
-
-        endpoint_uri = f"/users/{user_id}/collected_items"
-
-        self.logger.debug(f"addCollectedItems() | at endpoint: {endpoint_uri}")
-        self.logger.debug(f"User ID: {user_id}")
-        self.logger.debug(f"Body: {body}")
-        self.logger.debug(f"Trying Token with Label: {token_label}")
-        self.logger.debug(f"KWARGS: {kwargs}")
-
         if not self._validate_body(body):
             msg = "Body validation failed"
             self._except_and_log(ex_msg=msg)
@@ -1443,25 +2007,16 @@ class Numista:
         else:
             kwargs["body"] = body
 
-        token_dict = self._get_token_by_label(token_label=token_label)
-        token = token_dict["token"]
-
-        if not token:
-            msg = "No token found"
-            self.logger.critical(msg)
-            ex_msg = (
-                "A critical error was found when trying to get a collection with "
-                f"a token labeled: {token_label} in method 'addCollectedItemss()'"
-            )
-            self._except_and_log(ex_msg=ex_msg)
-            raise LookupError(ex_msg)
+        auth = self._auth(token_label=token_label, caller="addCollectedItem")
+        user_id = user_id or auth["user_id"]
+        endpoint_uri = f"/users/{user_id}/collected_items"
 
-        add_headers = {"Authorization": f"Bearer {token}"}
+        self.logger.debug(f"addCollectedItem() | at endpoint: {endpoint_uri} | KWARGS: {kwargs}")
 
         return self._call_api(
             http_method="post",
             endpoint_uri=endpoint_uri,
-            add_headers=add_headers,
+            add_headers=auth["headers"],
             **kwargs,
         )
 
@@ -1488,43 +2043,21 @@ class Numista:
             LookupError: A lookup for other data failed. Example: trying to find a token by a label that doesnt exist
             ValueError: When an invalid value is provided. Example: a value of "string" to an input wanting a dictionary, or an invalid value that has a limited set of valid values
         """
-        if not user_id:
-            msg = "user_id (int) is a required field, defaulting to myUserId()"
-            self.logger.info(msg)
-            user_id = self.myUserId()
-
-        endpoint_uri = f"/users/{user_id}/collected_items/{item_id}"
-
-        self.logger.debug(f"getCollectedItem() | at endpoint: {endpoint_uri}")
-        self.logger.debug(f"User ID: {user_id}")
-        self.logger.debug(f"Item ID: {item_id}")
-        self.logger.debug(f"Trying Token with Label: {token_label}")
-        self.logger.debug(f"KWARGS: {kwargs}")
-
         if not item_id:
             msg = "item_id (int) is a required field"
             self._except_and_log(ex_msg=msg)
             raise ValueError(msg)
 
-        token_dict = self._get_token_by_label(token_label=token_label)
-        token = token_dict["token"]
-
-        if not token:
-            msg = "No token found"
-            self.logger.critical(msg)
-            ex_msg = (
-                "A critical error was found when trying to get a collection with "
-                f"a token labeled: {token_label} in method 'getCollectedItem()'"
-            )
-            self._except_and_log(ex_msg=ex_msg)
-            raise LookupError(ex_msg)
+        auth = self._auth(token_label=token_label, caller="getCollectedItem")
+        user_id = user_id or auth["user_id"]
+        endpoint_uri = f"/users/{user_id}/collected_items/{item_id}"
 
-        add_headers = {"Authorization": f"Bearer {token}"}
+        self.logger.debug(f"getCollectedItem() | at endpoint: {endpoint_uri} | KWARGS: {kwargs}")
 
         return self._call_api(
             http_method="get",
             endpoint_uri=endpoint_uri,
-            add_headers=add_headers,
+            add_headers=auth["headers"],
             **kwargs,
         )
 
@@ -1553,20 +2086,6 @@ class Numista:
             LookupError: A lookup for other data failed. Example: trying to find a token by a label that doesnt exist
             ValueError: When an invalid value is provided. Example: a value of "string" to an input wanting a dictionary, or an invalid value that has a limited set of valid values
         """
-        if not user_id:
-            msg = "user_id (int) is a required field, defaulting to myUserId()"
-            self.logger.info(msg)
-            user_id = self.myUserId()
-
-        endpoint_uri = f"/users/{user_id}/collected_items/{item_id}"
-
-        self.logger.debug(f"editCollectedItem() | at endpoint: {endpoint_uri}")
-        self.logger.debug(f"User ID: {user_id}")
-        self.logger.debug(f"Item ID: {item_id}")
-        self.logger.debug(f"Body: {body}")
-        self.logger.debug(f"Trying Token with Label: {token_label}")
-        self.logger.debug(f"KWARGS: {kwargs}")
-
         if not item_id:
             msg = "item_id (int) is a required field"
             self._except_and_log(ex_msg=msg)
@@ -1579,25 +2098,16 @@ class Numista:
         else:
             kwargs["body"] = body
 
-        token_dict = self._get_token_by_label(token_label=token_label)
-        token = token_dict["token"]
-
-        if not token:
-            msg = "No token found"
-            self.logger.critical(msg)
-            ex_msg = (
-                "A critical error was found when trying to get a collection with "
-                f"a token labeled: {token_label} in method 'editCollectedItem()'"
-            )
-            self._except_and_log(ex_msg=ex_msg)
-            raise LookupError(ex_msg)
+        auth = self._auth(token_label=token_label, caller="editCollectedItem")
+        user_id = user_id or auth["user_id"]
+        endpoint_uri = f"/users/{user_id}/collected_items/{item_id}"
 
-        add_headers = {"Authorization": f"Bearer {token}"}
+        self.logger.debug(f"editCollectedItem() | at endpoint: {endpoint_uri} | KWARGS: {kwargs}")
 
         return self._call_api(
             http_method="patch",
             endpoint_uri=endpoint_uri,
-            add_headers=add_headers,
+            add_headers=auth["headers"],
             **kwargs,
         )
 
@@ -1624,42 +2134,253 @@ class Numista:
             LookupError: A lookup for other data failed. Example: trying to find a token by a label that doesnt exist
             ValueError: When an invalid value is provided. Example: a value of "string" to an input wanting a dictionary, or an invalid value that has a limited set of valid values
         """
-        if not user_id:
-            msg = "user_id (int) is a required field, defaulting to myUserId()"
-            self.logger.info(msg)
-            user_id = self.myUserId()
-
-        endpoint_uri = f"/users/{user_id}/collected_items/{item_id}"
-
-        self.logger.debug(f"editCollectedItem() | at endpoint: {endpoint_uri}")
-        self.logger.debug(f"User ID: {user_id}")
-        self.logger.debug(f"Item ID: {item_id}")
-        self.logger.debug(f"Trying Token with Label: {token_label}")
-        self.logger.debug(f"KWARGS: {kwargs}")
-
         if not item_id:
             msg = "item_id (int) is a required field"
             self._except_and_log(ex_msg=msg)
             raise ValueError(msg)
 
-        token_dict = self._get_token_by_label(token_label=token_label)
-        token = token_dict["token"]
-
-        if not token:
-            msg = "No token found"
-            self.logger.critical(msg)
-            ex_msg = (
-                "A critical error was found when trying to get a collection with "
-                f"a token labeled: {token_label} in method 'deleteCollectedItem()'"
-            )
-            self._except_and_log(ex_msg=ex_msg)
-            raise LookupError(ex_msg)
+        auth = self._auth(token_label=token_label, caller="deleteCollectedItem")
+        user_id = user_id or auth["user_id"]
+        endpoint_uri = f"/users/{user_id}/collected_items/{item_id}"
 
-        add_headers = {"Authorization": f"Bearer {token}"}
+        self.logger.debug(f"deleteCollectedItem() | at endpoint: {endpoint_uri} | KWARGS: {kwargs}")
 
         return self._call_api(
             http_method="delete",
             endpoint_uri=endpoint_uri,
-            add_headers=add_headers,
+            add_headers=auth["headers"],
             **kwargs,
         )
+
+    #
+    # Bulk operations
+    #
+
+    def bulkCollectedItems(
+        self,
+        operations: list = list(),
+        user_id: int = int(),
+        token_label: str = "self",
+        workers: int = DEFAULT_BULK_WORKERS,
+        rate: float = DEFAULT_RATE_LIMIT,
+        checkpoint_path: str = str(),
+        **kwargs,
+    ) -> dict:
+        """Add, edit and delete many collected items concurrently
+        Every operation is validated before anything is sent, and the token is resolved once
+        # noqa: E501
+
+        Args:
+            operations (list): An iterable of operations: {"op": "add" | "edit" | "delete", "item_id": int, "body": dict}
+            user_id (int, optional): ID of the User, defaults to myUserId()
+            token_label (str, optional): The Label of the token that is stored to use as authorization
+            workers (int, optional): Number of concurrent requests
+            rate (float, optional): Maximum requests per second. 0 disables limiting
+            checkpoint_path (str, optional): JSON Lines file to record progress to. Re-running with the same file and operations resumes, other operations are refused
+            **kwargs: Other fields passed to BulkCollectionWriter(). Example: limiter, retries, concurrency (an AdaptiveLimiter)
+
+        Returns:
+            dict: A report: {"total", "succeeded", "failed", "resumed", "items": [outcome, ...]} with items in input order
+
+        Raises:
+            LookupError: A lookup for other data failed. Example: trying to find a token by a label that doesnt exist
+            ValueError: When an invalid value is provided. Example: a value of "string" to an input wanting a dictionary, or an invalid value that has a limited set of valid values
+        """
+        from numista.bulk import BulkCollectionWriter
+
+        writer = BulkCollectionWriter(
+            self,
+            user_id=user_id,
+            token_label=token_label,
+            workers=workers,
+            rate=rate,
+            checkpoint_path=checkpoint_path,
+            **kwargs,
+        )
+        return writer.run(operations)
+
+    def addCollectedItemsBulk(self, bodies: list = list(), **kwargs) -> dict:
+        """Add many items to the user collection, see bulkCollectedItems()
+        # noqa: E501
+
+        Args:
+            bodies (list): An iterable of bodies, as used by addCollectedItem()
+            **kwargs: Other fields passed to bulkCollectedItems()
+
+        Returns:
+            dict: A report: {"total", "succeeded", "failed", "resumed", "items": [outcome, ...]} with items in input order
+        """
+        operations = ({"op": "add", "body": body} for body in bodies)
+        return self.bulkCollectedItems(operations=operations, **kwargs)
+
+    def editCollectedItemsBulk(self, items: dict = dict(), **kwargs) -> dict:
+        """Edit many items in a user's collection, see bulkCollectedItems()
+        # noqa: E501
+
+        Args:
+            items (dict): Bodies by item ID, as used by editCollectedItem()
+            **kwargs: Other fields passed to bulkCollectedItems()
+
+        Returns:
+            dict: A report: {"total", "succeeded", "failed", "resumed", "items": [outcome, ...]} with items in input order
+        """
+        operations = (
+            {"op": "edit", "item_id": item_id, "body": body}
+            for item_id, body in items.items()
+        )
+        return self.bulkCollectedItems(operations=operations, **kwargs)
+
+    def deleteCollectedItemsBulk(self, item_ids: list = list(), **kwargs) -> dict:
+        """Delete many items from a user's collection, see bulkCollectedItems()
+        # noqa: E501
+
+        Args:
+            item_ids (list): An iterable of collected item IDs
+            **kwargs: Other fields passed to bulkCollectedItems()
+
+        Returns:
+            dict: A report: {"total", "succeeded", "failed", "resumed", "items": [outcome, ...]} with items in input order
+        """
+        operations = ({"op": "delete", "item_id": item_id} for item_id in item_ids)
+        return self.bulkCollectedItems(operations=operations, **kwargs)
+
+    def valueCollection(
+        self,
+        user_id: int = int(),
+        currency: str = DEFAULT_CURRENCY,
+        category: str = str(),
+        collection: int = int(),
+        token_label: str = "self",
+        items: list = list(),
+        workers: int = DEFAULT_BULK_WORKERS,
+        rate: float = DEFAULT_RATE_LIMIT,
+        concurrency: object = None,
+    ) -> dict:
+        """Value a user's collection from getPrices() estimates
+        Each distinct (type, issue, currency) is looked up once and cached on this instance
+        # noqa: E501
+
+        Args:
+            user_id (int, optional): ID of the User, defaults to myUserId()
+            currency (str, optional): 3-letter ISO 4217 currency code
+            category (str, optional): If this parameter is provided, only items of the given category are valued. Available values : coin, banknote, exonumia
+            collection (int, optional): Collection ID. If this parameter is provided, only items in the given collection are valued.
+            token_label (str, optional): The Label of the token that is stored to use as authorization
+            items (list, optional): Collected items to value instead of fetching them with getCollectedItems()
+            workers (int, optional): Number of concurrent requests
+            rate (float, optional): Maximum requests per second. 0 disables limiting
+            concurrency (AdaptiveLimiter, optional): Adapt the number of concurrent requests, up to its max_limit, to latency and HTTP 429. Overrides workers
+
+        Returns:
+            dict: {"currency", "total", "valued_items", "unvalued_items", "by_grade": {grade: {"items", "quantity", "value"}}}
+
+        Raises:
+            LookupError: A lookup for other data failed. Example: trying to find a token by a label that doesnt exist
+            ValueError: When the collected items could not be fetched
+        """
+        from numista.ratelimit import RateLimiter
+        from numista.valuation import CollectionValuer
+
+        if not items:
+            result = self.getCollectedItems(
+                user_id=user_id,
+                category=category,
+                collection=collection,
+                token_label=token_label,
+            )
+            if result["failed"] or result["http_info"]["http_status"] != 200:
+                msg = f"getCollectedItems() failed: {result['http_info']}"
+                self._except_and_log(ex_msg=msg)
+                raise ValueError(msg)
+            items = result["data"].get("items", list())
+
+        # A valuer per call: prices are shared through the context's cache
+        valuer = CollectionValuer(
+            self,
+            cache=self.context.cache,
+            workers=workers,
+            limiter=RateLimiter(rate=rate),
+            concurrency=concurrency,
+        )
+        return valuer.value(items=items, currency=currency)
+
+    def catalogueGraph(
+        self,
+        types: list = list(),
+        q: str = str(),
+        issuer: str = str(),
+        category: str = str(),
+        max_pages: int = 1,
+        details: bool = True,
+        issues: bool = True,
+        prices: bool = True,
+        currency: str = DEFAULT_CURRENCY,
+        lang: str = DEFAULT_LANG,
+        workers: int = DEFAULT_BULK_WORKERS,
+        rate: float = DEFAULT_RATE_LIMIT,
+        concurrency: object = None,
+    ) -> object:
+        """Load types with their issues and prices as a linked graph, each level in one parallel round
+        Instead of getType(), getIssues() then getPrices() per issue, one coin after another: every type is fetched in one round and every price in the next
+        # noqa: E501
+
+        Args:
+            types (list, optional): Type IDs or searchTypes() hits. Default: the results of streamTypes(q, issuer, category)
+            q (str, optional): Search query, when types is not provided. Example: "Buffalo"
+            issuer (str, optional): Issuer code, when types is not provided
+            category (str, optional): Category, when types is not provided. Available values : coin, banknote, exonumia
+            max_pages (int, optional): Pages of search results to load. 0 for all
+            details (bool, optional): Load the full getType() record of each type
+            issues (bool, optional): Load the issues of each type
+            prices (bool, optional): Load the prices of each issue. Implies issues
+            currency (str, optional): 3-letter ISO 4217 currency code of the prices
+            lang (str, optional): Language. Available values : en, es, fr. Default value : en
+            workers (int, optional): Number of concurrent requests
+            rate (float, optional): Maximum requests per second. 0 disables limiting
+            concurrency (AdaptiveLimiter, optional): Adapt the number of concurrent requests, up to its max_limit, to latency and HTTP 429. Overrides workers
+
+        Returns:
+            CatalogueGraph: graph.load() it again to extend it. graph.roots are the types asked for, graph.types and graph.issues every node by ID
+
+        Raises:
+            ValueError: When category is invalid, or the search failed
+        """
+        from numista.graph import CatalogueGraph
+
+        if not types:
+            types = list(
+                self.streamTypes(
+                    q=q, issuer=issuer, category=category, lang=lang, max_pages=max_pages
+                )
+            )
+
+        graph = CatalogueGraph(
+            self, lang=lang, workers=workers, rate=rate, concurrency=concurrency
+        )
+        graph.load(types, details=details, issues=issues, prices=prices, currency=currency)
+        return graph
+
+    def collectionFeed(
+        self, user_ids: list = list(), token_label: str = "self", **kwargs
+    ) -> object:
+        """Watch users' collections for changes, polling each as often as it changes, with cheap conditional requests
+        Example: feed = n.collectionFeed([2, 5]); feed.subscribe(print); feed.start()
+        # noqa: E501
+
+        Args:
+            user_ids (list, optional): IDs of the Users to watch. Default: the user of the token
+            token_label (str, optional): The Label of the token that is stored to use as authorization
+            **kwargs: Options of CollectionFeed (numista.feed). Example: min_interval=30, max_interval=3600, rate=5
+
+        Returns:
+            CollectionFeed: subscribe() callbacks or iterate it with async for, then start() it. watch() more users at any time
+
+        Raises:
+            LookupError: A lookup for other data failed. Example: trying to find a token by a label that doesnt exist
+        """
+        from numista.feed import CollectionFeed
+
+        feed = CollectionFeed(self, **kwargs)
+        for user_id in user_ids or [int()]:
+            feed.watch(user_id=user_id, token_label=token_label)
+        return feed
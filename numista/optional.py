@@ -0,0 +1,29 @@
+"""Loaders for optional dependencies
+Each loader imports on first call and returns None when the package is not installed
+"""
+_MODULES = dict()
+
+
+def _load(name: str = str()) -> object:
+    """Import a module by name once, None when it is not installed"""
+    if name not in _MODULES:
+        try:
+            _MODULES[name] = __import__(name)
+        except ImportError:
+            _MODULES[name] = None
+    return _MODULES[name]
+
+
+def load_numpy() -> object:
+    """Returns the numpy module, or None (pip install numista[numpy])"""
+    return _load("numpy")
+
+
+def load_pyarrow() -> object:
+    """Returns the pyarrow module, or None (pip install numista[arrow])"""
+    return _load("pyarrow")
+
+
+def load_brotli() -> object:
+    """Returns the brotli module, or None (pip install numista[brotli])"""
+    return _load("brotli")
@@ -0,0 +1,237 @@
+"""Prepared calls: the static parts of an operation's requests built once, for hot loops
+
+Attributes:
+    PREPARED_OPERATIONS (dict): Operations that can be prepared: {operationId: {"method", "endpoint", "ids", "params", "auth", "cached"}}
+"""
+import re
+
+import numista.numista as _numista
+from numista.numista import (
+    DEFAULT_CURRENCY,
+    DEFAULT_LANG,
+    VALID_CATEGORY_TYPES,
+    VALID_CATEGORY_TYPES_SET,
+    accept_encoding,
+)
+
+PREPARED_OPERATIONS = {
+    "searchTypes": {
+        "method": "get",
+        "endpoint": "/types",
+        "ids": [],
+        "params": {"q": "", "issuer": "", "category": "", "page": 1, "count": 50, "lang": DEFAULT_LANG},
+    },
+    "getType": {
+        "method": "get",
+        "endpoint": "/types/{type_id}",
+        "ids": ["type_id"],
+        "params": {"lang": DEFAULT_LANG},
+        "cached": True,
+    },
+    "getIssues": {
+        "method": "get",
+        "endpoint": "/types/{type_id}/issues",
+        "ids": ["type_id"],
+        "params": {"lang": DEFAULT_LANG},
+    },
+    "getPrices": {
+        "method": "get",
+        "endpoint": "/types/{type_id}/issues/{issue_id}/prices",
+        "ids": ["type_id", "issue_id"],
+        "params": {"currency": DEFAULT_CURRENCY, "lang": DEFAULT_LANG},
+        "cached": True,
+    },
+    "getIssuers": {
+        "method": "get",
+        "endpoint": "/issuers",
+        "ids": [],
+        "params": {"lang": DEFAULT_LANG},
+        "cached": True,
+    },
+    "getCatalogues": {"method": "get", "endpoint": "/catalogues", "ids": [], "params": {}},
+    "getUser": {
+        "method": "get",
+        "endpoint": "/users/{user_id}",
+        "ids": ["user_id"],
+        "params": {"lang": DEFAULT_LANG},
+    },
+    "getUserCollections": {
+        "method": "get",
+        "endpoint": "/users/{user_id}/collections",
+        "ids": ["user_id"],
+        "params": {"category": ""},
+        "auth": True,
+    },
+    "getCollectedItems": {
+        "method": "get",
+        "endpoint": "/users/{user_id}/collected_items",
+        "ids": ["user_id"],
+        "params": {"category": "", "type": 0, "collection": 0},
+        "auth": True,
+    },
+    "getCollectedItem": {
+        "method": "get",
+        "endpoint": "/users/{user_id}/collected_items/{item_id}",
+        "ids": ["user_id", "item_id"],
+        "params": {},
+        "auth": True,
+    },
+}
+
+_CALL_OPTIONS = frozenset(["priority", "deadline", "timeout"])
+
+
+class PreparedCall:
+    """One operation with its URL, headers and parameter schema built once. Calls only fill in IDs and parameters
+    Requests go through the same breaker, scheduler, transport and SWR cache as the Numista() methods. Authenticated operations use the caller's token until it is refreshed, and default user_id to its user
+
+    Attributes:
+        defaults (dict): Parameters sent unless a call overrides them, null values left out
+        endpoint (str): The endpoint URI template. Example: "/types/{type_id}/issues"
+        http_method (str): The HTTP method
+        ids (list): Names of the endpoint's IDs, in order
+        numista (Numista): The Numista() client the calls are sent with
+        operation (str): The operationId. Example: "getPrices"
+        params (frozenset): Names of the parameters a call may set
+        template (str): The endpoint template. Example: "GET /types/{id}/issues"
+    """
+
+    def __init__(self, numista, operation: str = str(), token_label: str = "self", **defaults):
+        """Build the static parts of an operation's requests
+        # noqa: E501
+
+        Args:
+            numista (Numista): An instantiated Numista() client
+            operation (str): One of PREPARED_OPERATIONS. Example: "getPrices"
+            token_label (str, optional): The Label of the token that is stored to use as authorization, for operations requiring OAuth
+            **defaults: Parameters every call sends unless it overrides them. Example: currency="EUR", lang="fr"
+
+        Raises:
+            ValueError: When operation is not one of PREPARED_OPERATIONS, or a default is not one of its parameters
+        """
+        spec = PREPARED_OPERATIONS.get(operation)
+        if spec is None:
+            msg = f"The operation ({operation}) must be one of {list(PREPARED_OPERATIONS)}"
+            numista._except_and_log(ex_msg=msg)
+            raise ValueError(msg)
+
+        self.numista = numista
+        self.operation = operation
+        self.http_method = spec["method"]
+        self.endpoint = spec["endpoint"]
+        self.ids = list(spec["ids"])
+        self.params = frozenset(spec["params"])
+        self.template = f"{self.http_method.upper()} {re.sub(r'{[a-z_]+}', '{id}', self.endpoint)}"
+
+        self._token_label = token_label
+        self._auth = None
+        self._auth_headers = None
+        self._cached = spec.get("cached", False)
+        self._required = [i for i in self.ids if not (spec.get("auth") and i == "user_id")]
+
+        # Everything below is per client, not per call
+        self._prefix = _numista.API_BASE_URL + numista.versionPath
+        self._headers = {
+            "Numista-API-Key": numista.inputs["api_key"],  # fmt: skip
+            "Accept": "application/json",
+            "Content-Type": "application/json",
+            "Accept-Encoding": accept_encoding() if numista.compression else "identity",
+        }
+        if spec.get("auth"):
+            self._auth = numista._auth(token_label=token_label, caller=f"prepare('{operation}')")
+            self._auth_headers = {**self._headers, **self._auth["headers"]}
+
+        defaults = self._check({**spec["params"], **defaults})
+        self.defaults = {k: v for k, v in defaults.items() if v}
+
+        numista.logger.debug(
+            f"Prepared {operation} | {self.template} | defaults: {self.defaults}"
+        )
+
+    def _check(self, params: dict = dict()) -> dict:
+        """Validate and normalize parameters against the operation's schema
+
+        Raises:
+            ValueError: When a parameter is unknown or invalid
+        """
+        unknown = [k for k in params if k not in self.params]
+        if unknown:
+            msg = f"{self.operation}() has no parameter(s) {unknown}. Valid: {sorted(self.params)}"
+            self.numista._except_and_log(ex_msg=msg)
+            raise ValueError(msg)
+
+        if params.get("currency"):
+            from numista.validation import currency_codes
+
+            currency = params["currency"].upper()
+            params["currency"] = currency if currency in currency_codes() else DEFAULT_CURRENCY
+
+        if params.get("category") and params["category"] not in VALID_CATEGORY_TYPES_SET:
+            msg = f"The Category provided ({params['category']}) must be one of {VALID_CATEGORY_TYPES}"
+            self.numista._except_and_log(ex_msg=msg)
+            raise ValueError(msg)
+        return params
+
+    def __call__(self, *ids, **values) -> dict:
+        """Send the operation
+        # noqa: E501
+
+        Args:
+            *ids: The endpoint's IDs in order, or pass them by name. Example: prepared(420, 1) or prepared(type_id=420, issue_id=1)
+            **values: IDs, parameters overriding the defaults, and priority, deadline or timeout as with the Numista() methods
+
+        Returns:
+            dict: Return a dictionary with the result data and other metadata
+
+        Raises:
+            LookupError: When the token of an operation requiring OAuth can no longer be found
+            ValueError: When an ID is missing, or a parameter is unknown or invalid
+        """
+        filled = dict(zip(self.ids, ids))
+        params = self.defaults
+        options = dict()
+        if values:
+            overrides = dict()
+            for k, v in values.items():
+                if k in filled or k in self.ids:
+                    filled[k] = v
+                elif k in _CALL_OPTIONS:
+                    options[k] = v
+                else:
+                    overrides[k] = v
+            if overrides:
+                params = {**params, **self._check(overrides)}
+                params = {k: v for k, v in params.items() if v}
+
+        headers = self._headers
+        if self._auth is not None:
+            auth = self.numista._auth(token_label=self._token_label, caller=self.operation)
+            if auth is not self._auth:  # The token was refreshed
+                self._auth = auth
+                self._auth_headers = {**self._headers, **auth["headers"]}
+            headers = self._auth_headers
+            if not filled.get("user_id"):
+                filled["user_id"] = auth["user_id"]
+
+        for name in self._required:
+            if not filled.get(name):
+                msg = f"{name} (int) is a required field of {self.operation}()"
+                self.numista._except_and_log(ex_msg=msg)
+                raise ValueError(msg)
+
+        endpoint_uri = self.endpoint.format_map(filled) if self.ids else self.endpoint
+
+        if self._cached and self.numista.context.swr is not None:
+            return self.numista._cached_get(endpoint_uri=endpoint_uri, **params, **options)
+
+        return self.numista._send(
+            http_method=self.http_method,
+            endpoint_uri=endpoint_uri,
+            api_url=self._prefix + endpoint_uri,
+            headers=headers,
+            params=params,
+            priority=options.get("priority") or self.numista.priority,
+            deadline=options.get("deadline"),
+            timeout=options.get("timeout") or self.numista.timeout,
+            template=self.template,
+        )
@@ -0,0 +1,400 @@
+"""Append-only, columnar history of getPrices() estimates
+
+Each column is a flat binary file written with the standard library array module,
+in the machine's native layout, so numpy.fromfile() can also read them directly.
+
+Attributes:
+    DEFAULT_PRICE_HISTORY_PATH (str): Default directory for the price history
+    PRICE_HISTORY_COLUMNS (dict): Column names and their array typecodes
+    PRICE_HISTORY_META_FILE (str): File name of the currency/grade dictionaries
+"""
+import json
+import logging
+import os
+import threading
+import time
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+
+from numista.numista import (
+    DEFAULT_BULK_WORKERS,
+    DEFAULT_CURRENCY,
+    DEFAULT_RATE_LIMIT,
+    VALID_NUMISTA_GRADES,
+)
+from numista.optional import load_numpy
+from numista.ratelimit import RateLimiter
+
+DEFAULT_PRICE_HISTORY_PATH = "./numista_prices"
+PRICE_HISTORY_META_FILE = "meta.json"
+PRICE_HISTORY_COLUMNS = {
+    "ts": "q",  # epoch seconds
+    "type_id": "q",
+    "issue_id": "q",
+    "currency": "H",  # index into meta["currencies"]
+    "grade": "B",  # index into meta["grades"]
+    "price": "d",
+}
+
+
+class PriceHistory:
+    """Price estimates by (type_id, issue_id, currency, grade) over time
+    A row is only stored when the price differs from the last stored price for its key
+
+    Attributes:
+        currencies (list): Currency codes, the 'currency' column stores an index into this list
+        grades (list): Grades, the 'grade' column stores an index into this list
+        logger (object): The logger class is attached here
+        path (str): Directory the history is stored in
+    """
+
+    def __init__(self, path: str = DEFAULT_PRICE_HISTORY_PATH, logger: object = None):
+        """Open (or create) a price history stored at path
+        # noqa: E501
+
+        Args:
+            path (str, optional): Directory the history is stored in, created if missing
+            logger (object, optional): A logger to use, typically Numista().logger
+        """
+        self.path = path
+        self.logger = logger if logger else logging
+        self.currencies = list()
+        self.grades = list(VALID_NUMISTA_GRADES)
+
+        self._columns = {name: array(code) for name, code in PRICE_HISTORY_COLUMNS.items()}
+        self._last = dict()  # (type_id, issue_id, currency, grade): price
+        self._lock = threading.Lock()
+
+        os.makedirs(self.path, exist_ok=True)
+        self._load()
+
+    def __len__(self) -> int:
+        return len(self._columns["ts"])
+
+    #
+    # Storage
+    #
+
+    def _file(self, name: str = str()) -> str:
+        """Path of a file inside the history directory"""
+        return os.path.join(self.path, name)
+
+    def _load(self) -> None:
+        """Load the columns and rebuild the last known price of every key"""
+        meta_file = self._file(PRICE_HISTORY_META_FILE)
+        if os.path.exists(meta_file):
+            with open(meta_file, "r") as f:
+                meta = json.load(f)
+            self.currencies = meta["currencies"]
+            self.grades = meta["grades"]
+
+        for name, column in self._columns.items():
+            column_file = self._file(f"{name}.bin")
+            if os.path.exists(column_file):
+                with open(column_file, "rb") as f:
+                    column.frombytes(f.read())
+
+        # An interrupted append can leave columns of unequal length, drop the partial row
+        rows = min(len(c) for c in self._columns.values())
+        for name, column in self._columns.items():
+            if len(column) > rows:
+                self.logger.info(f"Truncating partial row in price column {name}")
+                del column[rows:]
+                with open(self._file(f"{name}.bin"), "wb") as f:
+                    column.tofile(f)
+
+        c = self._columns
+        for i in range(rows):
+            key = (c["type_id"][i], c["issue_id"][i], c["currency"][i], c["grade"][i])
+            self._last[key] = c["price"][i]
+
+        self.logger.debug(f"Price history loaded from {self.path} with {rows} rows")
+
+    def _save_meta(self) -> None:
+        """Persist the currency and grade dictionaries"""
+        tmp_path = self._file(f"{PRICE_HISTORY_META_FILE}.tmp")
+        with open(tmp_path, "w") as f:
+            json.dump({"currencies": self.currencies, "grades": self.grades}, f)
+        os.replace(tmp_path, self._file(PRICE_HISTORY_META_FILE))
+
+    def _code(self, values: list = list(), value: str = str()) -> int:
+        """Dictionary-encode a value, adding it when new"""
+        try:
+            return values.index(value)
+        except ValueError:
+            values.append(value)
+            self._save_meta()
+            return len(values) - 1
+
+    #
+    # Writing
+    #
+
+    def record(
+        self,
+        type_id: int = int(),
+        issue_id: int = int(),
+        prices: dict = dict(),
+        ts: int = None,
+    ) -> int:
+        """Record a getPrices() response. Unchanged prices are not stored again
+        # noqa: E501
+
+        Args:
+            type_id (int): ID of the type
+            issue_id (int): ID of the issue
+            prices (dict): The result of getPrices(), or its 'data' field
+            ts (int, optional): Epoch seconds of the observation. Default: now
+
+        Returns:
+            int: The number of rows appended
+        """
+        data = prices["data"] if "data" in prices else prices
+        currency = str(data.get("currency", DEFAULT_CURRENCY)).upper()
+        ts = int(time.time()) if ts is None else int(ts)
+
+        with self._lock:
+            currency_code = self._code(self.currencies, currency)
+            new_rows = list()
+            for estimate in data.get("prices", list()):
+                if estimate.get("price") is None:
+                    continue
+                grade_code = self._code(self.grades, estimate["grade"])
+                price = float(estimate["price"])
+                key = (int(type_id), int(issue_id), currency_code, grade_code)
+                if self._last.get(key) == price:
+                    continue
+                self._last[key] = price
+                new_rows.append((ts, *key, price))
+
+            if new_rows:
+                self._append(new_rows)
+
+        return len(new_rows)
+
+    def _append(self, rows: list = list()) -> None:
+        """Append rows to every column file"""
+        for i, (name, column) in enumerate(self._columns.items()):
+            chunk = array(column.typecode, (row[i] for row in rows))
+            column.extend(chunk)
+            with open(self._file(f"{name}.bin"), "ab") as f:
+                chunk.tofile(f)
+
+    def poll(
+        self,
+        numista,
+        issues: list = list(),
+        currencies: list = [DEFAULT_CURRENCY],
+        workers: int = DEFAULT_BULK_WORKERS,
+        rate: float = DEFAULT_RATE_LIMIT,
+        limiter: RateLimiter = None,
+        priority: str = "background",
+    ) -> int:
+        """Fetch getPrices() for many issues and currencies and record the results
+        # noqa: E501
+
+        Args:
+            numista (Numista): An instantiated Numista() client
+            issues (list): An iterable of (type_id, issue_id) tuples
+            currencies (list, optional): 3-letter ISO 4217 currency codes to poll
+            workers (int, optional): Number of concurrent requests
+            rate (float, optional): Maximum requests per second. 0 disables limiting. Ignored when limiter is provided
+            limiter (RateLimiter, optional): A rate limiter to share with other jobs
+            priority (str, optional): Priority class of the requests when the client's context has a RequestScheduler
+
+        Returns:
+            int: The number of rows appended
+        """
+        limiter = limiter if limiter else RateLimiter(rate=rate)
+        ts = int(time.time())
+
+        def fetch(job):
+            type_id, issue_id, currency = job
+            limiter.acquire()
+            result = numista.getPrices(
+                type_id=type_id, issue_id=issue_id, currency=currency, priority=priority
+            )
+            if result["failed"] or result["http_info"]["http_status"] != 200:
+                self.logger.info(
+                    f"getPrices() failed for {type_id}/{issue_id}/{currency}, skipping"
+                )
+                return 0
+            return self.record(type_id, issue_id, result["data"], ts=ts)
+
+        jobs = (
+            (type_id, issue_id, currency)
+            for type_id, issue_id in issues
+            for currency in currencies
+        )
+        with ThreadPoolExecutor(max_workers=max(int(workers), 1)) as pool:
+            appended = sum(pool.map(fetch, jobs))
+
+        self.logger.info(f"Price poll finished, {appended} changed prices stored")
+        return appended
+
+    #
+    # Queries
+    #
+
+    def columns(self) -> dict:
+        """All columns, as numpy arrays when numpy is installed, otherwise array.array
+
+        Returns:
+            dict: Columns by name. See PRICE_HISTORY_COLUMNS
+        """
+        np = load_numpy()
+        with self._lock:
+            if np is None:
+                return {name: array(c.typecode, c) for name, c in self._columns.items()}
+            return {name: np.array(c) for name, c in self._columns.items()}
+
+    def history(
+        self,
+        type_id: int = int(),
+        issue_id: int = int(),
+        currency: str = DEFAULT_CURRENCY,
+        grade: str = str(),
+    ) -> list:
+        """The stored price changes of one key
+        # noqa: E501
+
+        Args:
+            type_id (int): ID of the type
+            issue_id (int): ID of the issue
+            currency (str, optional): 3-letter ISO 4217 currency code
+            grade (str): The grade. Example: "vf"
+
+        Returns:
+            list: (ts, price) tuples, oldest first
+        """
+        if currency.upper() not in self.currencies or grade not in self.grades:
+            return list()
+        currency_code = self.currencies.index(currency.upper())
+        key = (type_id, issue_id, currency_code, self.grades.index(grade))
+
+        np = load_numpy()
+        if np is None:
+            with self._lock:
+                c = self._columns
+                keys = zip(c["type_id"], c["issue_id"], c["currency"], c["grade"])
+                rows = [(ts, price) for k, ts, price in zip(keys, c["ts"], c["price"]) if k == key]
+            return sorted(rows)
+
+        c = self.columns()
+        mask = (c["type_id"] == type_id) & (c["issue_id"] == issue_id)
+        mask &= (c["currency"] == key[2]) & (c["grade"] == key[3])
+        ts, prices = c["ts"][mask], c["price"][mask]
+        order = np.lexsort((prices, ts))
+        return list(zip(ts[order].tolist(), prices[order].tolist()))
+
+    def priceChange(
+        self,
+        days: int = 30,
+        currency: str = DEFAULT_CURRENCY,
+        grade: str = str(),
+        now: int = None,
+    ) -> dict:
+        """Price change over the last N days for every (type_id, issue_id, grade) in a currency
+        Keys first seen within the window have no previous price and are left out
+        # noqa: E501
+
+        Args:
+            days (int, optional): Size of the window in days
+            currency (str, optional): 3-letter ISO 4217 currency code
+            grade (str, optional): Only this grade. Default: all grades
+            now (int, optional): Epoch seconds the window ends at. Default: now
+
+        Returns:
+            dict: Columns "type_id", "issue_id", "grade", "old", "new", "change", "pct". numpy arrays when numpy is installed, otherwise lists
+        """
+        now = int(time.time()) if now is None else int(now)
+        cutoff = now - int(days * 86400)
+        currency = currency.upper()
+        names = ("type_id", "issue_id", "grade", "old", "new", "change", "pct")
+
+        if currency not in self.currencies or (grade and grade not in self.grades):
+            return {name: list() for name in names}
+        currency_code = self.currencies.index(currency)
+        grade_code = self.grades.index(grade) if grade else None
+
+        np = load_numpy()
+        if np is None:
+            return self._price_change_python(cutoff, now, currency_code, grade_code, names)
+
+        c = self.columns()
+        mask = (c["currency"] == currency_code) & (c["ts"] <= now)
+        if grade_code is not None:
+            mask &= c["grade"] == grade_code
+        ts, type_ids, issue_ids, grades, prices = (
+            c[name][mask] for name in ("ts", "type_id", "issue_id", "grade", "price")
+        )
+
+        # Sort by key, then time. Each group of equal keys is then contiguous and ordered
+        order = np.lexsort((ts, grades, issue_ids, type_ids))
+        ts, type_ids, issue_ids, grades, prices = (
+            a[order] for a in (ts, type_ids, issue_ids, grades, prices)
+        )
+        if not len(ts):
+            return {name: np.array([]) for name in names}
+        boundary = np.ones(len(ts), dtype=bool)
+        boundary[1:] = (
+            (type_ids[1:] != type_ids[:-1])
+            | (issue_ids[1:] != issue_ids[:-1])
+            | (grades[1:] != grades[:-1])
+        )
+        starts = np.flatnonzero(boundary)
+        last = np.append(starts[1:], len(ts)) - 1
+
+        # Rows before the cutoff are a prefix of their (time ordered) group
+        before = np.add.reduceat((ts <= cutoff).astype(np.int64), starts)
+        keep = before > 0
+        last, last_before = last[keep], (starts + before - 1)[keep]
+        old, new = prices[last_before], prices[last]
+        change = new - old
+        with np.errstate(divide="ignore", invalid="ignore"):
+            pct = np.where(old != 0, change / old * 100.0, np.nan)
+
+        return {
+            "type_id": type_ids[last],
+            "issue_id": issue_ids[last],
+            "grade": np.array(self.grades, dtype=object)[grades[last]],
+            "old": old,
+            "new": new,
+            "change": change,
+            "pct": pct,
+        }
+
+    def _price_change_python(
+        self,
+        cutoff: int = int(),
+        now: int = int(),
+        currency_code: int = int(),
+        grade_code: int = None,
+        names: tuple = tuple(),
+    ) -> dict:
+        """priceChange() without numpy"""
+        c = self._columns
+        old = dict()
+        new = dict()
+        for i in sorted(range(len(self)), key=c["ts"].__getitem__):
+            ts = c["ts"][i]
+            if c["currency"][i] != currency_code or ts > now:
+                continue
+            if grade_code is not None and c["grade"][i] != grade_code:
+                continue
+            key = (c["type_id"][i], c["issue_id"][i], c["grade"][i])
+            new[key] = c["price"][i]
+            if ts <= cutoff:
+                old[key] = c["price"][i]
+
+        result = {name: list() for name in names}
+        for key in sorted(old):
+            change = new[key] - old[key]
+            result["type_id"].append(key[0])
+            result["issue_id"].append(key[1])
+            result["grade"].append(self.grades[key[2]])
+            result["old"].append(old[key])
+            result["new"].append(new[key])
+            result["change"].append(change)
+            result["pct"].append(change / old[key] * 100.0 if old[key] else float("nan"))
+        return result
@@ -0,0 +1,154 @@
+"""Client side rate limiting shared by the batch helpers
+
+Attributes:
+    DEFAULT_RATE_BURST (int): Default number of requests that may be sent back to back
+"""
+import threading
+import time
+
+from numista.numista import DEFAULT_RATE_LIMIT
+
+DEFAULT_RATE_BURST = 1
+
+
+class RateLimiter:
+    """A thread-safe token bucket
+
+    Attributes:
+        burst (int): Maximum number of tokens the bucket holds
+        rate (float): Tokens added per second. 0 disables limiting
+    """
+
+    def __init__(self, rate: float = DEFAULT_RATE_LIMIT, burst: int = DEFAULT_RATE_BURST):
+        """Initialize the bucket full
+        # noqa: E501
+
+        Args:
+            rate (float, optional): Requests per second. 0 disables limiting
+            burst (int, optional): Number of requests that may be sent back to back
+        """
+        self.rate = float(rate)
+        self.burst = max(int(burst), 1)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reserve(self, tokens: int = 1) -> float:
+        """Take tokens from the bucket, going into debt if needed
+
+        Returns:
+            float: Seconds the caller must wait before using the tokens
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(
+                self.burst, self._tokens + (now - self._updated) * self.rate
+            )
+            self._updated = now
+            self._tokens -= tokens
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+    def _try_reserve(self, tokens: int = 1) -> float:
+        """Take tokens from the bucket only if they are available now
+
+        Returns:
+            float: 0.0 when taken, otherwise seconds until they are available
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(
+                self.burst, self._tokens + (now - self._updated) * self.rate
+            )
+            self._updated = now
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return 0.0
+            return (tokens - self._tokens) / self.rate
+
+    def try_acquire(self, tokens: int = 1) -> float:
+        """Take tokens without blocking, only if they are available now
+        Unlike acquire(), never books tokens ahead, so the caller can give way to more urgent requests
+
+        Args:
+            tokens (int, optional): Number of tokens (requests) to take
+
+        Returns:
+            float: 0.0 when the tokens were taken, otherwise seconds until they will be available (nothing is taken)
+        """
+        if self.rate <= 0:
+            return 0.0
+        return self._try_reserve(tokens)
+
+    def acquire(self, tokens: int = 1) -> float:
+        """Block until tokens are available
+
+        Args:
+            tokens (int, optional): Number of tokens (requests) to take
+
+        Returns:
+            float: Seconds spent waiting
+        """
+        if self.rate <= 0:
+            return 0.0
+        wait = self._reserve(tokens)
+        if wait:
+            time.sleep(wait)
+        return wait
+
+
+class SharedRateLimiter(RateLimiter):
+    """A token bucket shared by processes: one rate budget for a whole process pool
+    The bucket lives in shared memory, so pass the limiter to the pool's workers when they are created (Example: ProcessPoolExecutor(initargs=...))
+    """
+
+    def __init__(self, rate: float = DEFAULT_RATE_LIMIT, burst: int = DEFAULT_RATE_BURST):
+        """Initialize the bucket full
+        # noqa: E501
+
+        Args:
+            rate (float, optional): Requests per second, across every process. 0 disables limiting
+            burst (int, optional): Number of requests that may be sent back to back
+        """
+        import multiprocessing
+
+        self.rate = float(rate)
+        self.burst = max(int(burst), 1)
+        # [tokens, updated]. time.monotonic() is system wide, so comparable between processes
+        self._state = multiprocessing.Array("d", [float(self.burst), time.monotonic()])
+
+    def _reserve(self, tokens: int = 1) -> float:
+        """Take tokens from the shared bucket, going into debt if needed
+
+        Returns:
+            float: Seconds the caller must wait before using the tokens
+        """
+        with self._state.get_lock():
+            now = time.monotonic()
+            available = min(
+                self.burst, self._state[0] + (now - self._state[1]) * self.rate
+            )
+            self._state[0] = available - tokens
+            self._state[1] = now
+            if self._state[0] >= 0:
+                return 0.0
+            return -self._state[0] / self.rate
+
+    def _try_reserve(self, tokens: int = 1) -> float:
+        """Take tokens from the shared bucket only if they are available now
+
+        Returns:
+            float: 0.0 when taken, otherwise seconds until they are available
+        """
+        with self._state.get_lock():
+            now = time.monotonic()
+            available = min(
+                self.burst, self._state[0] + (now - self._state[1]) * self.rate
+            )
+            self._state[1] = now
+            if available >= tokens:
+                self._state[0] = available - tokens
+                return 0.0
+            self._state[0] = available
+            return (tokens - available) / self.rate
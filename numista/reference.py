@@ -0,0 +1,213 @@
+"""In-memory indexes of the reference data sets (issuers and catalogues)
+
+Attributes:
+    DEFAULT_REFERENCE_REFRESH (int): Default number of seconds before reference data is refreshed
+    MAX_PREFIX_LENGTH (int): Longest name prefix that is indexed
+"""
+import html
+import threading
+import time
+
+from numista.numista import DEFAULT_LANG
+
+DEFAULT_REFERENCE_REFRESH = 86400
+MAX_PREFIX_LENGTH = 32
+
+
+class ReferenceData:
+    """Issuers (per language) and catalogues, loaded once and looked up without the network
+    Once loaded, stale data is refreshed in a background thread and served meanwhile
+
+    Attributes:
+        logger (object): The logger class is attached here
+        numista (Numista): The Numista() client used to load the data
+        refresh_interval (float): Number of seconds before data is refreshed. 0 disables refreshing
+    """
+
+    def __init__(
+        self,
+        numista,
+        langs: list = [DEFAULT_LANG],
+        refresh_interval: float = DEFAULT_REFERENCE_REFRESH,
+        preload: bool = True,
+    ):
+        """Initialize the indexes
+        # noqa: E501
+
+        Args:
+            numista (Numista): An instantiated Numista() client
+            langs (list, optional): Languages to load issuers for. Others are loaded on first lookup
+            refresh_interval (float, optional): Number of seconds before data is refreshed. 0 disables refreshing
+            preload (bool, optional): Load the data now rather than on first lookup
+        """
+        self.numista = numista
+        self.logger = numista.logger
+        self.refresh_interval = refresh_interval
+
+        self._issuers = dict()  # lang: {code: record}
+        self._prefixes = dict()  # lang: {prefix: (code, ...)}
+        self._catalogues = dict()  # code: record
+        self._loaded_at = dict()  # "catalogues" or lang: epoch
+        self._refreshing = set()
+        self._lock = threading.Lock()
+
+        if preload:
+            self._load_catalogues()
+            for lang in langs:
+                self._load_issuers(lang)
+
+    #
+    # Loading
+    #
+
+    @staticmethod
+    def _normalize(text: str = str()) -> str:
+        """Lowercase and unescape a name for prefix matching"""
+        return html.unescape(str(text)).lower().strip()
+
+    def _get(self, method=None, key: str = str(), **kwargs) -> list:
+        """Call an API method and return a list from its data
+
+        Raises:
+            ValueError: When the request fails
+        """
+        result = method(**kwargs)
+        if result["failed"] or result["http_info"]["http_status"] != 200:
+            msg = f"Loading reference data '{key}' failed: {result['http_info']}"
+            self.numista._except_and_log(ex_msg=msg)
+            raise ValueError(msg)
+        return result["data"].get(key, list())
+
+    def _load_issuers(self, lang: str = DEFAULT_LANG) -> None:
+        """Load the issuers of a language and build its indexes"""
+        records = self._get(self.numista.getIssuers, "issuers", lang=lang)
+        issuers = {r["code"]: r for r in records}
+
+        prefixes = dict()
+        for code, record in issuers.items():
+            name = self._normalize(record.get("name", ""))
+            starts = {0} | {i + 1 for i, ch in enumerate(name) if ch in " -'("}
+            keys = set()
+            for start in starts:
+                word = name[start : start + MAX_PREFIX_LENGTH]
+                keys.update(word[:n] for n in range(1, len(word) + 1))
+            for key in keys:
+                prefixes.setdefault(key, list()).append(code)
+
+        # Swap in complete indexes so readers never see a partial build
+        self._prefixes[lang] = {k: tuple(sorted(v)) for k, v in prefixes.items()}
+        self._issuers[lang] = issuers
+        self._loaded_at[lang] = time.time()
+        self.logger.info(f"Loaded {len(issuers)} issuers for language: {lang}")
+
+    def _load_catalogues(self) -> None:
+        """Load the catalogues and build the code index"""
+        records = self._get(self.numista.getCatalogues, "catalogues")
+        self._catalogues = {r["code"]: r for r in records}
+        self._loaded_at["catalogues"] = time.time()
+        self.logger.info(f"Loaded {len(records)} catalogues")
+
+    def _load(self, key: str = str()) -> None:
+        """Load a data set: "catalogues" or the issuers of a language"""
+        if key == "catalogues":
+            self._load_catalogues()
+        else:
+            self._load_issuers(key)
+
+    def _ensure(self, key: str = str()) -> None:
+        """Load a data set on first use, refresh it in the background when stale"""
+        loaded_at = self._loaded_at.get(key)
+        if loaded_at is None:
+            with self._lock:
+                if key not in self._loaded_at:
+                    self._load(key)
+            return
+
+        if not self.refresh_interval or time.time() - loaded_at < self.refresh_interval:
+            return
+
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def refresh():
+            try:
+                self._load(key)
+            except Exception:
+                self.logger.exception(
+                    f"Background refresh of reference data '{key}' failed"
+                )
+            finally:
+                self._refreshing.discard(key)
+
+        threading.Thread(target=refresh, daemon=True).start()
+
+    def refresh(self) -> None:
+        """Reload every loaded data set now"""
+        for key in list(self._loaded_at):
+            self._load(key)
+
+    #
+    # Lookups
+    #
+
+    def issuer(self, code: str = str(), lang: str = DEFAULT_LANG) -> dict:
+        """Find an issuer by code
+        # noqa: E501
+
+        Args:
+            code (str): Issuer code. Example: "france"
+            lang (str, optional): Language. Available values : en, es, fr. Default value : en
+
+        Returns:
+            dict: The issuer record, or None when unknown
+        """
+        self._ensure(lang)
+        return self._issuers[lang].get(code)
+
+    def issuers(self, lang: str = DEFAULT_LANG) -> dict:
+        """All issuer records of a language by code"""
+        self._ensure(lang)
+        return self._issuers[lang]
+
+    def issuersByPrefix(self, prefix: str = str(), lang: str = DEFAULT_LANG) -> tuple:
+        """Find issuer codes by the start of their name, or of any word in it
+        # noqa: E501
+
+        Args:
+            prefix (str): Start of the name. Example: "united"
+            lang (str, optional): Language. Available values : en, es, fr. Default value : en
+
+        Returns:
+            tuple: Matching issuer codes, sorted
+        """
+        self._ensure(lang)
+        prefix = self._normalize(prefix)[:MAX_PREFIX_LENGTH]
+        return self._prefixes[lang].get(prefix, tuple())
+
+    def catalogue(self, code: str = str()) -> dict:
+        """Find a catalogue by code
+        # noqa: E501
+
+        Args:
+            code (str): Catalogue code. Example: "KM"
+
+        Returns:
+            dict: The catalogue record, or None when unknown
+        """
+        self._ensure("catalogues")
+        return self._catalogues.get(code)
+
+    def catalogueId(self, code: str = str()) -> int:
+        """Find a catalogue ID by code
+        # noqa: E501
+
+        Args:
+            code (str): Catalogue code. Example: "KM"
+
+        Returns:
+            int: The catalogue ID, or None when unknown
+        """
+        record = self.catalogue(code)
+        return record["id"] if record else None
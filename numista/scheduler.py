@@ -0,0 +1,140 @@
+"""Priority scheduling of API requests sharing one rate limit
+
+Attributes:
+    DEFAULT_PRIORITY_LIMITS (dict): Default maximum concurrent requests per priority class
+"""
+import heapq
+import itertools
+import math
+import threading
+import time
+from contextlib import contextmanager
+
+from numista.numista import DEFAULT_PRIORITY, DEFAULT_RATE_LIMIT, VALID_PRIORITY_CLASSES
+from numista.ratelimit import RateLimiter
+
+DEFAULT_PRIORITY_LIMITS = {"interactive": 8, "default": 4, "background": 2}
+
+
+class RequestScheduler:
+    """Sends requests by priority class within a rate limit and per-class concurrency limits
+    A rate token only goes to the most urgent waiting request, so background work never books quota ahead of interactive lookups. Requests whose deadline passes while they wait are dropped before they use quota
+
+    Attributes:
+        limiter (RateLimiter): The rate limit every request is sent within
+        limits (dict): Maximum concurrent requests per priority class
+    """
+
+    def __init__(
+        self,
+        rate: float = DEFAULT_RATE_LIMIT,
+        limits: dict = dict(),
+        limiter: RateLimiter = None,
+    ):
+        """Initialize the scheduler
+        # noqa: E501
+
+        Args:
+            rate (float, optional): Maximum requests per second. 0 disables limiting
+            limits (dict, optional): Maximum concurrent requests per priority class, merged over DEFAULT_PRIORITY_LIMITS
+            limiter (RateLimiter, optional): Use this limiter instead of creating one (Example: a SharedRateLimiter). Overrides rate
+        """
+        self.limiter = limiter if limiter else RateLimiter(rate=rate)
+        self.limits = {**DEFAULT_PRIORITY_LIMITS, **limits}
+
+        self._active = {c: 0 for c in VALID_PRIORITY_CLASSES}
+        self._sent = {c: 0 for c in VALID_PRIORITY_CLASSES}
+        self._expired = {c: 0 for c in VALID_PRIORITY_CLASSES}
+        self._queues = {c: list() for c in VALID_PRIORITY_CLASSES}  # heaps of [expires, seq]
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+
+    def _head(self) -> list:
+        """The waiting request to send next: the earliest deadline of the highest class with a free slot"""
+        for priority in VALID_PRIORITY_CLASSES:
+            queue = self._queues[priority]
+            if queue and self._active[priority] < self.limits[priority]:
+                return queue[0]
+        return None
+
+    def _remove(self, priority: str = str(), entry: list = None) -> None:
+        """Remove a waiting request from its queue"""
+        queue = self._queues[priority]
+        queue.remove(entry)
+        heapq.heapify(queue)
+
+    def acquire(self, priority: str = DEFAULT_PRIORITY, deadline: float = None) -> None:
+        """Block until a request may be sent. Call release() once it completed
+        # noqa: E501
+
+        Args:
+            priority (str, optional): One of VALID_PRIORITY_CLASSES
+            deadline (float, optional): Seconds the request may wait. None waits as long as needed
+
+        Raises:
+            ValueError: When priority is not one of VALID_PRIORITY_CLASSES
+            TimeoutError: When the deadline passed before the request could be sent
+        """
+        if priority not in self._queues:
+            raise ValueError(
+                f"The priority ({priority}) must be one of {VALID_PRIORITY_CLASSES}"
+            )
+        expires = math.inf if deadline is None else time.monotonic() + deadline
+        entry = [expires, next(self._seq)]
+
+        with self._cond:
+            heapq.heappush(self._queues[priority], entry)
+            while True:
+                now = time.monotonic()
+                if now >= expires:
+                    self._remove(priority, entry)
+                    self._expired[priority] += 1
+                    self._cond.notify_all()
+                    raise TimeoutError(
+                        f"A {priority} request was dropped: its deadline ({deadline}s) passed"
+                    )
+
+                timeout = expires - now
+                if self._head() is entry:
+                    wait = self.limiter.try_acquire()
+                    if not wait:
+                        self._remove(priority, entry)
+                        self._active[priority] += 1
+                        self._sent[priority] += 1
+                        self._cond.notify_all()  # The next request may be the head now
+                        return
+                    timeout = min(timeout, wait)
+
+                self._cond.wait(None if timeout == math.inf else timeout)
+
+    def release(self, priority: str = DEFAULT_PRIORITY) -> None:
+        """Free the slot of a request sent after acquire()"""
+        with self._cond:
+            self._active[priority] -= 1
+            self._cond.notify_all()
+
+    @contextmanager
+    def slot(self, priority: str = DEFAULT_PRIORITY, deadline: float = None):
+        """acquire() and release() around a block. Example: with scheduler.slot("background"): ..."""
+        self.acquire(priority=priority, deadline=deadline)
+        try:
+            yield
+        finally:
+            self.release(priority=priority)
+
+    def stats(self) -> dict:
+        """Per priority class counts
+
+        Returns:
+            dict: {priority: {"active", "waiting", "sent", "expired"}}
+        """
+        with self._cond:
+            return {
+                c: {
+                    "active": self._active[c],
+                    "waiting": len(self._queues[c]),
+                    "sent": self._sent[c],
+                    "expired": self._expired[c],
+                }
+                for c in VALID_PRIORITY_CLASSES
+            }
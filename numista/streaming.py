@@ -0,0 +1,131 @@
+"""Incremental parsing of JSON responses, yielding the elements of one array as they arrive
+
+Attributes:
+    DEFAULT_STREAM_CHUNK (int): Default bytes read from the response at a time
+"""
+import codecs
+import json
+
+DEFAULT_STREAM_CHUNK = 65536
+
+_WHITESPACE = " \t\n\r"
+_DELIMITERS = frozenset(_WHITESPACE + ",]}")
+_DECODER = json.JSONDecoder()
+
+
+class _Buffer:
+    """Decoded text of a chunk iterator, consumed from the front"""
+
+    def __init__(self, chunks: object = None):
+        self.text = str()
+        self.pos = 0
+        self.eof = False
+        self._chunks = iter(chunks)
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+
+    def fill(self) -> bool:
+        """Read the next chunk. Returns False once the chunks are exhausted"""
+        if self.eof:
+            return False
+        try:
+            chunk = next(self._chunks)
+        except StopIteration:
+            self.eof = True
+            self.text = self.text[self.pos :] + self._decoder.decode(b"", final=True)
+            self.pos = 0
+            return False
+        self.text = self.text[self.pos :] + self._decoder.decode(chunk)
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        """The next non-whitespace character, reading more as needed. Empty at the end"""
+        while True:
+            while self.pos < len(self.text) and self.text[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.text):
+                return self.text[self.pos]
+            if not self.fill():
+                return str()
+
+    def expect(self, char: str = str()) -> None:
+        """Consume one expected character"""
+        found = self.peek()
+        if found != char:
+            raise ValueError(f"Expected '{char}' in the JSON stream, found '{found}'")
+        self.pos += 1
+
+    def value(self) -> object:
+        """Decode one complete JSON value, reading more as needed"""
+        self.peek()
+        while True:
+            try:
+                value, end = _DECODER.raw_decode(self.text, self.pos)
+            except json.JSONDecodeError:
+                if self.fill():
+                    continue
+                raise
+            # A number is only complete once a delimiter follows it: "12" may continue as "12.5"
+            if (
+                isinstance(value, (int, float))
+                and not self.eof
+                and (end == len(self.text) or self.text[end] not in _DELIMITERS)
+            ):
+                self.fill()
+                continue
+            self.pos = end
+            return value
+
+
+def iter_json_array(chunks: object = None, key: str = None, meta: dict = None) -> object:
+    """Yield the elements of a JSON array from an iterable of bytes chunks, keeping only one element in memory
+    # noqa: E501
+
+    Args:
+        chunks (iterable): The response body in chunks of bytes. Example: requests.Response().iter_content(65536)
+        key (str, optional): The key of the array in the top-level object. Example: "types". None when the body is an array
+        meta (dict, optional): Filled with the other top-level values of the object (Example: "count") as they are parsed
+
+    Yields:
+        object: Each element of the array, in order
+
+    Raises:
+        ValueError: When the body is not valid JSON, or has no array under key
+    """
+    buffer = _Buffer(chunks)
+    meta = meta if meta is not None else dict()
+
+    if key is None:
+        yield from _iter_array(buffer)
+        return
+
+    buffer.expect("{")
+    found = False
+    while buffer.peek() != "}":
+        name = buffer.value()
+        buffer.expect(":")
+        if name == key and not found:
+            found = True
+            yield from _iter_array(buffer)
+        else:
+            meta[name] = buffer.value()
+        if buffer.peek() == ",":
+            buffer.pos += 1
+    if not found:
+        raise ValueError(f"No array under '{key}' in the JSON stream")
+
+
+def _iter_array(buffer: _Buffer = None) -> object:
+    """Yield the elements of the array at the buffer's position"""
+    buffer.expect("[")
+    if buffer.peek() == "]":
+        buffer.pos += 1
+        return
+    while True:
+        yield buffer.value()
+        char = buffer.peek()
+        buffer.pos += 1
+        if char == "]":
+            return
+        if char != ",":
+            raise ValueError(f"Expected ',' or ']' in the JSON stream, found '{char}'")
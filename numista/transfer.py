@@ -0,0 +1,77 @@
+"""Bandwidth accounting of API responses, per endpoint template"""
+import threading
+
+
+class TransferStats:
+    """Thread-safe counters of response bytes on the wire against decoded, per endpoint template
+
+    Attributes:
+        endpoints (dict): {endpoint template: {"requests", "wire_bytes", "decoded_bytes", "encodings": {encoding: requests}}}
+    """
+
+    def __init__(self):
+        """Initialize empty counters"""
+        self.endpoints = dict()
+        self._lock = threading.Lock()
+
+    def record(
+        self,
+        endpoint: str = str(),
+        wire_bytes: int = 0,
+        decoded_bytes: int = 0,
+        encoding: str = "identity",
+    ) -> None:
+        """Count one response
+        # noqa: E501
+
+        Args:
+            endpoint (str): The endpoint template. Example: "GET /types/{id}"
+            wire_bytes (int): Bytes received, before decompression
+            decoded_bytes (int): Bytes after decompression
+            encoding (str, optional): The response's Content-Encoding
+        """
+        with self._lock:
+            stats = self.endpoints.get(endpoint)
+            if stats is None:
+                stats = self.endpoints[endpoint] = {
+                    "requests": 0,
+                    "wire_bytes": 0,
+                    "decoded_bytes": 0,
+                    "encodings": dict(),
+                }
+            stats["requests"] += 1
+            stats["wire_bytes"] += wire_bytes
+            stats["decoded_bytes"] += decoded_bytes
+            stats["encodings"][encoding] = stats["encodings"].get(encoding, 0) + 1
+
+    def snapshot(self, reset: bool = False) -> dict:
+        """A copy of the counters with totals and compression ratios (wire / decoded)
+        # noqa: E501
+
+        Args:
+            reset (bool, optional): Zero the counters after copying them
+
+        Returns:
+            dict: {"endpoints": {template: {..., "ratio"}}, "total": {"requests", "wire_bytes", "decoded_bytes", "ratio"}}
+        """
+        with self._lock:
+            endpoints = {
+                k: {**v, "encodings": dict(v["encodings"])} for k, v in self.endpoints.items()
+            }
+            if reset:
+                self.endpoints = dict()
+
+        total = {"requests": 0, "wire_bytes": 0, "decoded_bytes": 0}
+        for stats in endpoints.values():
+            stats["ratio"] = _ratio(stats)
+            for k in total:
+                total[k] += stats[k]
+        total["ratio"] = _ratio(total)
+        return {"endpoints": endpoints, "total": total}
+
+
+def _ratio(stats: dict = dict()) -> float:
+    """Wire bytes per decoded byte, 1.0 when nothing was decoded"""
+    if not stats["decoded_bytes"]:
+        return 1.0
+    return round(stats["wire_bytes"] / stats["decoded_bytes"], 4)
@@ -0,0 +1,108 @@
+"""Precomputed validation tables and bulk (column at once) validation
+
+The grade, category and scope tables are frozensets built at import in numista.numista.
+The ISO 4217 currency table is built once, on first use, so iso4217 is only imported when needed.
+"""
+from numista.numista import VALID_CATEGORY_TYPES_SET, VALID_NUMISTA_GRADES_SET
+from numista.optional import load_numpy
+
+_CURRENCY_CODES = None
+
+
+def currency_codes() -> frozenset:
+    """The 3-letter ISO 4217 currency codes, uppercase
+
+    Returns:
+        frozenset: Every valid currency code
+    """
+    global _CURRENCY_CODES
+    if _CURRENCY_CODES is None:
+        from iso4217 import Currency
+
+        _CURRENCY_CODES = frozenset(c.code.upper() for c in Currency)
+    return _CURRENCY_CODES
+
+
+def validate_column(
+    values: list = list(), valid: frozenset = frozenset(), upper: bool = False
+):
+    """Check a whole column of values against a valid set at once
+    Each distinct value is only looked up once
+    # noqa: E501
+
+    Args:
+        values (list): The values to check. Example: a column of grades
+        valid (frozenset): The valid values
+        upper (bool, optional): Uppercase values before checking. Example: currency codes
+
+    Returns:
+        numpy.ndarray | list: A boolean mask, as a numpy array when numpy is installed, otherwise a list
+    """
+    # A dict memo beats numpy.unique() on object columns: one set lookup per distinct value
+    memo = dict()
+    mask = list()
+    for value in values:
+        ok = memo.get(value)
+        if ok is None:
+            text = str(value).upper() if upper else value
+            ok = memo[value] = text in valid
+        mask.append(ok)
+
+    np = load_numpy()
+    return mask if np is None else np.fromiter(mask, dtype=bool, count=len(mask))
+
+
+def validate_grades(grades: list = list()):
+    """Check a column of grades against VALID_NUMISTA_GRADES
+
+    Returns:
+        numpy.ndarray | list: A boolean mask
+    """
+    return validate_column(grades, VALID_NUMISTA_GRADES_SET)
+
+
+def validate_categories(categories: list = list()):
+    """Check a column of categories against VALID_CATEGORY_TYPES
+
+    Returns:
+        numpy.ndarray | list: A boolean mask
+    """
+    return validate_column(categories, VALID_CATEGORY_TYPES_SET)
+
+
+def validate_currencies(currencies: list = list()):
+    """Check a column of currency codes (any case) against ISO 4217
+
+    Returns:
+        numpy.ndarray | list: A boolean mask
+    """
+    return validate_column(currencies, currency_codes(), upper=True)
+
+
+def bulk_validate(currencies: list = None, grades: list = None) -> dict:
+    """Validate columns of currencies and grades in one call
+    # noqa: E501
+
+    Args:
+        currencies (list, optional): Currency codes to check
+        grades (list, optional): Grades to check
+
+    Returns:
+        dict: {"currency": mask, "grade": mask, "valid": mask} for the columns provided. "valid" is set when every provided column is valid, which requires equal lengths
+    """
+    result = dict()
+    if currencies is not None:
+        result["currency"] = validate_currencies(currencies)
+    if grades is not None:
+        result["grade"] = validate_grades(grades)
+
+    masks = list(result.values())
+    if masks:
+        if len({len(m) for m in masks}) > 1:
+            raise ValueError("currencies and grades must be the same length")
+        np = load_numpy()
+        if np is None:
+            result["valid"] = [all(row) for row in zip(*masks)]
+        else:
+            result["valid"] = np.logical_and.reduce(masks)
+    return result
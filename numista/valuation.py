@@ -0,0 +1,243 @@
+"""Valuation of a user's collection from getPrices() estimates
+
+Attributes:
+    GRADE_INDEX (dict): Position of every grade in VALID_NUMISTA_GRADES
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+from numista.cache import TTLCache
+from numista.concurrency import AdaptiveLimiter, limited_call
+from numista.numista import (
+    DEFAULT_BULK_WORKERS,
+    DEFAULT_CURRENCY,
+    DEFAULT_RATE_LIMIT,
+    VALID_NUMISTA_GRADES,
+)
+from numista.optional import load_numpy
+from numista.ratelimit import RateLimiter
+
+GRADE_INDEX = {grade: i for i, grade in enumerate(VALID_NUMISTA_GRADES)}
+
+
+class CollectionValuer:
+    """Values collected items with one getPrices() call per distinct (type, issue, currency)
+
+    Attributes:
+        cache (TTLCache): Cache of price estimates by (type_id, issue_id, currency)
+        concurrency (AdaptiveLimiter): Adapts the number of concurrent requests to latency and HTTP 429. None keeps workers fixed
+        limiter (RateLimiter): The rate limiter every request waits on
+        logger (object): The logger class is attached here
+        numista (Numista): The Numista() client used to send requests
+        workers (int): Number of concurrent requests, the maximum when concurrency is set
+    """
+
+    def __init__(
+        self,
+        numista,
+        cache: TTLCache = None,
+        workers: int = DEFAULT_BULK_WORKERS,
+        rate: float = DEFAULT_RATE_LIMIT,
+        limiter: RateLimiter = None,
+        concurrency: AdaptiveLimiter = None,
+    ):
+        """Initialize the valuer
+        # noqa: E501
+
+        Args:
+            numista (Numista): An instantiated Numista() client
+            cache (TTLCache, optional): A price cache to share between valuations. Default: a new TTLCache()
+            workers (int, optional): Number of concurrent requests
+            rate (float, optional): Maximum requests per second. 0 disables limiting. Ignored when limiter is provided
+            limiter (RateLimiter, optional): A rate limiter to share with other jobs
+            concurrency (AdaptiveLimiter, optional): Adapt the number of concurrent requests, up to its max_limit, to latency and HTTP 429. Overrides workers
+        """
+        self.numista = numista
+        self.logger = numista.logger
+        self.cache = cache if cache is not None else TTLCache()
+        self.concurrency = concurrency
+        self.workers = concurrency.max_limit if concurrency else max(int(workers), 1)
+        self.limiter = limiter if limiter else RateLimiter(rate=rate)
+
+    def _fetch(self, key: tuple = tuple()) -> tuple:
+        """Fetch the price estimates of one (type_id, issue_id, currency)
+
+        Returns:
+            tuple: (key, {grade: price}) or (key, None) when the lookup failed
+        """
+        type_id, issue_id, currency = key
+        self.limiter.acquire()
+        result = limited_call(
+            self.concurrency,
+            self.numista.getPrices,
+            type_id=type_id,
+            issue_id=issue_id,
+            currency=currency,
+        )
+        if result["failed"] or result["http_info"]["http_status"] != 200:
+            self.logger.info(f"getPrices() failed for {key}, leaving unvalued")
+            return key, None
+        prices = {
+            p["grade"]: float(p["price"])
+            for p in result["data"].get("prices", list())
+            if p.get("price") is not None
+        }
+        return key, prices
+
+    def prices(self, keys: set = set()) -> dict:
+        """Price estimates for many (type_id, issue_id, currency), from cache or fetched concurrently
+        # noqa: E501
+
+        Args:
+            keys (set): (type_id, issue_id, currency) tuples
+
+        Returns:
+            dict: {grade: price} by key. Failed lookups are left out
+        """
+        found = dict()
+        missing = list()
+        for key in keys:
+            cached = self.cache.get(("prices", *key))
+            if cached is None:
+                missing.append(key)
+            else:
+                found[key] = cached
+
+        self.logger.debug(
+            f"{len(found)} price lookups cached, fetching {len(missing)}"
+        )
+        if missing:
+            with ThreadPoolExecutor(max_workers=self.workers) as pool:
+                for key, prices in pool.map(self._fetch, missing):
+                    if prices is not None:
+                        self.cache.set(("prices", *key), prices)
+                        found[key] = prices
+        return found
+
+    def value(self, items: list = list(), currency: str = DEFAULT_CURRENCY) -> dict:
+        """Value collected items
+        # noqa: E501
+
+        Args:
+            items (list): Collected items, as in getCollectedItems()["data"]["items"]
+            currency (str, optional): 3-letter ISO 4217 currency code
+
+        Returns:
+            dict: {"currency", "total", "valued_items", "unvalued_items", "by_grade": {grade: {"items", "quantity", "value"}}}
+        """
+        currency = currency.upper()
+
+        # Flatten into columns once, keeping only what the maths needs
+        keys = list()
+        grades = list()
+        quantities = list()
+        unvalued = 0
+        for item in items:
+            type_id = (item.get("type") or dict()).get("id")
+            issue = item.get("issue") or dict()
+            grade = GRADE_INDEX.get(item.get("grade"))
+            if not type_id or not issue.get("id") or grade is None:
+                unvalued += 1
+                continue
+            keys.append((type_id, issue["id"], currency))
+            grades.append(grade)
+            quantities.append(item.get("quantity", 1))
+
+        distinct = dict.fromkeys(keys)
+        prices = self.prices(set(distinct))
+        key_index = {key: i for i, key in enumerate(distinct)}
+
+        # Price matrix: one row per distinct key, one column per grade
+        n_grades = len(VALID_NUMISTA_GRADES)
+        matrix = [[None] * n_grades for _ in key_index]
+        for key, i in key_index.items():
+            for grade, price in prices.get(key, dict()).items():
+                if grade in GRADE_INDEX:
+                    matrix[i][GRADE_INDEX[grade]] = price
+
+        rows = [key_index[key] for key in keys]
+        np = load_numpy()
+        if np is None:
+            by_grade, total, valued = self._sum_python(matrix, rows, grades, quantities)
+        else:
+            by_grade, total, valued = self._sum_numpy(
+                np, matrix, rows, grades, quantities
+            )
+
+        unvalued += len(keys) - valued
+        return {
+            "currency": currency,
+            "total": total,
+            "valued_items": valued,
+            "unvalued_items": unvalued,
+            "by_grade": by_grade,
+        }
+
+    def _sum_numpy(
+        self,
+        np,
+        matrix: list = list(),
+        rows: list = list(),
+        grades: list = list(),
+        quantities: list = list(),
+    ) -> tuple:
+        """Totals with numpy
+
+        Returns:
+            tuple: (by_grade, total, valued_items)
+        """
+        n_grades = len(VALID_NUMISTA_GRADES)
+        matrix = np.array(matrix, dtype=float).reshape(-1, n_grades)  # None -> nan
+        rows = np.asarray(rows, dtype=np.int64)
+        grades = np.asarray(grades, dtype=np.int64)
+        quantities = np.asarray(quantities, dtype=float)
+
+        unit = matrix[rows, grades] if len(rows) else np.zeros(0)
+        priced = ~np.isnan(unit)
+        values = np.where(priced, unit * quantities, 0.0)
+
+        count = np.bincount(grades[priced], minlength=n_grades)
+        quantity = np.bincount(grades[priced], weights=quantities[priced], minlength=n_grades)
+        value = np.bincount(grades, weights=values, minlength=n_grades)
+
+        by_grade = {
+            grade: {
+                "items": int(count[i]),
+                "quantity": float(quantity[i]),
+                "value": float(value[i]),
+            }
+            for i, grade in enumerate(VALID_NUMISTA_GRADES)
+            if count[i]
+        }
+        return by_grade, float(values.sum()), int(priced.sum())
+
+    def _sum_python(
+        self,
+        matrix: list = list(),
+        rows: list = list(),
+        grades: list = list(),
+        quantities: list = list(),
+    ) -> tuple:
+        """Totals without numpy
+
+        Returns:
+            tuple: (by_grade, total, valued_items)
+        """
+        by_grade = dict()
+        total = 0.0
+        valued = 0
+        for row, grade, quantity in zip(rows, grades, quantities):
+            unit = matrix[row][grade]
+            if unit is None:
+                continue
+            value = unit * quantity
+            total += value
+            valued += 1
+            entry = by_grade.setdefault(
+                VALID_NUMISTA_GRADES[grade], {"items": 0, "quantity": 0.0, "value": 0.0}
+            )
+            entry["items"] += 1
+            entry["quantity"] += quantity
+            entry["value"] += value
+
+        by_grade = {g: by_grade[g] for g in VALID_NUMISTA_GRADES if g in by_grade}
+        return by_grade, total, valued
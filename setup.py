@@ -12,7 +12,7 @@ setuptools.setup(
     long_description=long_description,
     long_description_content_type="text/markdown",
     url="https://github.com/namachieli/numista-api-sdk",
-    packages=setuptools.find_packages(),
+    packages=setuptools.find_packages(exclude=["tests", "tests.*"]),
     classifiers=[
         "Programming Language :: Python :: 3.8.10",
         "Operating System :: OS Independent",
@@ -27,4 +27,12 @@ setuptools.setup(
         "ruamel.yaml>=0.17.21",
         "validators>=0.18.2",
     ],
+    extras_require={
+        "numpy": ["numpy>=1.20"],
+        "arrow": ["pyarrow>=8"],
+        "brotli": ["brotli>=1.0"],
+    },
+    entry_points={
+        "console_scripts": ["numista=numista.cli:main"],
+    },
 )
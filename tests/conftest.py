@@ -0,0 +1,267 @@
+"""Fixtures: a local stub of the Numista v3 API and clients pointed at it"""
+import gzip
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+import numista.numista as _numista
+from numista import Numista
+
+API_KEY = "test-api-key"
+STUB_USER_ID = 2
+GRADES = ["g", "vg", "f", "vf", "xf", "au", "unc"]
+ISSUERS = [
+    {"code": "france", "name": "France"},
+    {"code": "etats-unis", "name": "United States"},
+    {"code": "mexique", "name": "Mexico"},
+]
+CATALOGUES = [{"id": 3, "code": "KM", "title": "Standard Catalog of World Coins"}]
+WORDS = ["Buffalo", "Eagle", "Liberty", "Franc", "Peso", "Crown"]
+
+
+def _schema() -> dict:
+    """A small swagger document, enough for schemaFind() and schemaGenerateBody()"""
+    return {
+        "openapi": "3.0.0",
+        "paths": {
+            "/types/{type_id}": {"get": {"operationId": "getType", "parameters": []}},
+            "/users/{user_id}/collected_items": {
+                "get": {"operationId": "getCollectedItems", "parameters": []},
+                "post": {
+                    "operationId": "addCollectedItem",
+                    "requestBody": {
+                        "content": {
+                            "application/json": {
+                                "schema": {
+                                    "type": "object",
+                                    "properties": {
+                                        "type": {"type": "integer", "example": 420},
+                                        "quantity": {"type": "integer", "example": 1},
+                                        "grade": {"type": "string", "example": "vf"},
+                                    },
+                                }
+                            }
+                        }
+                    },
+                },
+            },
+        },
+    }
+
+
+class StubAPI:
+    """State of the stub API, read and changed by the tests between requests
+
+    Attributes:
+        calls (list): (method, path, params, headers) of every request received, in order
+        collections (dict): Collected items of every user: {user_id: {item_id: item}}
+        compress (bool): gzip the responses of requests accepting it
+        delays (dict): Seconds the requests of a path wait before they are answered: {(method, path): seconds}, or a list of seconds taken one per request
+        latency (float): Seconds every other request waits before it is answered
+        queued (dict): Responses served before the routes: {(method, path): [(status, body, headers)]}
+        types (dict): Catalogue types by ID
+        url (str): Base URL of the running server
+    """
+
+    def __init__(self):
+        self.types = {
+            i: {
+                "id": i,
+                "title": f"{WORDS[i % len(WORDS)]} {i} cents",
+                "category": ["coin", "banknote", "exonumia"][i % 3],
+                "issuer": ISSUERS[i % len(ISSUERS)],
+                "min_year": 1800 + i,
+                "max_year": 1900 + i,
+            }
+            for i in range(1, 31)
+        }
+        self.collections = {
+            STUB_USER_ID: {
+                k: {"id": k, "quantity": 1, "type": {"id": k}, "grade": GRADES[k % 7]}
+                for k in range(1, 6)
+            }
+        }
+        self.calls = list()
+        self.compress = False
+        self.delays = dict()
+        self.latency = 0.0
+        self.queued = dict()
+        self.url = None
+        self._lock = threading.Lock()
+        self._next_id = 1000
+        self._server = None
+
+    def queue(self, method: str, path: str, *responses) -> None:
+        """Serve responses, (status, body) or (status, body, headers), to the next requests of a path"""
+        with self._lock:
+            self.queued.setdefault((method, path), list()).extend(responses)
+
+    def count(self, method: str = None, path: str = None) -> int:
+        """Number of requests received, of a method and path when given"""
+        with self._lock:
+            return sum(
+                1
+                for m, p, _, _ in self.calls
+                if (method is None or m == method) and (path is None or p == path)
+            )
+
+    def start(self) -> "StubAPI":
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _handle(self):
+                stub._handle(self)
+
+            do_GET = do_POST = do_PATCH = do_DELETE = _handle
+
+        class Server(ThreadingHTTPServer):
+            request_queue_size = 128  # 64 threads connecting at once overflow the default backlog of 5
+
+        self._server = Server(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self._server.server_port}"
+        serve = threading.Thread(
+            target=self._server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True
+        )
+        serve.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _reply(self, handler, status: int, body: object = None, headers: dict = None) -> None:
+        payload = b"" if body is None else json.dumps(body).encode("utf-8")
+        handler.send_response(status)
+        handler.send_header("Content-Type", "application/json")
+        if self.compress and payload and "gzip" in handler.headers.get("Accept-Encoding", ""):
+            payload = gzip.compress(payload)
+            handler.send_header("Content-Encoding", "gzip")
+        for k, v in (headers or dict()).items():
+            handler.send_header(k, v)
+        handler.send_header("Content-Length", str(len(payload)))
+        handler.end_headers()
+        handler.wfile.write(payload)
+
+    def _handle(self, handler) -> None:
+        url = urlparse(handler.path)
+        method = handler.command
+        path = re.sub(r"^/api/v3", "", url.path)
+        params = {k: v[0] for k, v in parse_qs(url.query).items()}
+        length = int(handler.headers.get("Content-Length") or 0)
+        body = json.loads(handler.rfile.read(length)) if length else None
+
+        with self._lock:
+            self.calls.append((method, path, params, dict(handler.headers)))
+            queued = self.queued.get((method, path))
+            response = queued.pop(0) if queued else None
+            delay = self.delays.get((method, path), self.latency)
+            if isinstance(delay, list):
+                delay = delay.pop(0) if delay else self.latency
+        if delay:
+            time.sleep(delay)
+        if response is not None:
+            return self._reply(handler, *response)
+        return self._reply(handler, *self._route(method, path, params, body, handler.headers))
+
+    def _route(self, method, path, params, body, headers) -> tuple:
+        if path == "/api/doc/swagger.yaml":
+            return 200, _schema()
+        if headers.get("Numista-API-Key") != API_KEY:
+            return 401, {"error_message": "Invalid API key"}
+        if path == "/oauth_token":
+            token = {"access_token": f"token-{time.time()}", "token_type": "bearer"}
+            return 200, {**token, "expires_in": 3600, "user_id": STUB_USER_ID}
+        if path == "/issuers":
+            return 200, {"count": len(ISSUERS), "issuers": ISSUERS}
+        if path == "/catalogues":
+            return 200, {"count": len(CATALOGUES), "catalogues": CATALOGUES}
+        if path == "/types":
+            hits = list(self.types.values())
+            if params.get("issuer"):
+                hits = [t for t in hits if t["issuer"]["code"] == params["issuer"]]
+            if params.get("category"):
+                hits = [t for t in hits if t["category"] == params["category"]]
+            if params.get("q"):
+                hits = [t for t in hits if params["q"].lower() in t["title"].lower()]
+            page, count = int(params.get("page", 1)), int(params.get("count", 50))
+            return 200, {"count": len(hits), "types": hits[(page - 1) * count : page * count]}
+        match = re.match(r"^/types/(\d+)$", path)
+        if match:
+            record = self.types.get(int(match.group(1)))
+            return (200, {**record, "value": {"text": "1 cent"}}) if record else (404, {})
+        match = re.match(r"^/types/(\d+)/issues$", path)
+        if match:
+            type_id = int(match.group(1))
+            return 200, [{"id": type_id * 10 + j, "year": 1900 + j} for j in range(1, 4)]
+        match = re.match(r"^/types/(\d+)/issues/(\d+)/prices$", path)
+        if match:
+            issue_id = int(match.group(2))
+            prices = [{"grade": g, "price": issue_id * (i + 1) / 2} for i, g in enumerate(GRADES)]
+            return 200, {"currency": params.get("currency", "EUR"), "prices": prices}
+        if re.match(r"^/users/(\d+)$", path):
+            return 200, {"username": "collector"}
+
+        if not headers.get("Authorization", "").startswith("Bearer token-"):
+            return 401, {"error_message": "Invalid or missing token"}
+        match = re.match(r"^/users/(\d+)/collected_items$", path)
+        if match:
+            user_id = int(match.group(1))
+            with self._lock:
+                collection = self.collections.setdefault(user_id, dict())
+                if method == "POST":
+                    self._next_id += 1
+                    item = collection[self._next_id] = {"id": self._next_id, **body}
+                    return 201, item
+                items = list(collection.values())
+            etag = '"%s"' % hash(json.dumps(items, sort_keys=True))
+            if headers.get("If-None-Match") == etag:
+                return 304, None, {"ETag": etag}
+            return 200, {"item_count": len(items), "items": items}, {"ETag": etag}
+        match = re.match(r"^/users/(\d+)/collected_items/(\d+)$", path)
+        if match:
+            user_id, item_id = int(match.group(1)), int(match.group(2))
+            with self._lock:
+                collection = self.collections.setdefault(user_id, dict())
+                if item_id not in collection:
+                    return 404, {"error_message": "Item not found"}
+                if method == "DELETE":
+                    del collection[item_id]
+                    return 204, None
+                if method == "PATCH":
+                    collection[item_id].update(body)
+                return 200, collection[item_id]
+        return 404, {"error_message": "No route"}
+
+
+@pytest.fixture(scope="session")
+def log_path(tmp_path_factory) -> str:
+    return str(tmp_path_factory.mktemp("logs") / "numista.log")
+
+
+@pytest.fixture
+def api(monkeypatch) -> StubAPI:
+    """A running stub API, the target of every Numista() client of the test"""
+    stub = StubAPI().start()
+    monkeypatch.setattr(_numista, "API_BASE_URL", f"{stub.url}/api")
+    monkeypatch.setattr(_numista, "API_SCHEMA_URL", f"{stub.url}/api/doc/swagger.yaml")
+    yield stub
+    stub.stop()
+
+
+@pytest.fixture
+def client(api, log_path) -> Numista:
+    """A Numista() client of the stub API"""
+    numista = Numista(api_key=API_KEY, log_path=log_path)
+    yield numista
+    numista.context.close()
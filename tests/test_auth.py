@@ -0,0 +1,29 @@
+import pytest
+
+from tests.conftest import STUB_USER_ID
+
+
+def test_collection_calls_resolve_auth_once_per_token(api, client):
+    item = client.addCollectedItem(body={"type": 420, "quantity": 1})["data"]  # user_id from the token
+    auth = client.context.auth["self"]
+    assert client.getCollectedItem(item_id=item["id"])["data"]["type"] == 420
+    assert client.editCollectedItem(item_id=item["id"], body={"quantity": 2})["data"]["quantity"] == 2
+    assert client.deleteCollectedItem(item_id=item["id"])["http_info"]["http_status"] == 204
+    assert client.context.auth["self"] is auth and auth["user_id"] == STUB_USER_ID
+
+    client.myTokenRefresh()
+    client.getCollectedItems()
+    refreshed = client.context.auth["self"]
+    assert refreshed is not auth and refreshed["token"] != auth["token"]
+    assert api.calls[-1][3]["Authorization"] == refreshed["headers"]["Authorization"]
+
+
+def test_get_collected_items_sends_the_type_filter(api, client):
+    client.getCollectedItems(user_id=STUB_USER_ID, type_id=420)
+    assert api.calls[-1][2]["type"] == "420"
+
+
+def test_unknown_token_label_raises_lookup_error(client):
+    for call in (client.getCollectedItems, client.getUserCollections, client.deleteCollectedItem):
+        with pytest.raises(LookupError):
+            call(user_id=STUB_USER_ID, item_id=1, token_label="nobody")
@@ -0,0 +1,79 @@
+import time
+
+import pytest
+
+from numista import Numista
+from numista.breaker import CircuitBreaker, endpoint_template
+from numista.context import NumistaContext
+from tests.conftest import API_KEY, STUB_USER_ID
+
+
+@pytest.fixture
+def breaker_client(api, log_path):
+    breaker = CircuitBreaker(failures=2, reset_timeout=0.05)
+    numista = Numista(api_key=API_KEY, log_path=log_path, context=NumistaContext(breaker=breaker))
+    yield numista, breaker
+    numista.context.close()
+
+
+def test_endpoint_template():
+    assert endpoint_template("get", "/types/420/issues/7/prices") == "GET /types/{id}/issues/{id}/prices"
+    assert endpoint_template("post", "/users/2/collected_items") == "POST /users/{id}/collected_items"
+
+
+def test_circuit_opens_probes_and_closes():
+    breaker = CircuitBreaker(failures=2, reset_timeout=0.05)
+    key = "GET /types/{id}"
+    breaker.record(key, ok=False)
+    assert breaker.allow(key) and breaker.state(key) == "closed"
+    breaker.record(key, ok=False)
+    assert breaker.state(key) == "open" and not breaker.allow(key)
+
+    time.sleep(0.06)
+    assert breaker.allow(key) and breaker.state(key) == "half_open"
+    assert not breaker.allow(key)  # One probe at a time
+    breaker.record(key, ok=False)
+    assert breaker.state(key) == "open"  # A failed probe opens again at once
+
+    time.sleep(0.06)
+    assert breaker.allow(key)
+    breaker.record(key, ok=True)
+    assert breaker.state(key) == "closed" and breaker.stats() == {key: {"state": "closed", "failures": 0}}
+
+
+def test_open_circuit_serves_stale_results_without_sending(api, breaker_client):
+    client, breaker = breaker_client
+    assert client.getType(type_id=1)["extra"].get("stale") is None
+    api.queue("GET", "/types/1", (503, {}), (503, {}))
+
+    stale = client.getType(type_id=1)
+    assert stale["extra"]["stale"] and stale["data"]["id"] == 1
+    client.getType(type_id=1)
+    assert breaker.state("GET /types/{id}") == "open"
+
+    requests = api.count()
+    stale = client.getType(type_id=1)
+    assert stale["extra"] == {"circuit": "open", "stale": True} and api.count() == requests
+    unknown = client.getType(type_id=2)
+    assert unknown["failed"] and unknown["extra"] == {"circuit": "open", "stale": False}
+
+    time.sleep(0.06)
+    assert client.getType(type_id=2)["data"]["id"] == 2  # The half-open probe
+    assert breaker.state("GET /types/{id}") == "closed"
+
+
+def test_stale_results_stay_with_their_credentials(api, breaker_client, log_path):
+    client, breaker = breaker_client
+    other = Numista(api_key="key-B", log_path=log_path, context=client.context)
+    assert client._oauth(grant_type="client_credentials", token_label="a")["token"]
+
+    api.queue("GET", "/oauth_token", (503, {}))
+    with pytest.raises(ValueError):
+        other._oauth(grant_type="client_credentials", token_label="b")  # Never client A's token
+    assert "b" not in client.oauthTokens
+
+    client.getCollectedItems()
+    api.queue("GET", f"/users/{STUB_USER_ID}/collected_items", (503, {}), (503, {}))
+    assert client.getCollectedItems()["extra"]["stale"]  # The same credentials
+    unkept = other.getCollectedItems()  # Another API key, even with the same token
+    assert unkept["http_info"]["http_status"] == 503 and not unkept["extra"].get("stale")
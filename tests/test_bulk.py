@@ -0,0 +1,58 @@
+import json
+
+import pytest
+
+from numista.bulk import BulkCollectionWriter
+from tests.conftest import STUB_USER_ID
+
+
+def test_validate_lists_every_invalid_operation(client):
+    writer = BulkCollectionWriter(client, user_id=STUB_USER_ID, rate=0)
+    with pytest.raises(ValueError) as err:
+        writer.validate(
+            [
+                {"op": "add", "body": {"quantity": 1}},
+                {"op": "edit", "body": {"grade": "mint"}},
+                {"op": "delete", "item_id": 1, "body": ["not", "a", "dict"]},
+                {"op": "move", "item_id": 1},
+                "delete 1",
+            ]
+        )
+    message = str(err.value)
+    assert message.startswith("5 invalid bulk operation(s)")
+    assert "#0: body['type']" in message
+    assert "#1: item_id" in message and "#1: grade 'mint'" in message
+    assert "#2" not in message  # A delete ignores its body, whatever it is
+    assert "#3: op 'move'" in message
+    assert "#4: operation must be a dict" in message
+
+
+def test_checkpoint_resumes_completed_operations(api, client, tmp_path):
+    checkpoint = str(tmp_path / "bulk.ckpt")
+    operations = [{"op": "add", "body": {"type": 100 + i, "grade": "vf"}} for i in range(6)]
+    path = f"/users/{STUB_USER_ID}/collected_items"
+    api.queue("POST", path, (201, {"id": 1}), (201, {"id": 2}), (500, {}))
+
+    first = client.bulkCollectedItems(operations, workers=1, rate=0, checkpoint_path=checkpoint)
+    assert first["failed"] == 1 and first["succeeded"] == 5
+    assert api.count("POST", path) == 6
+
+    second = client.bulkCollectedItems(operations, workers=1, rate=0, checkpoint_path=checkpoint)
+    assert second["failed"] == 0 and second["resumed"] == 5
+    assert api.count("POST", path) == 7  # Only the failed operation was sent again
+    assert [o["item_id"] for o in second["items"][:2]] == [1, 2]
+
+
+def test_checkpoint_of_other_operations_is_refused(api, client, tmp_path):
+    checkpoint = str(tmp_path / "bulk.ckpt")
+    operations = [{"op": "delete", "item_id": item_id} for item_id in (1, 2)]
+    client.bulkCollectedItems(operations, rate=0, checkpoint_path=checkpoint)
+    with open(checkpoint) as f:
+        lines = f.read().splitlines()
+
+    reordered = list(reversed(operations))
+    with pytest.raises(ValueError, match="other operations"):
+        client.bulkCollectedItems(reordered, rate=0, checkpoint_path=checkpoint)
+    with open(checkpoint) as f:
+        assert f.read().splitlines() == lines
+    assert json.loads(lines[0])["operations"] == 2
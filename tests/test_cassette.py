@@ -0,0 +1,50 @@
+import pytest
+
+from numista import Numista
+from numista.cassette import Cassette
+from numista.context import NumistaContext
+from tests.conftest import API_KEY, STUB_USER_ID
+
+
+def _session(log_path: str, cassette: Cassette) -> list:
+    client = Numista(api_key=API_KEY, log_path=log_path, context=NumistaContext(transport=cassette))
+    results = [
+        client.getType(type_id=1),
+        client.getType(type_id=1),
+        client.getIssues(type_id=2),
+        client.getCollectedItems(user_id=STUB_USER_ID),
+    ]
+    client.context.close()
+    return [(r["http_info"]["http_status"], r["data"]) for r in results]
+
+
+@pytest.mark.parametrize("name", ["session.jsonl", "session.jsonl.gz"])
+def test_recorded_session_replays_offline(api, log_path, tmp_path, name):
+    path = str(tmp_path / name)
+    api.queue("GET", "/types/1", (500, {"error_message": "Try again"}))
+    recorded = _session(log_path, Cassette(path, mode="record"))
+    assert recorded[0][0] == 500 and recorded[1][0] == 200
+    requests = api.count()
+
+    cassette = Cassette(path, mode="replay")
+    assert _session(log_path, cassette) == recorded  # Repeated requests replay in order
+    assert cassette.misses == 0 and api.count() == requests
+    with pytest.raises(LookupError):
+        cassette.request("GET", f"{api.url}/api/v3/types/99")
+
+
+def test_secrets_are_never_written(api, log_path, tmp_path):
+    path = tmp_path / "session.jsonl"
+    cassette = Cassette(str(path), mode="record")
+    client = Numista(api_key=API_KEY, log_path=log_path, context=NumistaContext(transport=cassette))
+    client.getCollectedItems(user_id=STUB_USER_ID)
+    client.context.close()
+
+    written = path.read_text()
+    assert API_KEY not in written and "Bearer" not in written
+    assert cassette.interactions == 2  # OAuth, then the collection
+
+
+def test_unknown_mode_is_refused(tmp_path):
+    with pytest.raises(ValueError, match="mode"):
+        Cassette(str(tmp_path / "session.jsonl"), mode="stream")
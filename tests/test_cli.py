@@ -0,0 +1,71 @@
+import csv
+import json
+import os
+
+import pytest
+
+from numista.cli import default_log_path, main
+from tests.conftest import API_KEY
+
+
+def test_log_file_defaults_to_the_user_state_directory(tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_STATE_HOME", str(tmp_path / "state"))
+    path = default_log_path()
+    assert path == str(tmp_path / "state" / "numista" / "numista.log")
+    assert os.path.isdir(os.path.dirname(path))
+
+    monkeypatch.delenv("XDG_STATE_HOME")
+    monkeypatch.setenv("HOME", str(tmp_path))
+    assert default_log_path() == str(tmp_path / ".local" / "state" / "numista" / "numista.log")
+
+
+def test_export_types_and_prices(api, tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_STATE_HOME", str(tmp_path / "state"))
+    monkeypatch.setenv("NUMISTA_API_KEY", API_KEY)
+    types = str(tmp_path / "types.ndjson")
+    prices = str(tmp_path / "prices.csv")
+
+    assert main(["types", "--issuer", "mexique", "--count", "3", "--rate", "0", "-o", types]) == 0
+    with open(types) as f:
+        exported = [json.loads(line) for line in f]
+    assert sorted(t["id"] for t in exported) == sorted(
+        i for i, t in api.types.items() if t["issuer"]["code"] == "mexique"
+    )
+
+    code = main(["prices", "--issue", "2:21", "3:31", "--currency", "EUR", "--format", "csv", "--rate", "0", "-o", prices])
+    assert code == 0
+    with open(prices, newline="") as f:
+        rows = list(csv.DictReader(f))
+    assert len(rows) == 2 * 7
+    assert {(r["type_id"], r["issue_id"], r["currency"]) for r in rows} == {("2", "21", "EUR"), ("3", "31", "EUR")}
+
+
+def test_checkpoint_resumes_an_export(api, tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_STATE_HOME", str(tmp_path / "state"))
+    args = ["issues", "--api-key", API_KEY, "--type-id", "1", "2", "3", "--rate", "0"]
+    args += ["--checkpoint", str(tmp_path / "issues.ckpt"), "-o", str(tmp_path / "issues.ndjson")]
+    api.queue("GET", "/types/2/issues", (503, {}))
+
+    assert main(args) == 1
+    assert main(args) == 0
+    with open(tmp_path / "issues.ndjson") as f:
+        assert len(f.readlines()) == 3 * 3
+    assert api.count("GET", "/types/1/issues") == 1
+
+
+def test_bad_issues_and_input_records_are_reported(api, tmp_path, monkeypatch, capsys):
+    monkeypatch.setenv("XDG_STATE_HOME", str(tmp_path / "state"))
+    args = ["prices", "--api-key", API_KEY, "--rate", "0", "-o", str(tmp_path / "prices.ndjson")]
+    for issue in ("420", "2:x"):
+        with pytest.raises(SystemExit) as exit:
+            main(args + ["--issue", issue])
+        assert exit.value.code == 2 and "expected TYPE_ID:ISSUE_ID" in capsys.readouterr().err
+
+    records = tmp_path / "issues.txt"
+    records.write_text('2,21\n3\n{"id": 31}\n{"type_id": 3, "id": 31}\n4,abc\n')
+    assert main(args + ["--input", str(records)]) == 0
+    err = capsys.readouterr().err.splitlines()
+    assert len(err) == 3 and all(line.startswith("numista: bad input record") for line in err)
+    assert "'3'" in err[0] and "KeyError('type_id')" in err[1] and "'4,abc'" in err[2]
+    with open(tmp_path / "prices.ndjson") as f:
+        assert {(r["type_id"], r["issue_id"]) for r in map(json.loads, f)} == {(2, 21), (3, 31)}
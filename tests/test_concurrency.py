@@ -0,0 +1,64 @@
+import pytest
+
+from numista.concurrency import AdaptiveLimiter, limited_call
+from tests.conftest import STUB_USER_ID
+
+
+def _saturate(limiter: AdaptiveLimiter, status: int = 200) -> None:
+    """Run limit's worth of requests, every slot in use"""
+    started = [limiter.acquire() for _ in range(limiter.limit)]
+    for start in started:
+        limiter.release(start, status=status)
+
+
+def test_limit_grows_while_saturated_and_halves_on_429():
+    limiter = AdaptiveLimiter(initial=2, max_limit=4, latency_tolerance=0)
+    for _ in range(10):
+        _saturate(limiter)
+    assert limiter.limit == 4  # Capped at max_limit
+
+    limiter.release(limiter.acquire(), status=429)
+    assert limiter.limit == 2
+    started = limiter.acquire()
+    limiter.release(limiter.acquire(), status=503)
+    limiter.release(started, status=0)  # Started before the last decrease: not decreased twice
+    assert limiter.limit == 1 and limiter.stats()["decreases"] == 2
+
+    limiter.release(limiter.acquire(), status=503)
+    assert limiter.limit == 1  # Not below min_limit
+
+
+def test_unsaturated_limit_does_not_grow_and_full_limit_times_out():
+    limiter = AdaptiveLimiter(initial=2, latency_tolerance=0)
+    for _ in range(10):
+        limiter.release(limiter.acquire())
+    assert limiter.limit == 2
+
+    held = [limiter.acquire(), limiter.acquire()]
+    with pytest.raises(TimeoutError):
+        limiter.acquire(timeout=0.01)
+    assert limiter.in_flight == 2
+    for start in held:
+        limiter.release(start)
+    with pytest.raises(ValueError):
+        AdaptiveLimiter(decrease=1.5)
+
+
+def test_slow_requests_count_as_overloaded():
+    limiter = AdaptiveLimiter(initial=8, latency_tolerance=2.0)
+    for _ in range(20):
+        limiter.release(limiter.acquire())
+    limiter.release(limiter.acquire() - 10.0)  # A request that took 10s more than the others
+    assert limiter.limit == 4
+
+
+def test_bulk_writes_adapt_to_the_api(api, client):
+    path = f"/users/{STUB_USER_ID}/collected_items"
+    api.queue("POST", path, (429, {}), (429, {}))
+    limiter = AdaptiveLimiter(initial=4, max_limit=8, latency_tolerance=0)
+    operations = [{"op": "add", "body": {"type": 100 + i}} for i in range(20)]
+
+    report = client.bulkCollectedItems(operations, rate=0, concurrency=limiter)
+    assert report["succeeded"] + report["failed"] == 20
+    assert limiter.stats()["decreases"] >= 1 and limiter.in_flight == 0
+    assert limited_call(None, client.getIssuers)["http_info"]["http_status"] == 200
@@ -0,0 +1,25 @@
+from numista import Numista, NumistaContext
+from tests.conftest import API_KEY
+
+
+def test_clients_share_tokens_and_transport(api, log_path):
+    context = NumistaContext()
+    first = Numista(api_key=API_KEY, log_path=log_path, lazy=True, context=context)
+    second = Numista(api_key=API_KEY, log_path=log_path, lazy=True, context=context)
+    assert context._transport is None  # Nothing is opened until first use
+
+    assert first.myToken() == second.myToken()
+    second.getCollectedItems()
+    assert api.count("GET", "/oauth_token") == 1
+    assert first.context.transport is second.context.transport
+    context.close()
+    assert context._transport is None
+
+
+def test_lazy_client_generates_its_token_on_first_use(api, log_path):
+    client = Numista(api_key=API_KEY, log_path=log_path, lazy=True, auto_self_token=True)
+    assert api.count() == 0
+
+    assert client.getCollectedItems()["http_info"]["http_status"] == 200
+    assert api.count("GET", "/oauth_token") == 1
+    client.context.close()
@@ -0,0 +1,43 @@
+import json
+import os
+
+import pytest
+
+from numista.crawler import CRAWL_MERGED_FILE, CatalogueCrawler
+
+
+def _crawler(client, tmp_path, **kwargs) -> CatalogueCrawler:
+    return CatalogueCrawler(client, path=str(tmp_path), processes=2, workers=2, rate=0, **kwargs)
+
+
+def test_crawl_and_merge_every_issuer(api, client, tmp_path):
+    crawler = _crawler(client, tmp_path, count=4)
+    report = crawler.run()
+
+    assert report["shards"] == 3 and report["completed"] == 3 and report["failed"] == list()
+    assert report["types"] == len(api.types)
+    assert crawler.merge() == len(api.types)
+    with open(os.path.join(str(tmp_path), CRAWL_MERGED_FILE)) as f:
+        records = [json.loads(line) for line in f]
+    assert sorted(r["id"] for r in records) == sorted(api.types)
+    assert all(r["value"] == {"text": "1 cent"} and len(r["issues"]) == 3 for r in records)
+
+
+def test_completed_shards_are_skipped_and_failed_ones_kept_apart(api, client, tmp_path):
+    crawler = _crawler(client, tmp_path, shard_by="category", issues=False)
+    api.queue("GET", "/types/2", (500, {}))  # 2 is the first exonumia type
+    first = crawler.run()
+    assert first["failed"] == ["exonumia"] and first["completed"] == 2
+    assert not os.path.exists(crawler._shard_file("exonumia"))
+    assert crawler.merge() == 20
+
+    requests = api.count("GET", "/types")
+    second = crawler.run()
+    assert second["skipped"] == 2 and second["completed"] == 1
+    assert api.count("GET", "/types") == requests + 1  # Only the failed shard is listed again
+    assert crawler.merge() == len(api.types)
+
+
+def test_unknown_shard_key_is_refused(client, tmp_path):
+    with pytest.raises(ValueError, match="shard_by"):
+        CatalogueCrawler(client, path=str(tmp_path), shard_by="year")
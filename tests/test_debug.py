@@ -0,0 +1,59 @@
+import threading
+
+import pytest
+
+from numista import Numista
+from numista.context import NumistaContext
+from numista.debug import DebugLog
+from tests.conftest import API_KEY
+
+
+class BrokenTransport:
+    def request(self, method, url, **kwargs):
+        raise ConnectionError("connection refused")
+
+
+def test_log_is_bounded_truncated_and_scrubbed():
+    log = DebugLog(size=3, body_limit=5)
+    for status in (200, 404, 200, 0):
+        log.record("get", "https://example.org", params={"code": "secret", "q": "x"}, status=status)
+    log.record("post", "https://example.org", request_body={"a": 1}, response_body=b"0123456789", status=201)
+
+    assert len(log) == 3
+    last = log.last(1)[0]
+    assert last["method"] == "POST" and last["request_body"] == '{"a":... (8 total)'
+    assert last["response_body"] == "01234... (10 total)"
+    assert log.last(2)[0]["params"] == {"code": "***", "q": "x"}
+    assert [e["status"] for e in log.failures()] == [0]
+    assert DebugLog(body_limit=0).record(response_body=b"body")["response_body"] is None
+    log.clear()
+    assert log.last() == list()
+
+
+def test_client_captures_requests_per_thread(api, log_path):
+    client = Numista(api_key=API_KEY, log_path=log_path, debug_log=DebugLog(size=10))
+    api.queue("GET", "/types/2", (404, {"error_message": "Type not found"}))
+    client.getType(type_id=1)
+
+    def other():
+        client.getType(type_id=2)
+
+    thread = threading.Thread(target=other)
+    thread.start()
+    thread.join()
+
+    assert client._raw["last_request"]["url"].endswith("/types/1")  # Not the other thread's request
+    assert [e["endpoint"] for e in client.debugLog.last()] == ["GET /types/{id}"] * 2
+    failure = client.debugLog.failures()[0]
+    assert failure["status"] == 404 and "Type not found" in failure["response_body"]
+    assert failure["decoded_bytes"] == failure["wire_bytes"] > 0
+    client.context.close()
+
+
+def test_transport_errors_are_captured(log_path):
+    context = NumistaContext(transport=BrokenTransport())
+    client = Numista(api_key=API_KEY, log_path=log_path, debug=True, context=context)
+    with pytest.raises(ConnectionError):
+        client.getType(type_id=1)
+    entry = client.debugLog.failures()[-1]
+    assert entry["status"] == 0 and "connection refused" in entry["error"]
@@ -0,0 +1,93 @@
+import io
+import json
+
+import pytest
+
+from numista.export import ColumnarWriter, CSVWriter, NDJSONWriter, read_columns, widen_type
+
+
+def _values(table: object, name: str) -> list:
+    """A column of read_columns(), whatever the format"""
+    return table[name] if isinstance(table, dict) else table.column(name).to_pylist()
+
+
+def _write(path: str, fmt: str, records: list, batch_size: int = 2) -> ColumnarWriter:
+    writer = ColumnarWriter(path=path, fmt=fmt, batch_size=batch_size)
+    for record in records:
+        writer.write(record)
+    writer.close()
+    return writer
+
+
+@pytest.fixture(params=["columns", "parquet", "feather"])
+def fmt(request):
+    if request.param != "columns":
+        pytest.importorskip("pyarrow")
+    return request.param
+
+
+def test_widen_type():
+    assert widen_type(None, "int") == "int"
+    assert widen_type("int", None) == "int"
+    assert widen_type("int", "float") == "float"
+    assert widen_type("float", "str") == "str"
+    assert widen_type("bool", "int") == "str"
+
+
+def test_later_batches_widen_column_types(tmp_path, fmt):
+    prices = [10, 12, 12.75, None, "n/a"]
+    writer = _write(str(tmp_path), fmt, [{"id": i, "price": p} for i, p in enumerate(prices)])
+
+    assert writer.types == {"id": "int", "price": "str"}
+    table = read_columns(str(tmp_path))
+    assert _values(table, "price") == ["10", "12", "12.75", None, "n/a"]
+    assert _values(table, "id") == [0, 1, 2, 3, 4]
+
+
+def test_resumed_session_unifies_the_schema(tmp_path, fmt):
+    _write(str(tmp_path), fmt, [{"id": 1, "price": 1}, {"id": 2, "price": 2}])
+    _write(str(tmp_path), fmt, [{"id": 3, "price": 1.5, "grade": "vf"}, {"id": 4, "price": None}])
+
+    table = read_columns(str(tmp_path))
+    assert _values(table, "id") == [1, 2, 3, 4]
+    assert _values(table, "price") == [1.0, 2.0, 1.5, None]
+    assert _values(table, "grade") == [None, None, "vf", None]
+
+    only = read_columns(str(tmp_path), columns=["grade"])
+    assert list(only if isinstance(only, dict) else only.column_names) == ["grade"]
+    with open(tmp_path / "schema.json") as f:
+        assert json.load(f) == {
+            "format": fmt,
+            "rows": 4,
+            "types": {"id": "int", "price": "float", "grade": "str"},
+        }
+
+
+def test_nested_records_are_flattened(tmp_path, fmt):
+    _write(str(tmp_path), fmt, [{"id": 1, "issuer": {"code": "france"}, "tags": ["a"]}])
+    table = read_columns(str(tmp_path))
+    assert _values(table, "issuer.code") == ["france"]
+    assert _values(table, "tags") == ['["a"]']
+
+
+def test_another_format_is_refused(tmp_path):
+    _write(str(tmp_path), "columns", [{"id": 1}])
+    pytest.importorskip("pyarrow")
+    with pytest.raises(ValueError, match="columns export"):
+        ColumnarWriter(path=str(tmp_path), fmt="parquet")
+    with pytest.raises(ValueError, match="Unknown column"):
+        read_columns(str(tmp_path), columns=["price"])
+
+
+def test_row_writers():
+    stream = io.StringIO()
+    writer = NDJSONWriter(stream, batch_size=1)
+    writer.write({"id": 1, "issuer": {"code": "france"}})
+    assert json.loads(stream.getvalue()) == {"id": 1, "issuer": {"code": "france"}}
+
+    stream = io.StringIO()
+    writer = CSVWriter(stream)
+    writer.write({"id": 1, "issuer": {"code": "france"}})
+    writer.write({"id": 2, "extra": True})
+    writer.close()
+    assert stream.getvalue().splitlines() == ["id,issuer.code", "1,france", "2,"]
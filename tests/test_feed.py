@@ -0,0 +1,62 @@
+import time
+from email.utils import formatdate
+
+from numista.feed import CollectionFeed
+from numista.numista import _retry_after
+from tests.conftest import STUB_USER_ID
+
+PATH = f"/users/{STUB_USER_ID}/collected_items"
+
+
+def test_changes_are_emitted_once_and_unchanged_collections_cost_a_304(api, client):
+    feed = CollectionFeed(client, min_interval=0.01, rate=0)
+    received = list()
+    feed.subscribe(received.append)
+    assert feed.watch() == STUB_USER_ID
+    assert feed.pollDue() == list()  # The baseline
+
+    collection = api.collections[STUB_USER_ID]
+    collection[1]["quantity"] = 3
+    del collection[2]
+    collection[99] = {"id": 99, "quantity": 1, "type": {"id": 420}}
+    time.sleep(0.02)
+    feed.pollDue()
+    assert sorted((e["event"], e["item_id"]) for e in received) == [
+        ("added", 99),
+        ("changed", 1),
+        ("removed", 2),
+    ]
+    assert [e["item"] for e in received if e["event"] == "removed"] == [None]
+
+    time.sleep(0.02)
+    assert feed.pollDue() == list()
+    assert api.calls[-1][3]["If-None-Match"]
+    stats = feed.stats()
+    assert stats["polls"] == 3 and stats["full"] == 2 and stats["not_modified"] == 1 and stats["events"] == 3
+
+
+def test_failed_polls_back_off_exponentially_and_honour_retry_after(api, client):
+    feed = CollectionFeed(client, min_interval=1, max_interval=8, rate=0)
+    feed.watch(STUB_USER_ID)
+    api.queue("GET", PATH, *[(500, {})] * 4, (429, {}, {"Retry-After": "30"}), (503, {}))
+
+    intervals = list()
+    for _ in range(6):
+        feed._poll(STUB_USER_ID)
+        intervals.append(feed.stats()["intervals"][STUB_USER_ID])
+    assert intervals == [2, 4, 8, 8, 30, 8]  # Retry-After beyond max_interval still wins
+    assert feed.stats()["backing_off"] == {STUB_USER_ID: 6}
+
+    feed._poll(STUB_USER_ID)
+    assert feed.stats()["intervals"][STUB_USER_ID] == 1 and feed.stats()["backing_off"] == dict()
+
+
+def test_retry_after_in_seconds_or_http_date(api, client):
+    assert _retry_after("120") == 120.0
+    assert 50 < _retry_after(formatdate(time.time() + 60, usegmt=True)) <= 60
+    assert _retry_after(formatdate(time.time() - 60, usegmt=True)) == 0.0
+    assert _retry_after("soon") is None
+
+    api.queue("GET", "/types/1", (503, {}, {"Retry-After": "5"}))
+    assert client.getType(type_id=1)["extra"]["retry_after"] == 5.0
+    assert "retry_after" not in client.getType(type_id=1)["extra"]
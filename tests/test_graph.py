@@ -0,0 +1,47 @@
+import pytest
+
+from numista.graph import CatalogueGraph
+
+
+def test_graph_links_types_issues_and_prices_in_two_rounds(api, client):
+    graph = client.catalogueGraph(types=[1, 2, 1], workers=8, rate=0)
+
+    assert [node.id for node in graph.roots] == [1, 2, 1] and graph.roots[0] is graph.roots[2]
+    assert [(lv["level"], lv["requests"]) for lv in graph.levels] == [("types", 4), ("prices", 6)]
+    node = graph.types[2]
+    assert node.detailed and node.data["value"] == {"text": "1 cent"}
+    assert [issue.id for issue in node.issues] == [21, 22, 23]
+    assert node.issues[0].type is node and node.issues[0].prices["USD"]["unc"] == 21 * 7 / 2
+    assert node.to_dict()["issues"][1] == {"id": 22, "year": 1902, "prices": node.issues[1].prices}
+    assert graph.stats()["priced_issues"] == 6
+
+
+def test_rounds_run_in_parallel(api, client):
+    api.latency = 0.1
+    graph = client.catalogueGraph(types=list(range(1, 6)), workers=16, rate=0)
+    assert sum(lv["requests"] for lv in graph.levels) == 10 + 15
+    assert sum(lv["seconds"] for lv in graph.levels) < 1.0  # 25 requests one after another: 2.5s
+
+
+def test_known_nodes_are_not_fetched_again_and_errors_stay_on_their_node(api, client):
+    graph = CatalogueGraph(client, rate=0)
+    api.queue("GET", "/types/1/issues/12/prices", (503, {}))
+    graph.load([1], details=False)
+    assert graph.types[1].issues[1].errors == ["getPrices: HTTP 503 (USD)"]
+    assert graph.levels[1]["failed"] == 1
+
+    requests = api.count()
+    graph.load([{"id": 1, "title": "hit"}, 3], details=False)
+    # Type 1 only needs the failed prices again, type 3 its issues and prices
+    assert api.count() == requests + 1 + 1 + 3
+    assert graph.types[1].issues[1].prices["USD"]["g"] == 12 / 2
+    assert graph.types[3].data == {"id": 3} and not graph.types[3].detailed
+
+
+def test_unknown_currency_is_rejected(api, client):
+    graph = CatalogueGraph(client, rate=0)
+    with pytest.raises(ValueError):
+        graph.load([1], currency="XYZ")
+    assert api.count() == 0 and not graph.types
+    graph.load([1], details=False, currency="eur")
+    assert set(graph.types[1].issues[0].prices) == {"EUR"}
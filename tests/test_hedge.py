@@ -0,0 +1,90 @@
+import time
+
+import pytest
+
+from numista import Numista
+from numista.context import NumistaContext
+from numista.hedge import HedgePolicy
+from numista.scheduler import RequestScheduler
+from tests.conftest import API_KEY
+
+
+def _wait(condition, timeout: float = 2.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+def _hedged_client(log_path: str, scheduler: RequestScheduler = None, **policy) -> Numista:
+    hedge = HedgePolicy(min_samples=3, min_delay=0.05, **{"budget": 1.0, **policy})
+    context = NumistaContext(hedge=hedge, scheduler=scheduler)
+    client = Numista(api_key=API_KEY, log_path=log_path, context=context)
+    for _ in range(3):
+        client.getType(type_id=2)  # Fast samples: the hedge delay becomes min_delay
+    return client
+
+
+def test_slow_request_is_hedged_and_the_first_response_wins(api, log_path):
+    client = _hedged_client(log_path)
+    api.delays[("GET", "/types/1")] = [1.0, 0.0]
+    started = time.monotonic()
+    assert client.getType(type_id=1)["data"]["id"] == 1
+    assert time.monotonic() - started < 0.5
+    assert api.count("GET", "/types/1") == 2
+    stats = client.context.hedge.stats()
+    assert stats["hedged"] == 1 and stats["hedge_wins"] == 1
+    client.context.hedge.close()
+
+
+def test_hedges_stay_within_the_budget():
+    policy = HedgePolicy(min_samples=1, min_delay=0.01, budget=0.5, burst=1)
+    policy.observe("GET /types/{id}", 0.001)
+
+    def send(cancelled):
+        time.sleep(0.03)
+        return "response", b""
+
+    for _ in range(4):
+        assert policy.run("GET /types/{id}", send) == ("response", b"")
+    stats = policy.stats()
+    assert stats["requests"] == 4 and stats["hedged"] == 2 and stats["denied"] == 2
+    with pytest.raises(ValueError):
+        HedgePolicy(percentile=95)
+    policy.close()
+
+
+def test_oauth_token_is_never_hedged(api, log_path):
+    assert not HedgePolicy(endpoints=["GET /oauth_token"]).hedges("GET /oauth_token")
+    assert HedgePolicy().hedges("GET /types/{id}")
+
+    client = _hedged_client(log_path)
+    for _ in range(3):
+        client.myTokenRefresh()
+    api.delays[("GET", "/oauth_token")] = 0.3
+    client.myTokenRefresh()
+    assert api.count("GET", "/oauth_token") == 4  # Each refresh issued one token
+    assert client.context.hedge.stats()["delays"].get("GET /oauth_token") is None
+    client.context.hedge.close()
+
+
+@pytest.mark.parametrize("slots", [1, 2])
+def test_hedges_take_a_scheduler_slot(api, log_path, slots):
+    scheduler = RequestScheduler(rate=0, limits={"default": slots})
+    client = _hedged_client(log_path, scheduler=scheduler)
+    api.delays[("GET", "/types/1")] = [0.3, 0.0]
+    assert client.getType(type_id=1)["data"]["id"] == 1
+
+    hedge = client.context.hedge
+    assert _wait(lambda: scheduler.stats()["default"]["active"] == 0)
+    if slots == 1:
+        # The only slot is the slow request's: the hedge waits for it, then is dropped unsent
+        assert _wait(lambda: hedge.stats()["refused"] == 1)
+        assert api.count("GET", "/types/1") == 1
+        assert scheduler.stats()["default"]["sent"] == 3 + 2
+    else:
+        assert api.count("GET", "/types/1") == 2 and hedge.stats()["hedge_wins"] == 1
+        assert scheduler.stats()["default"]["sent"] == 3 + 2
+    hedge.close()
@@ -0,0 +1,27 @@
+import importlib
+import subprocess
+import sys
+
+import pytest
+
+import numista
+
+HEAVY = ["requests", "ruamel.yaml", "validators", "iso4217", "numpy", "pyarrow", "brotli", "concurrent.futures"]
+
+
+def test_import_loads_no_heavy_dependency():
+    code = f"import sys, numista; print([m for m in {HEAVY!r} if m in sys.modules])"
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    assert out.stdout.strip() == "[]"
+
+
+@pytest.mark.parametrize("name", sorted(numista._LAZY_ATTRIBUTES))
+def test_lazy_attributes_resolve(name):
+    module = importlib.import_module(numista._LAZY_ATTRIBUTES[name])
+    assert getattr(numista, name) is getattr(module, name)
+    assert name in dir(numista)
+
+
+def test_unknown_attribute_raises():
+    with pytest.raises(AttributeError):
+        numista.NotAThing
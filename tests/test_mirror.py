@@ -0,0 +1,63 @@
+import os
+
+from numista.mirror import CatalogueMirror
+
+
+def test_search_matches_last_word_as_prefix(tmp_path):
+    mirror = CatalogueMirror(path=str(tmp_path))
+    mirror._store(
+        [
+            {"id": 1, "title": "Buffalo Nickel", "issuer": {"code": "etats-unis", "name": "United States"}},
+            {"id": 2, "title": "Buffalo Gold", "issuer": {"code": "etats-unis", "name": "United States"}},
+            {"id": 3, "title": "Franc Germinal", "issuer": {"code": "france", "name": "France"}},
+        ]
+    )
+
+    assert [t["id"] for t in mirror.searchTypes(q="buff")["data"]["types"]] == [1, 2]
+    assert [t["id"] for t in mirror.searchTypes(q="buffalo nic")["data"]["types"]] == [1]
+    assert [t["id"] for t in mirror.searchTypes(q="united stat")["data"]["types"]] == [1, 2]
+    assert mirror.searchTypes(q="nick buffalo")["data"]["count"] == 0  # Only the last word is a prefix
+    assert mirror.searchTypes(q="fr", issuer="france")["extra"] == {"mirror": True}
+
+
+def test_changed_record_is_reindexed(tmp_path):
+    mirror = CatalogueMirror(path=str(tmp_path))
+    mirror._store([{"id": 1, "title": "Buffalo Nickel"}])
+    mirror._store([{"id": 1, "title": "Indian Head"}])
+
+    assert mirror.searchTypes(q="buffalo")["data"]["count"] == 0
+    assert mirror.searchTypes(q="ind")["data"]["types"] == [{"id": 1, "title": "Indian Head"}]
+
+
+def test_harvest_persists_records_and_index(api, client, tmp_path):
+    mirror = CatalogueMirror(client, path=str(tmp_path))
+    added = mirror.harvest(issuer="france", count=4)
+
+    expected = sorted(i for i, t in api.types.items() if t["issuer"]["code"] == "france")
+    assert added == len(expected)
+    assert mirror.getType(expected[0])["data"]["value"] == {"text": "1 cent"}
+
+    requests = api.count()
+    offline = CatalogueMirror(path=str(tmp_path))
+    hits = offline.searchTypes(q="fran")["data"]["types"]
+    assert [t["id"] for t in hits] == expected
+    assert offline.getType(12345)["http_info"]["http_status"] == 404
+    assert api.count() == requests
+
+
+def test_index_is_rebuilt_when_records_are_rewritten_in_place(api, client, tmp_path):
+    mirror = CatalogueMirror(client, path=str(tmp_path))
+    mirror.harvest(issuer="france", count=50)
+    store = tmp_path / "types.jsonl"
+    index_mtime = os.stat(tmp_path / "index.json").st_mtime_ns
+
+    # Same number of records, same size, new titles
+    store.write_text(store.read_text().replace("Buffalo", "Sestert"))
+    os.utime(store, ns=(index_mtime + 10**9, index_mtime + 10**9))
+
+    reopened = CatalogueMirror(path=str(tmp_path))
+    assert reopened.searchTypes(q="buffalo")["data"]["count"] == 0
+    assert reopened.searchTypes(q="sestert")["data"]["count"] > 0
+
+    reopened.compact()
+    assert CatalogueMirror(path=str(tmp_path))._index == reopened._index
@@ -0,0 +1,44 @@
+import pytest
+
+from numista import Numista
+from tests.conftest import API_KEY, STUB_USER_ID
+
+
+def test_prepared_calls_match_the_methods(api, client):
+    prices = client.prepare("getPrices", currency="usd")
+    assert prices.template == "GET /types/{id}/issues/{id}/prices"
+    assert prices(1, 11) == client.getPrices(type_id=1, issue_id=11, currency="USD")
+    assert prices(type_id=2, issue_id=21, currency="EUR")["data"]["currency"] == "EUR"
+    assert api.calls[-1][1] == "/types/2/issues/21/prices"
+
+    items = client.prepare("getCollectedItems")
+    assert items()["data"] == client.getCollectedItems(user_id=STUB_USER_ID)["data"]
+    client.myTokenRefresh()
+    items()
+    assert api.calls[-1][3]["Authorization"] == client.context.auth["self"]["headers"]["Authorization"]
+
+
+def test_requests_use_the_client_version_path(api, log_path):
+    numista = Numista(api_key=API_KEY, log_path=log_path, api_ver=99)  # Falls back to the default
+    assert numista.versionPath == "/v3"
+    numista.prepare("getType")(1)
+    assert api.calls[-1][1] == "/types/1"  # The stub serves /api/v3 only
+    numista.context.close()
+
+
+def test_invalid_operations_and_parameters_are_refused(client):
+    with pytest.raises(ValueError, match="must be one of"):
+        client.prepare("deleteEverything")
+    with pytest.raises(ValueError, match="no parameter"):
+        client.prepare("getType", currency="EUR")
+    with pytest.raises(ValueError, match="Category"):
+        client.prepare("searchTypes", category="stamp")
+    with pytest.raises(ValueError, match="issue_id"):
+        client.prepare("getPrices")(420)
+
+
+def test_status_outside_the_http_range_is_a_failed_result(api, client):
+    api.queue("GET", "/types/1", (599, {"error_message": "?"}), (599, {"error_message": "?"}))
+    for result in (client.getType(type_id=1), client.prepare("getType")(1)):
+        assert result["failed"] and result["data"] == dict()
+        assert result["http_info"]["http_status"] == 599
@@ -0,0 +1,57 @@
+import pytest
+
+import numista.prices
+from numista.prices import PriceHistory
+
+DAY = 86400
+
+
+def _prices(currency: str = "EUR", **prices) -> dict:
+    return {"currency": currency, "prices": [{"grade": g, "price": p} for g, p in prices.items()]}
+
+
+@pytest.mark.parametrize("numpy", [True, False])
+def test_only_changed_prices_are_stored_and_reloaded(tmp_path, monkeypatch, numpy):
+    if numpy:
+        pytest.importorskip("numpy")
+    else:
+        monkeypatch.setattr(numista.prices, "load_numpy", lambda: None)
+    history = PriceHistory(path=str(tmp_path))
+    assert history.record(1, 10, _prices(vf=5.0, xf=8.0), ts=DAY) == 2
+    assert history.record(1, 10, _prices(vf=5.0, xf=9.0), ts=2 * DAY) == 1
+    assert history.record(1, 10, {"data": _prices(vf=5.0, xf=9.0)}, ts=3 * DAY) == 0
+
+    reopened = PriceHistory(path=str(tmp_path))
+    assert len(reopened) == 3
+    assert reopened.history(1, 10, currency="eur", grade="xf") == [(DAY, 8.0), (2 * DAY, 9.0)]
+    assert reopened.record(1, 10, _prices(xf=9.0), ts=4 * DAY) == 0  # Last prices are reloaded too
+    assert reopened.history(1, 10, currency="EUR", grade="vf") == [(DAY, 5.0)]
+    assert reopened.history(1, 11, currency="EUR", grade="vf") == list()
+
+
+@pytest.mark.parametrize("numpy", [True, False])
+def test_price_change_over_a_window(tmp_path, monkeypatch, numpy):
+    if numpy:
+        pytest.importorskip("numpy")
+    else:
+        monkeypatch.setattr(numista.prices, "load_numpy", lambda: None)
+    history = PriceHistory(path=str(tmp_path))
+    history.record(1, 10, _prices(vf=4.0, xf=8.0), ts=1 * DAY)
+    history.record(1, 10, _prices(vf=5.0, xf=6.0), ts=22 * DAY)
+    history.record(2, 20, _prices(vf=3.0), ts=25 * DAY)  # First seen within the window
+    history.record(1, 10, _prices(currency="USD", vf=100.0), ts=1 * DAY)
+
+    change = history.priceChange(days=10, currency="EUR", now=30 * DAY)
+    rows = list(zip(*(list(change[k]) for k in ("type_id", "issue_id", "grade", "old", "new", "pct"))))
+    assert rows == [(1, 10, "vf", 4.0, 5.0, 25.0), (1, 10, "xf", 8.0, 6.0, -25.0)]
+    assert list(history.priceChange(days=10, grade="vf", now=30 * DAY, currency="EUR")["grade"]) == ["vf"]
+    assert list(history.priceChange(currency="GBP")["type_id"]) == list()
+
+
+def test_poll_records_every_issue_and_currency(api, client, tmp_path):
+    history = PriceHistory(path=str(tmp_path))
+    appended = history.poll(client, issues=[(1, 11), (2, 21)], currencies=["EUR", "USD"], rate=0)
+
+    assert appended == 2 * 2 * 7
+    assert api.count("GET", "/types/1/issues/11/prices") == 2
+    assert history.history(2, 21, currency="USD", grade="unc")[0][1] == 21 * 7 / 2
@@ -0,0 +1,33 @@
+import threading
+import time
+
+import pytest
+
+from numista.ratelimit import RateLimiter, SharedRateLimiter
+
+
+@pytest.mark.parametrize("limiter_class", [RateLimiter, SharedRateLimiter])
+def test_threads_share_one_rate(limiter_class):
+    limiter = limiter_class(rate=100, burst=5)
+    started = time.monotonic()
+    threads = [threading.Thread(target=limiter.acquire) for _ in range(25)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # The burst is free, the other 20 requests are spaced 10ms apart
+    assert 0.18 <= time.monotonic() - started < 1.0
+
+
+def test_try_acquire_never_books_ahead():
+    limiter = RateLimiter(rate=10, burst=1)
+    assert limiter.try_acquire() == 0.0
+    wait = limiter.try_acquire()
+    assert 0.0 < wait <= 0.1
+    assert limiter.try_acquire() == pytest.approx(wait, abs=0.01)  # Nothing was taken
+
+
+def test_zero_rate_disables_limiting():
+    limiter = RateLimiter(rate=0)
+    assert [limiter.acquire() for _ in range(100)] == [0.0] * 100
@@ -0,0 +1,22 @@
+from numista.reference import ReferenceData
+
+
+def test_lookups_are_served_from_memory(api, client):
+    reference = ReferenceData(client)
+    requests = api.count()
+
+    assert reference.issuer("france")["name"] == "France"
+    assert reference.issuer("atlantis") is None
+    assert reference.issuersByPrefix("sta") == ("etats-unis",)  # Any word of the name
+    assert reference.issuersByPrefix("M") == ("mexique",)
+    assert reference.catalogueId("KM") == 3
+    assert api.count() == requests
+
+
+def test_other_languages_load_on_first_lookup(api, client):
+    reference = ReferenceData(client, preload=False)
+    assert api.count("GET", "/issuers") == 0
+
+    reference.issuers(lang="fr")
+    reference.issuer("france", lang="fr")
+    assert [c[2].get("lang") for c in api.calls if c[1] == "/issuers"] == ["fr"]
@@ -0,0 +1,60 @@
+import threading
+import time
+
+import pytest
+
+from numista import Numista
+from numista.breaker import CircuitBreaker
+from numista.context import NumistaContext
+from numista.scheduler import RequestScheduler
+from tests.conftest import API_KEY
+
+
+def test_a_freed_slot_goes_to_the_highest_class():
+    scheduler = RequestScheduler(rate=0, limits={"interactive": 1, "default": 1, "background": 1})
+    scheduler.acquire("background")
+    order = list()
+
+    def send(priority):
+        with scheduler.slot(priority):
+            order.append(priority)
+
+    scheduler.acquire("default")
+    waiting = [threading.Thread(target=send, args=(p,)) for p in ("default", "default")]
+    for thread in waiting:
+        thread.start()
+    time.sleep(0.05)
+    assert scheduler.stats()["default"]["waiting"] == 2
+    send("interactive")  # Not held up by the waiting default requests
+    scheduler.release("default")
+    for thread in waiting:
+        thread.join(1)
+    assert order == ["interactive", "default", "default"]
+    assert scheduler.stats()["default"] == {"active": 0, "waiting": 0, "sent": 3, "expired": 0}
+
+
+def test_expired_requests_are_dropped_before_using_quota():
+    scheduler = RequestScheduler(rate=0, limits={"background": 1})
+    scheduler.acquire("background")
+    with pytest.raises(TimeoutError):
+        scheduler.acquire("background", deadline=0.05)
+    assert scheduler.stats()["background"]["expired"] == 1
+    with pytest.raises(ValueError, match="priority"):
+        scheduler.acquire("urgent")
+
+
+def test_unsent_request_gives_back_its_half_open_probe(api, log_path):
+    breaker = CircuitBreaker(failures=1, reset_timeout=0.05)
+    context = NumistaContext(scheduler=RequestScheduler(rate=0), breaker=breaker)
+    client = Numista(api_key=API_KEY, log_path=log_path, context=context)
+    api.queue("GET", "/types/1", (500, {}))
+    assert client.getType(type_id=1)["http_info"]["http_status"] == 500
+    assert breaker.state("GET /types/{id}") == "open"
+    time.sleep(0.06)
+
+    with pytest.raises(ValueError, match="priority"):
+        client.getType(type_id=1, priority="urgent")
+    # The probe was given back: the next request is let through and closes the circuit
+    assert client.getType(type_id=1)["http_info"]["http_status"] == 200
+    assert breaker.state("GET /types/{id}") == "closed"
+    context.close()
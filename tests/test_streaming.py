@@ -0,0 +1,52 @@
+import json
+
+import pytest
+
+from numista.streaming import iter_json_array
+from tests.conftest import STUB_USER_ID
+
+
+def _chunks(value: object, size: int) -> list:
+    body = json.dumps(value, ensure_ascii=False).encode("utf-8")
+    return [body[i : i + size] for i in range(0, len(body), size)]
+
+
+@pytest.mark.parametrize("size", [1, 3, 64, 100000])
+def test_elements_are_parsed_across_chunk_boundaries(size):
+    types = [{"id": i, "title": f"Pièce {i}", "weight": 12.5 * i, "tags": ["é", None]} for i in range(1, 6)]
+    body = {"count": 1234567, "types": types, "page": {"next": None}}
+    meta = dict()
+
+    assert list(iter_json_array(_chunks(body, size), key="types", meta=meta)) == types
+    assert meta == {"count": 1234567, "page": {"next": None}}
+    assert list(iter_json_array(_chunks([10, 205, 3.25], size))) == [10, 205, 3.25]  # Numbers cut mid-chunk
+    assert list(iter_json_array(_chunks({"types": []}, size), key="types")) == list()
+
+
+def test_malformed_streams_raise_value_error():
+    with pytest.raises(ValueError, match="No array under 'types'"):
+        list(iter_json_array([b'{"count": 0}'], key="types"))
+    with pytest.raises(ValueError):
+        list(iter_json_array([b"[1, 2"]))
+    with pytest.raises(ValueError):
+        list(iter_json_array([b"[1; 2]"]))
+
+
+def test_stream_types_follows_the_pages(api, client):
+    streamed = client.streamTypes(issuer="france", count=4)
+    first = next(streamed)
+    assert first["issuer"]["code"] == "france" and api.count("GET", "/types") == 1
+    expected = sorted(i for i, t in api.types.items() if t["issuer"]["code"] == "france")
+    assert [first["id"]] + [t["id"] for t in streamed] == expected
+    assert api.count("GET", "/types") == 3  # 10 types, 4 per page
+
+    assert len(list(client.streamTypes(count=4, max_pages=2))) == 8
+    assert client.transferStats()["endpoints"]["GET /types"]["decoded_bytes"] > 0
+
+
+def test_stream_collected_items(api, client):
+    items = list(client.streamCollectedItems())
+    assert items == list(api.collections[STUB_USER_ID].values())
+    api.queue("GET", f"/users/{STUB_USER_ID}/collected_items", (500, {"error_message": "down"}))
+    with pytest.raises(ValueError):
+        list(client.streamCollectedItems())
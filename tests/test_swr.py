@@ -0,0 +1,75 @@
+import threading
+import time
+
+from numista import Numista
+from numista.cache import SWRCache
+from numista.context import NumistaContext
+from tests.conftest import API_KEY
+
+
+def _wait(condition, timeout: float = 2.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+def test_stale_entries_are_served_and_refreshed_once():
+    cache = SWRCache(soft_ttl=0.05, hard_ttl=10)
+    release = threading.Event()
+    calls = list()
+
+    def fetch():
+        calls.append(len(calls))
+        if len(calls) > 1:
+            release.wait(2)
+        return len(calls)
+
+    assert cache.load("k", fetch) == (1, "miss")
+    assert cache.load("k", fetch) == (1, "fresh")
+    time.sleep(0.06)
+    assert cache.load("k", fetch) == (1, "stale")
+    assert cache.load("k", fetch) == (1, "stale")  # Already refreshing: not refreshed twice
+    release.set()
+    assert _wait(lambda: cache.refreshes == 1)
+    assert cache.load("k", fetch) == (2, "fresh")
+    assert len(calls) == 2 and cache.stale_hits == 2
+
+
+def test_failed_refresh_keeps_the_stale_entry_and_past_hard_ttl_is_a_miss():
+    cache = SWRCache(soft_ttl=0.01, hard_ttl=0.2)
+    cache.load("k", lambda: "old")
+    time.sleep(0.02)
+
+    def broken():
+        raise ConnectionError("down")
+
+    assert cache.load("k", broken) == ("old", "stale")
+    assert _wait(lambda: cache.refresh_errors == 1)
+    assert cache.load("k", lambda: None, cacheable=lambda v: v is not None)[1] == "stale"
+    assert _wait(lambda: cache.refresh_errors == 2) and cache.refreshes == 0  # Rejected, e.g. an HTTP 503
+    time.sleep(0.2)
+    assert cache.load("k", lambda: "new") == ("new", "miss")
+    assert cache.load("nothing", lambda: None, cacheable=lambda v: v is not None) == (None, "miss")
+    assert cache.get("nothing") is None
+
+
+def test_client_serves_get_type_stale_while_revalidating(api, log_path):
+    swr = SWRCache(soft_ttl=0.05, hard_ttl=10)
+    client = Numista(api_key=API_KEY, log_path=log_path, context=NumistaContext(swr=swr))
+    assert client.getType(type_id=1)["extra"]["cache"] == "miss"
+    assert client.getType(type_id=1)["extra"]["cache"] == "fresh"
+    api.queue("GET", "/types/2", (500, {}))
+    assert client.getType(type_id=2)["extra"]["cache"] == "miss"
+    assert client.getType(type_id=2)["extra"]["cache"] == "miss"  # Failed results are not stored
+
+    api.types[1]["title"] = "Renamed"
+    time.sleep(0.06)
+    stale = client.getType(type_id=1)
+    assert stale["extra"]["cache"] == "stale" and stale["data"]["title"] != "Renamed"
+    assert _wait(lambda: swr.refreshes == 1)
+    assert client.getType(type_id=1)["data"]["title"] == "Renamed"
+    assert api.count("GET", "/types/1") == 2
+    client.context.close()
@@ -0,0 +1,75 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+import requests
+
+from numista import Numista
+from tests.conftest import API_KEY
+
+THREADS = 64
+SCHEMA = ("GET", "/api/doc/swagger.yaml")
+
+
+def _hammer(task, threads: int = THREADS) -> list:
+    """Run task(i) on every thread at once"""
+    barrier = threading.Barrier(threads)
+
+    def run(i):
+        barrier.wait()
+        return task(i)
+
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        return list(pool.map(run, range(threads)))
+
+
+def test_one_client_shared_by_64_threads(api, log_path):
+    client = Numista(api_key=API_KEY, log_path=log_path, debug=True)
+    api.latency = 0.005
+
+    def task(i):
+        labelled = client._oauth(grant_type="client_credentials", token_label=f"worker{i}")
+        unlabelled = client._oauth(grant_type="client_credentials")
+        schema = client.schemaFind("addCollectedItem", http_method="post")
+        items = client.getCollectedItems()
+        return labelled, unlabelled, schema, items, client._raw["last_request"]
+
+    results = _hammer(task)
+
+    # One schema fetch and one 'self' token, whatever the contention
+    assert api.count(*SCHEMA) == 1
+    assert all(r[2]["path"] == "/users/{user_id}/collected_items" for r in results)
+    assert api.count("GET", "/oauth_token") == 2 * THREADS + 1
+    # Every token got its own label, none was overwritten
+    assert len(client.oauthTokens) == 2 * THREADS + 1
+    assert all(client.oauthTokens[f"worker{i}"] is r[0] for i, r in enumerate(results))
+    assert len({id(r[1]) for r in results}) == THREADS
+    # Each thread's debug data is its own last request
+    assert all(r[3]["http_info"]["http_status"] == 200 for r in results)
+    assert all(r[4]["endpoint"] == "GET /users/{id}/collected_items" for r in results)
+    assert len(client.debugLog) == min(client.debugLog.size, len(api.calls) - 1)  # The schema is not an API request
+    client.context.close()
+
+
+def test_slow_schema_fetch_does_not_hold_up_other_requests(api, client):
+    api.delays[SCHEMA] = 1.0
+    fetching = threading.Thread(target=client.schemaFind, args=("getType",))
+    fetching.start()
+    while not api.count(*SCHEMA):
+        pass
+
+    # The 'self' token and the schema have their own locks
+    client.myToken()
+    assert client.getType(1)["http_info"]["http_status"] == 200
+    assert fetching.is_alive()
+    fetching.join()
+    assert client._schemas
+
+
+def test_schema_fetch_honours_the_client_timeout(api, log_path):
+    client = Numista(api_key=API_KEY, log_path=log_path, timeout=0.2)
+    api.delays[SCHEMA] = [1.0]
+    with pytest.raises(requests.exceptions.Timeout):
+        client._fetch_api_schema()
+    assert not client._schemas
+    assert client.schemaFind("getType")["path"] == "/types/{type_id}"
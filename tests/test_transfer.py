@@ -0,0 +1,33 @@
+from numista import Numista
+from numista.transfer import TransferStats
+from tests.conftest import API_KEY
+
+
+def test_snapshot_totals_ratios_and_reset():
+    stats = TransferStats()
+    stats.record("GET /types/{id}", wire_bytes=25, decoded_bytes=100, encoding="gzip")
+    stats.record("GET /types/{id}", wire_bytes=100, decoded_bytes=100)
+    stats.record("GET /issuers", wire_bytes=0, decoded_bytes=0)
+
+    snapshot = stats.snapshot(reset=True)
+    types = snapshot["endpoints"]["GET /types/{id}"]
+    assert types["ratio"] == 0.625 and types["encodings"] == {"gzip": 1, "identity": 1}
+    assert snapshot["endpoints"]["GET /issuers"]["ratio"] == 1.0
+    assert snapshot["total"] == {"requests": 3, "wire_bytes": 125, "decoded_bytes": 200, "ratio": 0.625}
+    assert stats.snapshot()["total"]["requests"] == 0
+
+
+def test_compressed_responses_count_wire_and_decoded_bytes(api, client, log_path):
+    api.compress = True
+    assert client.getIssuers()["data"]["issuers"][0]["code"] == "france"
+    stats = client.transferStats()["endpoints"]["GET /issuers"]
+    assert stats["encodings"] == {"gzip": 1}
+    assert 0 < stats["wire_bytes"] < stats["decoded_bytes"]
+    assert "gzip" in api.calls[-1][3]["Accept-Encoding"]
+
+    identity = Numista(api_key=API_KEY, log_path=log_path, compression=False)
+    identity.getIssuers()
+    assert api.calls[-1][3]["Accept-Encoding"] == "identity"
+    stats = identity.transferStats(reset=True)["endpoints"]["GET /issuers"]
+    assert stats["encodings"] == {"identity": 1} and stats["ratio"] == 1.0
+    identity.context.close()
@@ -0,0 +1,24 @@
+import pytest
+
+import numista.validation
+from numista.validation import bulk_validate, validate_categories
+
+
+@pytest.mark.parametrize("numpy", [True, False])
+def test_bulk_validate_masks(monkeypatch, numpy):
+    if numpy:
+        pytest.importorskip("numpy")
+    else:
+        monkeypatch.setattr(numista.validation, "load_numpy", lambda: None)
+
+    result = bulk_validate(currencies=["eur", "USD", "XYZ", "eur"], grades=["vf", "vf", "unc", "mint"])
+
+    assert list(result["currency"]) == [True, True, False, True]
+    assert list(result["grade"]) == [True, True, True, False]
+    assert list(result["valid"]) == [True, True, False, False]
+    assert list(validate_categories(["coin", "stamp"])) == [True, False]
+
+
+def test_columns_of_different_lengths_are_refused():
+    with pytest.raises(ValueError):
+        bulk_validate(currencies=["EUR"], grades=["vf", "xf"])
@@ -0,0 +1,55 @@
+import time
+
+import pytest
+
+import numista.valuation
+from numista.cache import TTLCache
+
+ITEMS = [
+    {"type": {"id": 1}, "issue": {"id": 11}, "grade": "vf", "quantity": 2},
+    {"type": {"id": 1}, "issue": {"id": 11}, "grade": "unc", "quantity": 1},
+    {"type": {"id": 2}, "issue": {"id": 21}, "grade": "vf", "quantity": 1},
+    {"type": {"id": 3}, "grade": "vf"},  # No issue: cannot be priced
+    {"type": None, "issue": {"id": 41}, "grade": "vf"},  # No type either
+]
+
+
+@pytest.mark.parametrize("numpy", [True, False])
+def test_value_totals_by_grade(api, client, monkeypatch, numpy):
+    if numpy:
+        pytest.importorskip("numpy")
+    else:
+        monkeypatch.setattr(numista.valuation, "load_numpy", lambda: None)
+
+    valuation = client.valueCollection(items=ITEMS, currency="eur", rate=0)
+
+    # The stub prices grade i of an issue at issue_id * (i + 1) / 2: vf is 2.0x, unc 3.5x
+    assert valuation["currency"] == "EUR"
+    assert valuation["by_grade"] == {
+        "vf": {"items": 2, "quantity": 3.0, "value": 11 * 2.0 * 2 + 21 * 2.0},
+        "unc": {"items": 1, "quantity": 1.0, "value": 11 * 3.5},
+    }
+    assert valuation["total"] == pytest.approx(44.0 + 42.0 + 38.5)
+    assert (valuation["valued_items"], valuation["unvalued_items"]) == (3, 2)
+
+
+def test_prices_are_fetched_once_per_issue(api, client):
+    client.valueCollection(items=ITEMS, currency="EUR", rate=0)
+    client.valueCollection(items=ITEMS, currency="EUR", rate=0)
+
+    assert api.count("GET", "/types/1/issues/11/prices") == 1  # Cached in the context
+    assert api.count("GET", "/types/2/issues/21/prices") == 1
+
+
+def test_ttl_cache_expires_and_evicts_least_recently_used():
+    cache = TTLCache(ttl=60, max_entries=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)  # "b" is the least recently used
+    assert "b" not in cache and cache.get("a") == 1
+
+    cache.set("short", 4, ttl=0.01)
+    time.sleep(0.02)
+    assert cache.get("short", default="expired") == "expired"
+    assert (cache.hits, cache.misses) == (2, 1)